@@ -1,3 +1,6 @@
+from typing import Optional
+
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
 
@@ -11,6 +14,26 @@ class AgentSettings(BaseSettings):
     embedding_model: str = "text-embedding-3-small"
     default_max_completion_tokens: int = 16000
     default_temperature: float = 0
+    # Cache of the assistant's model responses: "disk" (SQLite) or "database" (Postgres), off when
+    # unset or "off", see app.assistants.response_cache
+    response_cache: Optional[str] = None
+    # Disk cache: the SQLite file, shared by every process using the same path
+    response_cache_path: str = ".cache/llm_responses.sqlite"
+    response_cache_ttl_seconds: float = 86400
+    response_cache_max_entries: int = 10000
+    # Least similarity, 0 to 1, of the user's words to those of a cached response with the same
+    # history for it to be reused. Unset to reuse responses to the same words only.
+    response_cache_similarity: Optional[float] = None
+
+    @field_validator("response_cache")
+    def validate_response_cache(cls, response_cache):
+        """Validate response_cache."""
+
+        valid_caches = [None, "off", "disk", "database"]
+        if response_cache not in valid_caches:
+            raise ValueError(f"Invalid response_cache: {response_cache}")
+
+        return response_cache
 
 
 # Create an AgentSettings object
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+
+from app.inventory.provider import inventory_provider
+from app.search.cache import query_cache
+
+######################################################
+## Router for the property inventory
+######################################################
+
+inventory_router = APIRouter(prefix="/inventory", tags=["Inventory"])
+
+
+@inventory_router.get("/status")
+def get_inventory_status():
+    """Source, size, version and cold start timings of the inventory, and query cache counters"""
+
+    return {**inventory_provider.stats(), "query_cache": query_cache.stats()}
+
+
+@inventory_router.post("/reload")
+def reload_inventory():
+    """Reload the inventory from its configured source"""
+
+    inventory_provider.reload()
+    return inventory_provider.stats()
@@ -6,6 +6,7 @@ from app.pages.lead_capture import capture_lead
 from app.pages.property_search import property_search
 from app.pages.appointment_booking import book_appointment
 from app.utils.auth import init_google_auth, google_login
+from app.inventory.provider import inventory_provider
 # Configure logging
 logging.basicConfig(level=logging.WARNING, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -24,6 +25,9 @@ def main():
     init_google_auth()
     initialize_session_state()
     
+    # Build the property inventory and its indexes once per process, not on the first search
+    inventory_provider.warm()
+    
     # Show lead capture, appointment booking, or property search
     if st.session_state["lead_data"] is None:
         lead = capture_lead()
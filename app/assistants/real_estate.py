@@ -1,10 +1,11 @@
 import os
 from phi.assistant import Assistant
-from phi.llm.openai import OpenAIChat
 from phi.storage.assistant.postgres import PgAssistantStorage
 from db.session import db_url
 from typing import Optional
 from app.utils.property_filters import filter_properties
+from app.assistants.response_cache import CachedOpenAIChat, get_response_cache
+from app.assistants.tools import PREFERENCE_TOOLS
 
 # Initialize storage
 real_estate_storage = PgAssistantStorage(
@@ -27,52 +28,58 @@ def get_real_estate_assistant(user_id: str) -> Assistant:
        - Property type (house, apartment, studio)
        - Location preference
        - Budget range (optional)
-       - Number of bedrooms (optional)
+       - Number of bedrooms and bathrooms (optional)
+       - Size (optional)
+       - Must-have or unwanted features (optional)
+       - Anything else they describe in their own words (optional), e.g. "quiet beachfront villa"
+       - Places they want to live close to (optional), e.g. the airport or the beach
     
-    2. ALWAYS provide a conversational response FIRST, then on a new line output any property preferences in this exact JSON format:
-       {{"property_preferences": {
-         "transaction_type": "buy/rent",
-         "property_type": "house/apartment/studio",
-         "location": "downtown/suburbs/etc",
-         "min_price": number,
-         "max_price": number,
-         "min_bedrooms": number
-       }}}
+    2. Whenever the client states or changes a preference, call update_property_preferences with
+       the fields that changed. Never write the preferences out in your reply.
     
-    3. Only include fields in the JSON that were mentioned by the user.
+    3. When they want to see listings, call search_properties and describe the best ones briefly.
     
     4. If any essential information is missing, ask about it naturally in your conversational response.
     
     5. Keep responses friendly and engaging while gathering necessary details.
+
+    6. After a "---" line, messages may end with notes the client didn't write: the preferences
+       already recorded from the message, and counts of the listings matching the current preferences
+       per transaction, type, location, bedrooms and price range. Use them to say how many listings
+       there are, and when a search has few or no matches suggest a change that has some.
+
+    7. Messages may also describe typical listings in the preferred location: median price, the
+       middle half of prices and price per sq ft. When asking for or discussing a budget, suggest
+       one in line with those prices, and say so when a budget is far below them.
+
+    8. Put alternatives in lists, e.g. "location": ["Kiti", "Meneou"] for Kiti or Meneou, and use
+       "where" for anything lists can't express, e.g. a house in Kiti or anything with a pool in Meneou is
+       {"any": [{"location": "Kiti", "property_type": "house"}, {"location": "Meneou", "feature": "pool"}]}
     
     Remember: 
-    - ALWAYS provide a conversational response before any JSON
-    - Output the preferences JSON after the response when any preferences are identified
-    - Keep track of all previously mentioned preferences and include them in the JSON"""
+    - ALWAYS provide a conversational response
+    - Record preferences with update_property_preferences as soon as they are mentioned"""
     
     return Assistant(
         name="Real Estate Assistant",
-        llm=OpenAIChat(
+        # Requests answered before are replayed from the cache, see app.assistants.response_cache
+        llm=CachedOpenAIChat(
             model="gpt-4",
             api_key=api_key,
             max_tokens=500,
-            temperature=0.7
+            temperature=0.7,
+            response_cache=get_response_cache()
         ),
         system_prompt=system_prompt + """
         IMPORTANT: Before responding, review the chat history to maintain context.
         If the user repeats information they've already provided, use it to confirm
-        and update the preferences, don't ask for it again.
-        
-        Example:
-        If user says "house" after already saying "buy", respond with both preferences:
-        {"property_preferences": {
-            "transaction_type": "buy",
-            "property_type": "house"
-        }}
+        the preferences, don't ask for it again.
         """,
         user_id=user_id,
         storage=real_estate_storage,
-        show_tool_calls=True,
+        # Preferences and searches go through tools rather than JSON in the reply
+        tools=PREFERENCE_TOOLS,
+        show_tool_calls=False,
         read_chat_history=True,
         num_history_messages=10
     )
\ No newline at end of file
@@ -0,0 +1,422 @@
+"""Cache of the assistant's model responses, in front of OpenAIChat.
+
+Opening messages and common follow-ups ("I want to rent an apartment") repeat
+across thousands of sessions, and each one used to be a model call of a few
+seconds. `CachedOpenAIChat` looks every request up in a `ResponseCache` first
+and, on a hit, replays the stored reply and tool calls as the chunks phi reads
+from the API, in a millisecond or two. Tool calls are replayed too, so a cached
+"rent an apartment" still records the preferences of the session asking. On a
+miss the stream is passed through as it arrives and stored once it finishes.
+
+A request is keyed on everything that shapes its response: the model, its
+parameters, the tools and every message of the history. Two keys are kept: one
+of the request as sent, and one with message contents normalized (case,
+whitespace and a trailing full stop or exclamation mark are ignored) and tool
+call ids, which differ on every call, left out. A request found under the
+first is an exact hit, under the second a normalized one.
+
+With a similarity set, a request found under neither may reuse the response to
+a near-duplicate: one with the same history, parameters and context whose
+user's words are that similar once embedded with `HashingEmbedder`. The words
+are the last message up to the context `with_context` adds to them, or all of
+it. This is opt-in, as words alone can be close without meaning the same: "rent
+a house" is not far from "rent an apartment".
+
+Responses older than the TTL are never used, and every EVICT_EVERY stores
+expired ones and the least recently used beyond the size bound are deleted.
+Responses live in the `llm_responses` table, in a SQLite file ("disk") or in
+Postgres ("database"), either shared by every process using it. The cache is
+off unless the agent settings choose one, and a cache that can't be opened or
+read is logged and the model asked as without it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from openai.types.chat import (
+    ChatCompletion,
+    ChatCompletionChunk,
+    ChatCompletionMessage,
+    ChatCompletionMessageToolCall,
+)
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_chunk import (
+    ChoiceDelta,
+    ChoiceDeltaToolCall,
+    ChoiceDeltaToolCallFunction,
+)
+from openai.types.chat.chat_completion_chunk import Choice as ChunkChoice
+from openai.types.chat.chat_completion_message_tool_call import Function
+from phi.llm.message import Message
+from phi.llm.openai import OpenAIChat
+from sqlalchemy import Table, delete, event, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from agents.settings import agent_settings
+from app.search.embeddings import Embedder, HashingEmbedder
+from db.tables.llm_responses import LlmResponseDB
+
+logger = logging.getLogger(__name__)
+
+llm_responses_table: Table = LlmResponseDB.__table__  # type: ignore[assignment]
+
+# Stores between two evictions, in each process
+EVICT_EVERY = 100
+# Most recently used responses with the same history compared with a near-duplicate
+MAX_CANDIDATES = 256
+# Request parameters that don't change the response
+_IGNORED = ("user", "extra_headers", "extra_query", "stream", "stream_options")
+_SPACE = re.compile(r"\s+")
+# Between the user's words and the context added for the assistant, see with_context
+CONTEXT_MARKER = "\n\n---\n"
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    """Keys of one request, see the module docstring"""
+
+    exact: str
+    normalized: str
+    # Key of the normalized request without the user's words, None unless it ends with a user message
+    scope: Optional[str]
+    # The user's words, normalized
+    prompt: str
+
+
+def _digest(value: Any) -> str:
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """`text` lower-cased, with runs of whitespace as one space and no trailing "." or "!" """
+    return _SPACE.sub(" ", text).strip().casefold().rstrip(".!").rstrip()
+
+
+def _normalize_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    message = {key: value for key, value in message.items() if key != "tool_call_id"}
+    if isinstance(message.get("content"), str):
+        message["content"] = normalize_text(message["content"])
+    if message.get("tool_calls"):
+        message["tool_calls"] = [
+            {key: value for key, value in call.items() if key != "id"} for call in message["tool_calls"]
+        ]
+    return message
+
+
+def with_context(words: str, context: str) -> str:
+    """A message of the user's `words` and `context` for the assistant, split apart again by request_key"""
+    return f"{words}{CONTEXT_MARKER}{context}" if context else words
+
+
+def request_key(request: Dict[str, Any]) -> CacheKey:
+    """Keys of a chat completions request: model, messages and the other API parameters"""
+    request = {key: value for key, value in request.items() if key not in _IGNORED}
+    messages = [_normalize_message(message) for message in request.get("messages", [])]
+    normalized = {**request, "messages": messages}
+    scope, prompt = None, ""
+    last = request["messages"][-1] if messages else {}
+    if last.get("role") == "user" and isinstance(last.get("content"), str):
+        words, marker, rest = last["content"].rpartition(CONTEXT_MARKER)
+        if not marker:
+            words, rest = rest, ""
+        prompt = normalize_text(words)
+        context = {**messages[-1], "content": normalize_text(rest)}
+        scope = _digest({**normalized, "messages": messages[:-1] + [context]})
+    return CacheKey(_digest(request), _digest(normalized), scope, prompt)
+
+
+def disk_engine(path: str) -> Engine:
+    """Engine for a SQLite file holding the `llm_responses` table, created if need be"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # SQLite has no "public" schema, tables are in the file's main one
+    engine = create_engine(f"sqlite:///{path}", execution_options={"schema_translate_map": {"public": None}})
+
+    @event.listens_for(engine, "connect")
+    def configure(connection: Any, _: Any) -> None:
+        # Readers don't wait for a writer, and commits don't wait for the disk
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+
+    llm_responses_table.create(engine, checkfirst=True)
+    return engine
+
+
+class ResponseCache:
+    """Model responses in the `llm_responses` table, see the module docstring.
+
+    A response is the reply's content, its tool calls (id, name and arguments)
+    and its finish reason, as a dict. Database errors are logged and treated as
+    misses, the assistant works the same without the cache.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        ttl_seconds: float = 86400,
+        max_entries: int = 10000,
+        similarity: Optional[float] = None,
+        embedder: Optional[Embedder] = None,
+    ):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity = similarity
+        # Prompts are embedded even with the near-duplicate tier off, so turning it on finds them
+        self.embedder = embedder or HashingEmbedder()
+        self._upsert = postgresql_insert if engine.dialect.name == "postgresql" else sqlite_insert
+        self._stores = 0
+
+    def get(self, key: CacheKey) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """The response stored for `key` and the tier it was found by: "exact", "normalized" or "similar" """
+        table = llm_responses_table
+        now = time.time()
+        fresh = table.c.created_at >= now - self.ttl_seconds
+        try:
+            with self.engine.begin() as connection:
+                row = connection.execute(
+                    select(table.c.key, table.c.exact_key, table.c.response).where(
+                        table.c.key == key.normalized, fresh
+                    )
+                ).first()
+                tier = "normalized" if row is None or row.exact_key != key.exact else "exact"
+                if row is None and self.similarity is not None and key.scope is not None and key.prompt:
+                    row, tier = self._similar(connection, key, fresh), "similar"
+                if row is None:
+                    return None
+                connection.execute(
+                    table.update()
+                    .where(table.c.key == row.key)
+                    .values(last_used_at=now, hits=table.c.hits + 1)
+                )
+        except SQLAlchemyError as error:
+            logger.warning(f"Response cache lookup failed: {error}")
+            return None
+        return tier, json.loads(row.response)
+
+    def _similar(self, connection: Any, key: CacheKey, fresh: Any) -> Any:
+        """The most similar response with the same scope, if similar enough"""
+        table = llm_responses_table
+        rows = connection.execute(
+            select(table.c.key, table.c.embedding, table.c.response)
+            .where(table.c.scope == key.scope, table.c.embedding.is_not(None), fresh)
+            .order_by(table.c.last_used_at.desc())
+            .limit(MAX_CANDIDATES)
+        ).all()
+        size = self.embedder.dimensions * 4
+        rows = [row for row in rows if len(row.embedding) == size]
+        if not rows:
+            return None
+        vectors = np.frombuffer(b"".join(row.embedding for row in rows), dtype=np.float32)
+        scores = vectors.reshape(len(rows), -1) @ self.embedder.embed([key.prompt])[0]
+        best = int(np.argmax(scores))
+        return rows[best] if scores[best] >= self.similarity else None
+
+    def put(self, key: CacheKey, response: Dict[str, Any]) -> None:
+        """Store the response to `key`, replacing any older one"""
+        table = llm_responses_table
+        now = time.time()
+        embedding = self.embedder.embed([key.prompt])[0].tobytes() if key.scope is not None else None
+        values = {
+            "key": key.normalized,
+            "exact_key": key.exact,
+            "scope": key.scope,
+            "prompt": key.prompt,
+            "embedding": embedding,
+            "response": json.dumps(response),
+            "created_at": now,
+            "last_used_at": now,
+            "hits": 0,
+        }
+        statement = self._upsert(table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={name: statement.excluded[name] for name in values if name != "key"},
+        )
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(statement)
+            self._stores += 1
+            if self._stores % EVICT_EVERY == 0:
+                self.evict()
+        except SQLAlchemyError as error:
+            logger.warning(f"Response cache store failed: {error}")
+
+    def evict(self) -> int:
+        """Delete expired responses and the least recently used beyond max_entries, returning how many"""
+        table = llm_responses_table
+        expired = delete(table).where(table.c.created_at < time.time() - self.ttl_seconds)
+        count = select(func.count()).select_from(table)
+        with self.engine.begin() as connection:
+            removed = connection.execute(expired).rowcount
+            excess = connection.execute(count).scalar_one() - self.max_entries
+            if excess > 0:
+                oldest = select(table.c.key).order_by(table.c.last_used_at).limit(excess)
+                removed += connection.execute(delete(table).where(table.c.key.in_(oldest))).rowcount
+        return removed
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide response cache set up by the agent settings, None when it is off or can't be opened"""
+    settings = agent_settings
+    if settings.response_cache in (None, "off"):
+        return None
+    try:
+        if settings.response_cache == "database":
+            from db.session import db_engine
+
+            engine = db_engine
+        else:
+            engine = disk_engine(settings.response_cache_path)
+    except (OSError, SQLAlchemyError) as error:
+        logger.warning(f"Response cache unavailable, answering without it: {error}")
+        return None
+    return ResponseCache(
+        engine,
+        ttl_seconds=settings.response_cache_ttl_seconds,
+        max_entries=settings.response_cache_max_entries,
+        similarity=settings.response_cache_similarity,
+    )
+
+
+def _empty_response() -> Dict[str, Any]:
+    return {"content": None, "tool_calls": [], "finish_reason": None}
+
+
+def _record(response: Dict[str, Any], chunk: ChatCompletionChunk) -> None:
+    """Add what a streamed chunk says to `response`"""
+    if not chunk.choices:
+        return
+    choice = chunk.choices[0]
+    if choice.delta.content:
+        response["content"] = (response["content"] or "") + choice.delta.content
+    calls: List[Dict[str, Any]] = response["tool_calls"]
+    for call in choice.delta.tool_calls or ():
+        while len(calls) <= call.index:
+            calls.append({"id": None, "name": "", "arguments": ""})
+        if call.id:
+            calls[call.index]["id"] = call.id
+        if call.function is not None:
+            calls[call.index]["name"] += call.function.name or ""
+            calls[call.index]["arguments"] += call.function.arguments or ""
+    if choice.finish_reason:
+        response["finish_reason"] = choice.finish_reason
+
+
+def _chunks(model: str, response: Dict[str, Any]) -> Iterator[ChatCompletionChunk]:
+    """A stored response as streamed chunks: the content, each tool call and the finish reason"""
+    created = int(time.time())
+
+    def chunk(delta: ChoiceDelta, finish_reason: Any = None) -> ChatCompletionChunk:
+        choice = ChunkChoice(index=0, delta=delta, finish_reason=finish_reason)
+        return ChatCompletionChunk(
+            id="cached", object="chat.completion.chunk", created=created, model=model, choices=[choice]
+        )
+
+    if response["content"] is not None:
+        yield chunk(ChoiceDelta(role="assistant", content=response["content"]))
+    for index, call in enumerate(response["tool_calls"]):
+        function = ChoiceDeltaToolCallFunction(name=call["name"], arguments=call["arguments"])
+        tool_call = ChoiceDeltaToolCall(index=index, id=call["id"], type="function", function=function)
+        yield chunk(ChoiceDelta(tool_calls=[tool_call]))
+    yield chunk(ChoiceDelta(), response["finish_reason"])
+
+
+def _completion(model: str, response: Dict[str, Any]) -> ChatCompletion:
+    """A stored response as a whole completion"""
+    tool_calls = [
+        ChatCompletionMessageToolCall(
+            id=call["id"], type="function", function=Function(name=call["name"], arguments=call["arguments"])
+        )
+        for call in response["tool_calls"]
+    ]
+    message = ChatCompletionMessage(
+        role="assistant", content=response["content"], tool_calls=tool_calls or None
+    )
+    return ChatCompletion(
+        id="cached",
+        object="chat.completion",
+        created=int(time.time()),
+        model=model,
+        choices=[Choice(index=0, message=message, finish_reason=response["finish_reason"])],
+    )
+
+
+def _response(completion: ChatCompletion) -> Dict[str, Any]:
+    """What is stored of a whole completion"""
+    choice = completion.choices[0]
+    return {
+        "content": choice.message.content,
+        "tool_calls": [
+            {"id": call.id, "name": call.function.name, "arguments": call.function.arguments}
+            for call in choice.message.tool_calls or ()
+        ],
+        "finish_reason": choice.finish_reason,
+    }
+
+
+class CachedOpenAIChat(OpenAIChat):
+    """OpenAIChat answering the requests it has answered before from a ResponseCache"""
+
+    response_cache: Optional[ResponseCache] = None
+
+    def _key(self, messages: List[Message]) -> CacheKey:
+        request = {"model": self.model, "messages": [m.to_dict() for m in messages], **self.api_kwargs}
+        return request_key(request)
+
+    def _lookup(self, messages: List[Message]) -> Tuple[Optional[CacheKey], Optional[Dict[str, Any]]]:
+        """Key of the request and the response stored for it, neither when the cache fails"""
+        assert self.response_cache is not None
+        start = time.perf_counter()
+        try:
+            key = self._key(messages)
+            found = self.response_cache.get(key)
+        except Exception as error:
+            # The cache only saves time, a failing one is a miss
+            logger.warning(f"Response cache lookup failed: {error}")
+            return None, None
+        if found is None:
+            return key, None
+        tier, response = found
+        logger.info(f"Response cache {tier} hit in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return key, response
+
+    def invoke(self, messages: List[Message]) -> ChatCompletion:
+        if self.response_cache is None:
+            return super().invoke(messages)
+        key, response = self._lookup(messages)
+        if response is not None:
+            return _completion(self.model, response)
+        completion = super().invoke(messages)
+        if key is not None and completion.choices and completion.choices[0].finish_reason:
+            self.response_cache.put(key, _response(completion))
+        return completion
+
+    def invoke_stream(self, messages: List[Message]) -> Iterator[ChatCompletionChunk]:
+        if self.response_cache is None:
+            yield from super().invoke_stream(messages)
+            return
+        key, response = self._lookup(messages)
+        if response is not None:
+            yield from _chunks(self.model, response)
+            return
+        response = _empty_response()
+        for chunk in super().invoke_stream(messages):
+            _record(response, chunk)
+            yield chunk
+        # Only a finished reply is stored, not one cut short by an error or the reader stopping
+        if key is not None and response["finish_reason"] is not None:
+            self.response_cache.put(key, response)
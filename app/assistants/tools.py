@@ -0,0 +1,185 @@
+"""Tools the real estate assistant calls to set preferences and search listings.
+
+Instead of appending hand-formatted JSON to its reply for the chat to scrape
+back out, the assistant calls `update_property_preferences`, whose arguments
+are checked against the `PropertyPreferences` schema, and `search_properties`
+to show the listings matching them and hear what they are. Both run in the
+session that sent the message while the reply streams, so the sidebar and the
+carousel follow as soon as the call arrives. Arguments failing validation are
+not applied, the model gets back what was wrong with them so it can call again.
+"""
+
+import json
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from phi.tools import Function
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+from app.models.property import FEATURES, POINTS_OF_INTEREST, PROPERTY_TYPES, Property
+from app.search.conditions import parse_condition
+from app.utils.preferences import (
+    apply_preferences,
+    get_matching_properties,
+    get_missing_preferences,
+    is_preferences_complete,
+)
+from app.utils.property_filters import fetch_page
+
+# One value, or any of several values
+Choice = Optional[Union[str, List[str]]]
+
+
+class PropertyPreferences(BaseModel):
+    """The client's property preferences, only the fields they mentioned; null clears a field"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    transaction_type: Optional[Literal["buy", "rent"]] = None
+    property_type: Choice = Field(None, description=f"One of {', '.join(PROPERTY_TYPES)}, or a list of them")
+    location: Choice = Field(None, description="A location, or a list of locations any of which will do")
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_bedrooms: Optional[int] = None
+    max_bedrooms: Optional[int] = None
+    min_bathrooms: Optional[int] = None
+    max_bathrooms: Optional[int] = None
+    min_square_feet: Optional[float] = Field(None, description="Square metres times 10.76")
+    max_square_feet: Optional[float] = Field(None, description="Square metres times 10.76")
+    required_features: Optional[List[str]] = Field(None, description=f"From: {', '.join(FEATURES)}")
+    excluded_features: Optional[List[str]] = Field(None, description="Unwanted features, same names")
+    keywords: Optional[str] = Field(
+        None, description='Anything else they describe in their own words, e.g. "quiet beachfront villa"'
+    )
+    where: Optional[Dict[str, Any]] = Field(
+        None,
+        description=(
+            'Combinations lists cannot express: {"location": "Kiti"} tests a field, {"feature": "pool"} '
+            'a feature, {"any": [...]}, {"all": [...]} and {"not": {...}} combine conditions'
+        ),
+    )
+    near: Optional[str] = Field(
+        None,
+        description=(
+            f"A place they want to be close to: {', '.join(poi.name for poi in POINTS_OF_INTEREST)}, "
+            f"a kind of place ({', '.join(sorted({poi.kind for poi in POINTS_OF_INTEREST}))}, the nearest "
+            "one counts) or a location"
+        ),
+    )
+    within_km: Optional[float] = Field(
+        None,
+        description='Distance from "near", 2 for "close to", 1 for "walking distance", unset for just closer',
+    )
+
+    @field_validator("where")
+    @classmethod
+    def _parses(cls, where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """A condition that doesn't parse is rejected here, not stored to fail every search"""
+        if where is not None:
+            parse_condition(where)
+        return where
+
+
+class SearchRequest(BaseModel):
+    """How many of the best matches to describe"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    limit: int = Field(3, ge=1, le=10)
+
+
+def _parameters(model: type[BaseModel]) -> Dict[str, Any]:
+    """JSON schema of `model` for a tool's parameters, trimmed as it is sent with every message.
+
+    Drops the titles and null defaults pydantic adds to every field and the null
+    alternative of optional fields, which are left out of `required` anyway.
+    """
+
+    def trimmed(schema: Any) -> Any:
+        if isinstance(schema, list):
+            return [trimmed(value) for value in schema]
+        if not isinstance(schema, dict):
+            return schema
+        schema = {
+            key: trimmed(value)
+            for key, value in schema.items()
+            if key != "title" and not (key == "default" and value is None)
+        }
+        alternatives = [value for value in schema.get("anyOf", ()) if value != {"type": "null"}]
+        if len(alternatives) == 1:
+            del schema["anyOf"]
+            schema.update(alternatives[0])
+        elif alternatives:
+            schema["anyOf"] = alternatives
+        return schema
+
+    return trimmed(model.model_json_schema())
+
+
+def _listing(listing: Property) -> Dict[str, Any]:
+    """What the assistant is told about one listing"""
+    return {
+        "id": listing.id,
+        "title": listing.title,
+        "type": listing.type,
+        "transaction_type": listing.transaction_type,
+        "price": listing.price,
+        "location": listing.location,
+        "bedrooms": listing.bedrooms,
+        "bathrooms": listing.bathrooms,
+        "square_feet": listing.square_feet,
+        "features": list(listing.feature_list),
+    }
+
+
+def _errors(error: ValidationError) -> str:
+    """The problems with a tool's arguments, one short line each"""
+    problems = [f"{'.'.join(map(str, problem['loc']))}: {problem['msg']}" for problem in error.errors()]
+    return json.dumps({"error": "Invalid arguments, nothing was changed", "problems": problems})
+
+
+def update_property_preferences(**arguments: Any) -> str:
+    """Apply the preferences, returning the fields that changed, those still missing and the match count"""
+    try:
+        preferences = PropertyPreferences.model_validate(arguments).model_dump(exclude_unset=True)
+    except ValidationError as error:
+        return _errors(error)
+    result: Dict[str, Any] = {"updated": apply_preferences(preferences), "missing": get_missing_preferences()}
+    if is_preferences_complete():
+        result["matches"] = get_matching_properties().total
+    return json.dumps(result)
+
+
+def search_properties(**arguments: Any) -> str:
+    """Show the listings matching the current preferences and return the best few"""
+    try:
+        request = SearchRequest.model_validate(arguments)
+    except ValidationError as error:
+        return _errors(error)
+    handle = get_matching_properties()
+    listings = list(fetch_page(handle))[: request.limit] if handle.total else []
+    return json.dumps({"matches": handle.total, "listings": [_listing(listing) for listing in listings]})
+
+
+PREFERENCE_TOOLS: List[Function] = [
+    Function(
+        name="update_property_preferences",
+        description=(
+            "Record the client's property preferences whenever they state or change any. "
+            "Pass only the fields that changed; earlier ones are kept."
+        ),
+        parameters=_parameters(PropertyPreferences),
+        entrypoint=update_property_preferences,
+        # Arguments are plain JSON, phi's sanitizing would rewrite "True" or "None" inside keywords
+        sanitize_arguments=False,
+    ),
+    Function(
+        name="search_properties",
+        description=(
+            "Show the client the listings matching their recorded preferences, "
+            "and get the number of matches and the best few listings"
+        ),
+        parameters=_parameters(SearchRequest),
+        entrypoint=search_properties,
+        sanitize_arguments=False,
+    ),
+]
@@ -1,13 +1,35 @@
 import streamlit as st
 import json
 import logging
+import time
+from dataclasses import dataclass
 from app.assistants.real_estate import get_real_estate_assistant
-from app.utils.preferences import is_preferences_complete, display_matching_properties, get_matching_properties
-from typing import Optional
+from app.assistants.response_cache import with_context
+from app.utils.preferences import (
+    PREFERENCE_FIELDS, apply_preferences, is_preferences_complete, display_matching_properties,
+    get_matching_properties, get_missing_preferences, has_preferences, get_facet_counts, get_market_context
+)
+from app.utils.preference_extractor import describe_preferences, extract_preferences
+from app.utils.reply_parser import JsonObject, ReplyEvent, ReplyParser, parse_reply
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from app.components.property_carousel import display_property_carousel
 
 logger = logging.getLogger(__name__)
 
+# Least time between two repaints of a streaming reply, in seconds
+REPAINT_INTERVAL = 0.05
+CURSOR = "▌"
+
+@dataclass
+class TurnTiming:
+    """How long one assistant reply took, in seconds from sending the message"""
+
+    first_token: Optional[float] = None
+    first_paint: Optional[float] = None
+    first_json: Optional[float] = None
+    total: float = 0.0
+    chunks: int = 0
+
 def initialize_chat(user_id: str):
     """Initialize chat state"""
     if "assistant" not in st.session_state:
@@ -16,61 +38,102 @@ def initialize_chat(user_id: str):
         st.session_state.messages = [
             {"role": "assistant", "content": "Hi! I'm here to help you find your perfect property. What kind of property are you looking for?"}
         ]
-    if "current_properties" not in st.session_state:
-        st.session_state.current_properties = None
+    if "property_page" not in st.session_state:
+        st.session_state.property_page = None
+
+def reply_preferences(reply_json: JsonObject) -> Optional[dict]:
+    """The preferences in a JSON object of the reply, None if it holds none"""
+    preferences = reply_json.value.get("property_preferences")
+    return preferences if isinstance(preferences, dict) else None
 
 def process_preferences_json(json_text: str) -> tuple[bool, str, Optional[str]]:
     """Process JSON preferences from assistant response and return (has_json, message, json_str)"""
-    try:
-        # Look for JSON object anywhere in the text
-        json_start = json_text.find('{')
-        if json_start == -1:
-            return False, json_text, None
-            
-        # Find complete JSON object
-        brace_count = 0
-        json_end = -1
-        for i in range(json_start, len(json_text)):
-            if json_text[i] == '{':
-                brace_count += 1
-            elif json_text[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    json_end = i + 1
-                    break
-        
-        if json_end == -1:
-            return False, json_text, None
-            
-        # Split message and JSON
-        message = json_text[:json_start].strip()
-        json_str = json_text[json_start:json_end].strip()
-        
-        try:
-            prefs = json.loads(json_str)
-        except json.JSONDecodeError:
-            return False, json_text, None
-        
-        if "property_preferences" in prefs:
-            updated_fields = []
-            for key, value in prefs["property_preferences"].items():
-                if key in ["transaction_type", "property_type", "location", 
-                         "min_price", "max_price", "min_bedrooms"]:
-                    if st.session_state.get(key) != value:
-                        st.session_state[key] = value
-                        updated_fields.append(f"{key}: {value}")
-            
-            if updated_fields:
-                st.toast(
-                    "Updated preferences:\n" + "\n".join(updated_fields),
-                    icon="✅"
-                )
-                
-            return True, message, json_str
-                
-    except Exception as e:
-        logger.debug(f"Error processing preferences: {e}")
-    return False, json_text, None
+    message, json_strs = "", []
+    for event in parse_reply(json_text):
+        preferences = reply_preferences(event) if isinstance(event, JsonObject) else None
+        if preferences is None:
+            message += event.text
+        else:
+            apply_preferences(preferences)
+            json_strs.append(event.text)
+    if not json_strs:
+        return False, json_text, None
+    return True, message.strip(), "\n".join(json_strs)
+
+def stream_reply(
+    deltas: Iterable[str],
+    render: Callable[[str], object],
+    on_json: Optional[Callable[[JsonObject], bool]] = None,
+    clock: Callable[[], float] = time.perf_counter
+) -> Tuple[str, List[str], TurnTiming]:
+    """Render a reply as it streams in and return its conversational text, JSON objects and timing.
+
+    Each JSON object is passed to `on_json` as soon as its closing brace arrives,
+    while the rest of the reply is still streaming. Objects it returns True for
+    are taken out of the reply, the others are shown like the prose around them.
+    Only the prose is shown, with a cursor while it grows. Repaints are at most
+    every REPAINT_INTERVAL seconds, except the first one, so the first words show
+    up as soon as the model sends them.
+    """
+    start = clock()
+    timing = TurnTiming()
+    parser = ReplyParser()
+    prose = shown = ""
+    json_strs: List[str] = []
+    last_paint: Optional[float] = None
+
+    def take(events: List[ReplyEvent]) -> str:
+        text = ""
+        for event in events:
+            if isinstance(event, JsonObject) and on_json is not None and on_json(event):
+                json_strs.append(event.text)
+                if timing.first_json is None:
+                    timing.first_json = clock() - start
+            else:
+                text += event.text
+        return text
+
+    for delta in deltas:
+        if not delta:
+            continue
+        now = clock() - start
+        if timing.first_token is None:
+            timing.first_token = now
+        timing.chunks += 1
+        prose += take(parser.feed(delta))
+        text = prose.rstrip()
+        if text != shown and (last_paint is None or now - last_paint >= REPAINT_INTERVAL):
+            render(text + CURSOR)
+            shown, last_paint = text, now
+            if timing.first_paint is None:
+                timing.first_paint = now
+    prose += take(parser.close())
+    timing.total = clock() - start
+    return prose.strip(), json_strs, timing
+
+def quick_reply(preferences: dict) -> str:
+    """Reply to a message that only stated `preferences`, once they are applied"""
+    reply = f"Noted: {describe_preferences(preferences)}."
+    missing = get_missing_preferences()
+    if missing:
+        return f"{reply} Could you tell me your {missing[0]}?"
+    handle = st.session_state.get("property_page")
+    if handle is not None and handle.total:
+        return f"{reply} I found {handle.total:,} matching properties, have a look below."
+    return f"{reply} Nothing matches that yet, a wider budget or another location would help."
+
+def assistant_messages(context: str) -> List[Dict[str, str]]:
+    """The last few messages of the chat as the assistant gets them, the user's last one replaced by `context`
+
+    The assistant only reads `messages` when given, the message passed along with them is dropped.
+    """
+    # Only what was said, search handles and timings are for the page
+    messages = [
+        {"role": message["role"], "content": message["content"]}
+        for message in st.session_state.messages[-6:] if message.get("content")
+    ]
+    messages[-1] = {"role": "user", "content": context}
+    return messages
 
 def display_chat_interface():
     """Display and handle chat interface"""
@@ -93,49 +156,100 @@ def display_chat_interface():
         
         with st.chat_message("assistant"):
             response_container = st.empty()
-            full_response = ""
+            preferences_before = {key: st.session_state.get(key) for key in PREFERENCE_FIELDS}
+            page_before = st.session_state.get("property_page")
+            
+            # Plainly stated preferences are applied, and searched, before the assistant is asked
+            extraction = extract_preferences(prompt)
+            if extraction.preferences:
+                apply_preferences(extraction.preferences)
+                if is_preferences_complete():
+                    get_matching_properties()
             
+            # Tell the assistant what the current preferences match, so it can steer away from empty searches
+            notes = []
+            if extraction.preferences:
+                recorded = describe_preferences(extraction.preferences)
+                notes.append(f"Already recorded from this message: {recorded}")
+            if has_preferences():
+                notes.append("Listings matching the current preferences:\n" + get_facet_counts().summary())
+            market = get_market_context()
+            if market:
+                notes.append("Typical listings in the preferred location:\n" + market)
+            context = with_context(prompt, "\n\n".join(notes))
+
+            # The assistant sets preferences and searches through tool calls while it streams,
+            # see app.assistants.tools. Preferences JSON in the reply is applied as soon as it closes.
+            def on_json(reply_json: JsonObject) -> bool:
+                preferences = reply_preferences(reply_json)
+                if preferences is None:
+                    return False
+                apply_preferences(preferences)
+                if is_preferences_complete():
+                    get_matching_properties()
+                return True
+
             try:
-                for delta in st.session_state.assistant.run(
-                    prompt,
-                    stream=True,
-                    messages=st.session_state.messages[-6:],
-                    user_id=st.session_state.get('lead_data', {}).get('name', 'anonymous')
-                ):
-                    full_response += delta
+                json_strs: List[str] = []
+                if extraction.complete:
+                    # The message only stated preferences, answer it without a round trip to the assistant
+                    message, timing = quick_reply(extraction.preferences), TurnTiming()
+                else:
+                    message, json_strs, timing = stream_reply(
+                        st.session_state.assistant.run(
+                            context,
+                            stream=True,
+                            messages=assistant_messages(context),
+                            user_id=st.session_state.get('lead_data', {}).get('name', 'anonymous')
+                        ),
+                        response_container.markdown,
+                        on_json
+                    )
+                    logger.info(
+                        f"Assistant reply: first token {timing.first_token or 0:.2f}s, "
+                        f"first paint {timing.first_paint or 0:.2f}s, "
+                        f"preferences {timing.first_json or 0:.2f}s, "
+                        f"total {timing.total:.2f}s, {timing.chunks} chunks"
+                    )
+                
+                updated = {
+                    key: st.session_state.get(key) for key in PREFERENCE_FIELDS
+                    if st.session_state.get(key) != preferences_before[key]
+                }
+                handle = st.session_state.get("property_page")
                 
-                # Process message and JSON separately but only display message
-                has_json, message, json_str = process_preferences_json(full_response)
-                if has_json:
+                # Only display the message, the preferences were applied while streaming
+                if json_strs or updated or handle is not page_before:
                     if message:  # Only update message if we have conversational content
                         response_container.markdown(message)
+                    else:
+                        response_container.empty()
                     
-                    message_data = {
+                    message_data: dict = {
                         "role": "assistant",
                         "content": message if message else None,
-                        "json": json_str
+                        "json": "\n".join(json_strs) or json.dumps({"property_preferences": updated}),
+                        "timing": timing
                     }
                     
-                    # If preferences are complete, update properties
-                    if is_preferences_complete():
-                        properties = get_matching_properties()
-                        if properties:
-                            st.session_state.current_properties = properties
-                            message_data["properties"] = properties
+                    # If a search ran, show the properties found
+                    if handle is not page_before and handle is not None and handle.total:
+                        message_data["property_page"] = handle
                     
                     st.session_state.messages.append(message_data)
                 else:
-                    response_container.markdown(full_response)
+                    response_container.markdown(message)
                     st.session_state.messages.append({
                         "role": "assistant",
-                        "content": full_response
+                        "content": message,
+                        "timing": timing
                     })
             except Exception as e:
                 logger.error(f"Error processing response: {e}")
                 response_container.error("I encountered an error processing your request.")
     
     # Display property carousel at the bottom if properties exist
-    if st.session_state.current_properties:
+    if st.session_state.property_page and st.session_state.property_page.total:
         st.markdown("---")  # Add a visual separator
         
         # Add toggle for carousel visibility
@@ -151,4 +265,4 @@ def display_chat_interface():
         
         if st.session_state.show_properties:
             with st.container():
-                display_property_carousel(st.session_state.current_properties)
\ No newline at end of file
+                display_property_carousel()
\ No newline at end of file
@@ -1,8 +1,14 @@
 import streamlit as st
 from app.models.property import Property
 from app.components.property_card import display_property_card
-from app.utils.preferences import is_preferences_complete
-from app.utils.property_filters import filter_properties
+from app.utils.preferences import (
+    is_preferences_complete, is_current_search, get_matching_properties, open_page, get_facet_counts,
+    describe_condition
+)
+
+def _choices(value) -> str:
+    """A preference that may be one value or a list of alternatives, for display"""
+    return value if isinstance(value, str) else " or ".join(value)
 
 def display_preferences_sidebar():
     """Display property cards in the sidebar"""
@@ -16,17 +22,27 @@ def display_preferences_sidebar():
             st.session_state.location,
             st.session_state.min_price,
             st.session_state.max_price,
-            st.session_state.min_bedrooms
+            st.session_state.min_bedrooms,
+            st.session_state.max_bedrooms,
+            st.session_state.min_bathrooms,
+            st.session_state.max_bathrooms,
+            st.session_state.min_square_feet,
+            st.session_state.max_square_feet,
+            st.session_state.required_features,
+            st.session_state.excluded_features,
+            st.session_state.keywords,
+            st.session_state.where,
+            st.session_state.near
         ]):
             # Create a formatted display of current preferences
             if st.session_state.transaction_type:
-                st.markdown(f"🔄 **Transaction:** {st.session_state.transaction_type.capitalize()}")
+                st.markdown(f"🔄 **Transaction:** {_choices(st.session_state.transaction_type).capitalize()}")
             
             if st.session_state.property_type:
-                st.markdown(f"🏠 **Property Type:** {st.session_state.property_type.capitalize()}")
+                st.markdown(f"🏠 **Property Type:** {_choices(st.session_state.property_type).capitalize()}")
             
             if st.session_state.location:
-                st.markdown(f"📍 **Location:** {st.session_state.location}")
+                st.markdown(f"📍 **Location:** {_choices(st.session_state.location)}")
             
             if st.session_state.min_price or st.session_state.max_price:
                 price_range = []
@@ -39,6 +55,43 @@ def display_preferences_sidebar():
             if st.session_state.min_bedrooms:
                 st.markdown(f"🛏️ **Min Bedrooms:** {st.session_state.min_bedrooms}")
             
+            if st.session_state.max_bedrooms:
+                st.markdown(f"🛏️ **Max Bedrooms:** {st.session_state.max_bedrooms}")
+            
+            if st.session_state.min_bathrooms or st.session_state.max_bathrooms:
+                bathrooms = []
+                if st.session_state.min_bathrooms:
+                    bathrooms.append(f"at least {st.session_state.min_bathrooms}")
+                if st.session_state.max_bathrooms:
+                    bathrooms.append(f"at most {st.session_state.max_bathrooms}")
+                st.markdown(f"🚿 **Bathrooms:** {', '.join(bathrooms)}")
+            
+            if st.session_state.min_square_feet or st.session_state.max_square_feet:
+                size_range = []
+                if st.session_state.min_square_feet:
+                    size_range.append(f"{st.session_state.min_square_feet:,.0f} sq ft")
+                if st.session_state.max_square_feet:
+                    size_range.append(f"{st.session_state.max_square_feet:,.0f} sq ft")
+                st.markdown(f"📐 **Size:** {' - '.join(size_range)}")
+            
+            if st.session_state.required_features:
+                st.markdown(f"✅ **Must Have:** {', '.join(st.session_state.required_features)}")
+            
+            if st.session_state.excluded_features:
+                st.markdown(f"🚫 **Exclude:** {', '.join(st.session_state.excluded_features)}")
+
+            if st.session_state.keywords:
+                st.markdown(f"🔎 **Keywords:** {st.session_state.keywords}")
+
+            if st.session_state.where and describe_condition(st.session_state.where):
+                st.markdown(f"🧩 **Also:** {describe_condition(st.session_state.where)}")
+
+            if st.session_state.near:
+                near = st.session_state.near
+                if st.session_state.within_km:
+                    near += f", within {st.session_state.within_km:g} km"
+                st.markdown(f"📌 **Near:** {near}")
+            
             st.markdown("---")
         else:
             st.info("Start chatting to set your preferences!")
@@ -47,18 +100,30 @@ def display_preferences_sidebar():
         # Original matching properties section
         st.header("Matching Properties 🏠")
         
-        # Check if preferences are complete and filter properties
+        # Check if preferences are complete, only search again when they changed
         if is_preferences_complete():
-            properties = filter_properties(
-                transaction_type=st.session_state.transaction_type,
-                property_type=st.session_state.property_type,
-                location=st.session_state.location,
-                min_price=st.session_state.min_price,
-                max_price=st.session_state.max_price,
-                min_bedrooms=st.session_state.min_bedrooms
-            )
+            handle = st.session_state.property_page
+            if not is_current_search(handle):
+                handle = get_matching_properties()
+            properties = st.session_state.page_properties
             
             if properties:
+                first = handle.cursor + 1
+                st.caption(f"Best matches {first:,}-{first + len(properties) - 1:,} of {handle.total:,}")
+                with st.expander("📊 Breakdown"):
+                    for line in get_facet_counts().summary().splitlines()[1:]:
+                        st.markdown(line)
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("← Previous", key="prev_sidebar", disabled=not handle.has_previous):
+                        open_page(handle.previous())
+                        st.session_state.carousel_index = 0
+                        st.rerun()
+                with col2:
+                    if st.button("Next →", key="next_sidebar", disabled=not handle.has_next):
+                        open_page(handle.next())
+                        st.session_state.carousel_index = 0
+                        st.rerun()
                 for property in properties:
                     with st.container():
                         st.markdown("""
@@ -93,9 +158,8 @@ def display_preferences_sidebar():
                             with st.expander("View Details"):
                                 st.write(property.description)
                                 st.markdown("**Features:**")
-                                for feature, value in property.features.items():
-                                    if value:
-                                        st.markdown(f"✓ {feature.capitalize()}")
+                                for feature in property.feature_list:
+                                    st.markdown(f"✓ {feature.capitalize()}")
                             
                             st.markdown('</div>', unsafe_allow_html=True)
             else:
@@ -53,9 +53,8 @@ def display_property_card(property: Property):
                 st.markdown("**Features:**")
                 # Create a grid of features
                 feature_cols = st.columns(2)
-                for idx, (feature, value) in enumerate(property.features.items()):
-                    if value:
-                        with feature_cols[idx % 2]:
-                            st.markdown(f"✓ {feature.capitalize()}")
+                for idx, feature in enumerate(property.feature_list):
+                    with feature_cols[idx % 2]:
+                        st.markdown(f"✓ {feature.capitalize()}")
             
             st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
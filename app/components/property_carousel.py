@@ -1,15 +1,17 @@
 import streamlit as st
-from app.models.property import Property
-from typing import List
+from app.utils.preferences import open_page
+from app.utils.property_filters import similar_properties
 
-def display_property_carousel(properties: List[Property]):
-    """Display properties in a carousel format"""
-    if not properties:
+def display_property_carousel():
+    """Display the current page of matching properties in a carousel format"""
+    handle = st.session_state.get("property_page")
+    properties = st.session_state.get("page_properties")
+    if handle is None or not properties:
         st.info("No properties match your current preferences.")
         return
 
-    # Initialize carousel index in session state if not present
-    if "carousel_index" not in st.session_state:
+    # Initialize carousel index in session state if not present, it counts within the page
+    if "carousel_index" not in st.session_state or st.session_state.carousel_index >= len(properties):
         st.session_state.carousel_index = 0
 
     st.markdown("""
@@ -89,16 +91,31 @@ def display_property_carousel(properties: List[Property]):
     # Navigation overlay
     with col1:
         if st.button("←", key="prev_main", use_container_width=True):
-            st.session_state.carousel_index = (st.session_state.carousel_index - 1) % len(properties)
+            if st.session_state.carousel_index > 0:
+                st.session_state.carousel_index -= 1
+            else:
+                # Step back to the previous page, wrapping around to the last one
+                open_page(handle.previous() if handle.has_previous else handle.last())
+                st.session_state.carousel_index = len(st.session_state.page_properties) - 1
             st.rerun()
     
     with col2:
         st.markdown(f'<img src="{property.image_url}" class="property-image">', unsafe_allow_html=True)
-        st.markdown(f'<div style="text-align: center; font-size: 0.8rem; color: #666;">Property {st.session_state.carousel_index + 1} of {len(properties)}</div>', unsafe_allow_html=True)
+        position = handle.cursor + st.session_state.carousel_index + 1
+        st.markdown(
+            f'<div style="text-align: center; font-size: 0.8rem; color: #666;">'
+            f'Property {position} of {handle.total:,}</div>',
+            unsafe_allow_html=True
+        )
     
     with col3:
         if st.button("→", key="next_main", use_container_width=True):
-            st.session_state.carousel_index = (st.session_state.carousel_index + 1) % len(properties)
+            if st.session_state.carousel_index < len(properties) - 1:
+                st.session_state.carousel_index += 1
+            else:
+                # Move on to the next page, already fetched ahead, wrapping around to the first one
+                open_page(handle.next() if handle.has_next else handle.first())
+                st.session_state.carousel_index = 0
             st.rerun()
 
     # Property details
@@ -111,12 +128,20 @@ def display_property_carousel(properties: List[Property]):
     # Details section with proper markdown
     with st.expander("✨ View Details"):
         st.write(property.description)
-        if property.features:
+        if property.feature_mask:
             st.markdown("### Features")
             cols = st.columns(2)
-            for idx, (feature, has_feature) in enumerate(property.features.items()):
-                if has_feature:
-                    with cols[idx % 2]:
-                        st.markdown(f"✓ {feature.capitalize()}")
+            for idx, feature in enumerate(property.feature_list):
+                with cols[idx % 2]:
+                    st.markdown(f"✓ {feature.capitalize()}")
+
+    # Comparable listings, only searched while the toggle is on
+    if st.toggle("🔁 More like this", key="show_similar"):
+        for similar in similar_properties(property.id):
+            st.markdown(
+                f'<div class="property-details">{similar.title} • €{similar.price:,.0f} • '
+                f'📍 {similar.location} • 🛏️ {similar.bedrooms} beds</div>',
+                unsafe_allow_html=True
+            )
     
     st.markdown('</div>', unsafe_allow_html=True) 
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""Listings stored in the Postgres `properties` table.
+
+Searches are pushed down to SQL and paged with keyset cursors on `(price, id)`:
+each page continues from the last listing of the previous one, so page 1,000
+costs the same as page 1, unlike OFFSET which reads and discards every earlier
+row. The in-memory store stays in front as a cache, see `load_store` and the
+"database" inventory source.
+"""
+
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import ColumnElement, Select, Table, and_, func, literal, not_, or_, select, tuple_
+from sqlalchemy.engine import Engine
+
+from app.inventory.store import FEATURE_MASK_DTYPE, CategoricalColumn, PropertyStore, with_centres
+from app.models.property import EARTH_RADIUS_KM, FEATURE_BITS, Property, features_mask
+from db.tables.properties import PropertyDB
+from app.search.conditions import AllOf, AnyOf, Condition, Not, grouped_terms
+from app.search.places import bounding_box, place_points
+from app.search.query import PropertyQuery
+from app.search.text import tokenize
+
+properties_table: Table = PropertyDB.__table__  # type: ignore[assignment]
+
+_COLUMNS = [
+    "id",
+    "title",
+    "type",
+    "transaction_type",
+    "price",
+    "location",
+    "bedrooms",
+    "bathrooms",
+    "square_feet",
+    "description",
+    "image_url",
+    "feature_mask",
+    "amenities",
+    "latitude",
+    "longitude",
+]
+# A word of four or more characters ending in a single "s", which `tokenize` folds to the singular
+_PLURAL = r"([a-z0-9]{2,}[a-rt-z0-9])s\M"
+
+
+@dataclass(frozen=True)
+class ListingCursor:
+    """Position after the last listing of a page, in (price, id) order"""
+
+    price: float
+    id: int
+
+
+@dataclass
+class ListingPage:
+    properties: List[Property]
+    next_cursor: Optional[ListingCursor]
+
+
+def _bits(mask: int) -> List[int]:
+    return [1 << i for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+def _condition(condition: Condition) -> ColumnElement:
+    """Translate a normalized `Condition` with the same semantics as `PropertyStore.condition_mask`"""
+    c = properties_table.c
+    if isinstance(condition, Not):
+        return not_(_condition(condition.condition))
+    any_of = isinstance(condition, AnyOf)
+    children = condition.conditions if isinstance(condition, (AllOf, AnyOf)) else [condition]
+    values, others = grouped_terms(children)
+    clauses = [_condition(child) for child in others]
+    columns = {"transaction_type": c.transaction_type, "property_type": c.type, "location": c.location}
+    for field, field_values in values.items():
+        if field == "feature":
+            wanted = features_mask(field_values)
+            features = c.feature_mask.op("&")(wanted)
+            clauses.append(features != 0 if any_of else features == wanted)
+        elif any_of:
+            clauses.append(func.lower(columns[field]).in_(field_values))
+        else:
+            clauses += [func.lower(columns[field]) == value for value in field_values]
+    return or_(*clauses) if any_of else and_(*clauses)
+
+
+def _within(place: str, radius_km: float) -> ColumnElement:
+    """Listings within `radius_km` of `place`, like `within_mask`: a bounding box, then the haversine"""
+    c = properties_table.c
+    clauses = []
+    for latitude, longitude in place_points(place).tolist():
+        south, west, north, east = bounding_box(latitude, longitude, radius_km)
+        half_dlat = func.radians(c.latitude - latitude) / 2
+        half_dlon = func.radians(c.longitude - longitude) / 2
+        a = func.power(func.sin(half_dlat), 2) + func.cos(func.radians(c.latitude)) * func.cos(
+            func.radians(latitude)
+        ) * func.power(func.sin(half_dlon), 2)
+        distance = 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1.0)))
+        clauses.append(
+            and_(c.latitude.between(south, north), c.longitude.between(west, east), distance <= radius_km)
+        )
+    return or_(*clauses)
+
+
+def _conditions(query: PropertyQuery) -> List[ColumnElement]:
+    """Translate `query` into SQL predicates with the same semantics as `PropertyStore.mask`"""
+    c = properties_table.c
+    conditions: List[ColumnElement] = []
+    if query.transaction_type:
+        # Inlined rather than bound so the planner can match the partial indexes on it
+        conditions.append(
+            func.lower(c.transaction_type) == literal(query.transaction_type.lower(), literal_execute=True)
+        )
+    if query.property_type:
+        conditions.append(func.lower(c.type) == query.property_type.lower())
+    if query.location:
+        conditions.append(func.lower(c.location) == query.location.lower())
+    if query.min_price is not None:
+        conditions.append(c.price >= query.min_price)
+    if query.max_price is not None:
+        conditions.append(c.price <= query.max_price)
+    for column, low, high in (
+        (c.bedrooms, query.min_bedrooms, query.max_bedrooms),
+        (c.bathrooms, query.min_bathrooms, query.max_bathrooms),
+        (c.square_feet, query.min_square_feet, query.max_square_feet),
+    ):
+        if low is not None:
+            conditions.append(column >= low)
+        if high is not None:
+            conditions.append(column <= high)
+    # One predicate per feature bit, each matching the statistics the migration keeps on it
+    for bit in _bits(features_mask(query.required_features)):
+        conditions.append(c.feature_mask.op("&")(bit) == bit)
+    for bit in _bits(features_mask(query.excluded_features)):
+        conditions.append(c.feature_mask.op("&")(bit) == 0)
+    terms = set(tokenize(query.keywords)) if query.keywords else set()
+    if terms:
+        # Any word may match as a whole word once plurals are folded, as in `TextIndex.matching`
+        text = func.lower(func.replace(c.title + " " + c.description, "_", " "))
+        document = func.to_tsvector("simple", func.regexp_replace(text, _PLURAL, r"\1", "g"))
+        words = " | ".join(sorted(terms))
+        matches: ColumnElement[bool] = document.op("@@")(func.to_tsquery("simple", words))
+        # Feature names count as part of the document, whether or not the description lists them
+        named = [name for name in FEATURE_BITS if terms & set(tokenize(name.replace("_", " ")))]
+        if named:
+            matches = or_(matches, c.feature_mask.op("&")(features_mask(named)) != 0)
+        conditions.append(matches)
+    if query.where is not None:
+        conditions.append(_condition(query.where))
+    if query.near and query.within_km is not None:
+        conditions.append(_within(query.near, query.within_km))
+    return conditions
+
+
+def _rows(store: PropertyStore, start: int, end: int) -> Iterator[Tuple[Any, ...]]:
+    """Rows `start:end` of `store` as plain Python values, in `_COLUMNS` order"""
+
+    def strings(column: CategoricalColumn) -> List[str]:
+        return [column.categories[code] for code in column.codes[start:end].tolist()]
+
+    def coordinates(values: np.ndarray) -> List[Optional[float]]:
+        # NaN, a listing in a location without coordinates, is stored as NULL
+        return [None if math.isnan(value) else value for value in values[start:end].tolist()]
+
+    amenities: Sequence[Optional[str]] = [None] * (end - start)
+    if store.amenities is not None:
+        amenities = [None if a is None else json.dumps(a) for a in store.amenities[start:end]]
+    return zip(
+        store.ids[start:end].tolist(),
+        strings(store.title),
+        strings(store.type),
+        strings(store.transaction_type),
+        store.price[start:end].tolist(),
+        strings(store.location),
+        store.bedrooms[start:end].tolist(),
+        store.bathrooms[start:end].tolist(),
+        store.square_feet[start:end].tolist(),
+        store.description[start:end],
+        strings(store.image_url),
+        store.features[start:end].tolist(),
+        amenities,
+        coordinates(store.latitude),
+        coordinates(store.longitude),
+    )
+
+
+def _to_property(row: Any) -> Property:
+    return Property(**row._mapping)
+
+
+class PropertyRepository:
+    """Reads and writes listings in the `properties` table"""
+
+    def __init__(self, engine: Optional[Engine] = None):
+        if engine is None:
+            from db.session import db_engine
+
+            engine = db_engine
+        self.engine = engine
+
+    def replace(self, store: PropertyStore, batch_size: int = 50_000) -> int:
+        """Replace every listing with the contents of `store` in one transaction, using COPY"""
+        columns = ", ".join(_COLUMNS)
+        with self.engine.begin() as connection:
+            connection.execute(properties_table.delete())
+            cursor = connection.connection.driver_connection.cursor()  # type: ignore[union-attr]
+            with cursor.copy(f"COPY {properties_table.fullname} ({columns}) FROM STDIN") as copy:
+                for start in range(0, len(store), batch_size):
+                    for row in _rows(store, start, min(start + batch_size, len(store))):
+                        copy.write_row(row)
+            connection.exec_driver_sql(f"ANALYZE {properties_table.fullname}")
+        return len(store)
+
+    def select(self, query: PropertyQuery) -> Select:
+        """Statement returning the listings matching `query`, in (price, id) order"""
+        return (
+            select(*(properties_table.c[name] for name in _COLUMNS))
+            .where(*_conditions(query))
+            .order_by(properties_table.c.price, properties_table.c.id)
+        )
+
+    def count(self, query: PropertyQuery) -> int:
+        """Number of listings matching `query`"""
+        statement = select(func.count()).select_from(properties_table).where(*_conditions(query))
+        with self.engine.connect() as connection:
+            return connection.execute(statement).scalar_one()
+
+    def search(
+        self, query: PropertyQuery, limit: int = 20, after: Optional[ListingCursor] = None
+    ) -> ListingPage:
+        """One page of listings matching `query`, continuing after `after` when given"""
+        statement = self.select(query)
+        if after is not None:
+            c = properties_table.c
+            # The redundant price bound gives the planner a selectivity it can estimate
+            statement = statement.where(
+                c.price >= after.price, tuple_(c.price, c.id) > tuple_(after.price, after.id)
+            )
+        # One extra row tells whether there is a next page
+        with self.engine.connect() as connection:
+            rows = connection.execute(statement.limit(limit + 1)).all()
+        properties = [_to_property(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = properties[-1]
+            next_cursor = ListingCursor(price=last.price, id=last.id)
+        return ListingPage(properties=properties, next_cursor=next_cursor)
+
+    def get(self, property_id: int) -> Optional[Property]:
+        """The listing with `property_id`, or None"""
+        statement = self.select(PropertyQuery()).where(properties_table.c.id == property_id)
+        with self.engine.connect() as connection:
+            row = connection.execute(statement).first()
+        return _to_property(row) if row is not None else None
+
+    def load_store(self, batch_size: int = 100_000) -> PropertyStore:
+        """Read every listing into an in-memory store, in id order"""
+        values: Dict[str, List[Any]] = {name: [] for name in _COLUMNS}
+        statement = select(*(properties_table.c[name] for name in _COLUMNS)).order_by(properties_table.c.id)
+        with self.engine.connect() as connection:
+            result = connection.execution_options(yield_per=batch_size).execute(statement)
+            for partition in result.partitions():
+                for name, column in zip(_COLUMNS, zip(*partition)):
+                    values[name].extend(column)
+
+        amenities = values["amenities"]
+        location = CategoricalColumn.encode(values["location"])
+        # NULL coordinates come back as NaN and are placed at their location's centre
+        latitude, longitude = with_centres(
+            location,
+            np.array(values["latitude"], dtype=np.float64),
+            np.array(values["longitude"], dtype=np.float64),
+        )
+        return PropertyStore(
+            ids=np.array(values["id"], dtype=np.int64),
+            type=CategoricalColumn.encode(values["type"]),
+            transaction_type=CategoricalColumn.encode(values["transaction_type"]),
+            location=location,
+            price=np.array(values["price"], dtype=np.float64),
+            bedrooms=np.array(values["bedrooms"], dtype=np.int16),
+            bathrooms=np.array(values["bathrooms"], dtype=np.int16),
+            square_feet=np.array(values["square_feet"], dtype=np.float64),
+            title=CategoricalColumn.encode(values["title"]),
+            image_url=CategoricalColumn.encode(values["image_url"]),
+            description=values["description"],
+            features=np.array(values["feature_mask"], dtype=FEATURE_MASK_DTYPE),
+            amenities=amenities if any(a is not None for a in amenities) else None,
+            latitude=latitude,
+            longitude=longitude,
+        )
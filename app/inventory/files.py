@@ -0,0 +1,56 @@
+import json
+from typing import List
+
+from app.inventory.store import FEATURE_MASK_DTYPE, CategoricalColumn, PropertyStore
+from app.models.property import Property
+
+
+def read_jsonl(path: str) -> PropertyStore:
+    """Load listings written by `write_jsonl`, one JSON object per line"""
+    properties: List[Property] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                properties.append(Property(**json.loads(line)))
+    return PropertyStore.from_properties(properties)
+
+
+def read_parquet(path: str) -> PropertyStore:
+    """Load listings written by `write_parquet`"""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+
+    def categorical(name: str) -> CategoricalColumn:
+        column = table.column(name).combine_chunks().dictionary_encode()
+        return CategoricalColumn(column.indices.to_numpy(), column.dictionary.to_pylist())
+
+    def numeric(name: str, dtype=None):
+        values = table.column(name).to_numpy()
+        return values if dtype is None else values.astype(dtype)
+
+    return PropertyStore(
+        ids=numeric("id", "int64"),
+        type=categorical("type"),
+        transaction_type=categorical("transaction_type"),
+        location=categorical("location"),
+        price=numeric("price", "float64"),
+        bedrooms=numeric("bedrooms", "int16"),
+        bathrooms=numeric("bathrooms", "int16"),
+        square_feet=numeric("square_feet", "float64"),
+        title=categorical("title"),
+        image_url=categorical("image_url"),
+        description=table.column("description").to_pylist(),
+        features=numeric("feature_mask", FEATURE_MASK_DTYPE),
+        latitude=numeric("latitude", "float64") if "latitude" in table.column_names else None,
+        longitude=numeric("longitude", "float64") if "longitude" in table.column_names else None,
+    )
+
+
+def read_inventory(path: str) -> PropertyStore:
+    """Load an inventory file, picking the reader from the file extension"""
+    if path.endswith(".parquet"):
+        return read_parquet(path)
+    if path.endswith(".jsonl"):
+        return read_jsonl(path)
+    raise ValueError(f"Unsupported inventory file: {path}")
@@ -0,0 +1,275 @@
+"""Deterministic, vectorized synthetic inventory for load testing.
+
+Columns are drawn a chunk at a time with NumPy, following the same distributions
+as `generate_sample_properties`. Chunk `k` is drawn from its own generator seeded
+with `(seed, k)`, so a given `(count, seed, chunk_size)` always produces the same
+inventory, whether it is kept in memory or streamed to a file.
+
+Usage: python -m app.inventory.generator --count 1000000 --seed 42 --output inventory.parquet
+"""
+
+import argparse
+import json
+import time
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.inventory.store import FEATURE_MASK_DTYPE, CategoricalColumn, PropertyStore
+from app.models.property import (
+    CYPRUS_LOCATIONS,
+    DEFAULT_LOCATION_SPREAD_KM,
+    DESCRIPTION_TEMPLATES,
+    FEATURES,
+    KM_PER_DEGREE,
+    LOCATION_COORDINATES,
+    LOCATION_SPREAD_KM,
+    PROPERTY_IMAGES,
+    PROPERTY_TYPES,
+    render_description,
+)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+TYPE_NAMES = list(PROPERTY_TYPES)
+TRANSACTION_TYPES = ["buy", "rent"]
+AREA_DESCRIPTIONS = ["", "Central ", "Beachfront ", "Downtown ", "Suburban "]
+
+# Every title a listing can get, grouped by type then title template then area
+TITLES = [
+    template.format(area).strip()
+    for name in TYPE_NAMES
+    for template in PROPERTY_TYPES[name]["titles"]
+    for area in AREA_DESCRIPTIONS
+]
+_TITLES_PER_TYPE = np.array([len(PROPERTY_TYPES[name]["titles"]) for name in TYPE_NAMES])
+_TITLE_OFFSETS = np.concatenate(([0], np.cumsum(_TITLES_PER_TYPE * len(AREA_DESCRIPTIONS))[:-1]))
+
+IMAGE_URLS = [f"{url}?w=800" for name in TYPE_NAMES for url in PROPERTY_IMAGES[name]]
+_IMAGES_PER_TYPE = np.array([len(PROPERTY_IMAGES[name]) for name in TYPE_NAMES])
+_IMAGE_OFFSETS = np.concatenate(([0], np.cumsum(_IMAGES_PER_TYPE)[:-1]))
+
+# Price bands indexed by [type code, transaction code], matching TRANSACTION_TYPES order
+_PRICE_LOW = np.array([[PROPERTY_TYPES[t][f"min_price_{x}"] for x in TRANSACTION_TYPES] for t in TYPE_NAMES])
+_PRICE_HIGH = np.array([[PROPERTY_TYPES[t][f"max_price_{x}"] for x in TRANSACTION_TYPES] for t in TYPE_NAMES])
+_SIZE_LOW = np.array([PROPERTY_TYPES[t]["min_size"] for t in TYPE_NAMES])
+_SIZE_HIGH = np.array([PROPERTY_TYPES[t]["max_size"] for t in TYPE_NAMES])
+
+_FEATURE_PROBABILITIES = np.array(list(FEATURES.values()))
+_FEATURE_BITS = (1 << np.arange(len(FEATURES))).astype(FEATURE_MASK_DTYPE)
+
+# Centre and spread of each location, indexed by location code
+_CENTRE_LATITUDE = np.array([LOCATION_COORDINATES[name][0] for name in CYPRUS_LOCATIONS])
+_CENTRE_LONGITUDE = np.array([LOCATION_COORDINATES[name][1] for name in CYPRUS_LOCATIONS])
+_SPREAD_KM = np.array([LOCATION_SPREAD_KM.get(name, DEFAULT_LOCATION_SPREAD_KM) for name in CYPRUS_LOCATIONS])
+
+_STUDIO = TYPE_NAMES.index("studio")
+_RENT = TRANSACTION_TYPES.index("rent")
+
+
+class DescriptionColumn(Sequence[str]):
+    """Descriptions rendered on read from the row's template, type, location and features"""
+
+    def __init__(
+        self,
+        type: CategoricalColumn,
+        location: CategoricalColumn,
+        features: np.ndarray,
+        templates: np.ndarray,
+    ):
+        self.type = type
+        self.location = location
+        self.features = features
+        self.templates = templates
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def __getitem__(self, row):  # type: ignore[override]
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return render_description(
+            self.type[row], self.location[row], int(self.features[row]), int(self.templates[row])
+        )
+
+
+def _generate_chunk(rng: np.random.Generator, start_id: int, count: int) -> PropertyStore:
+    """Draw `count` listings with ids starting at `start_id`"""
+    type_codes = rng.integers(0, len(TYPE_NAMES), count).astype(np.uint8)
+    transaction_codes = rng.integers(0, len(TRANSACTION_TYPES), count).astype(np.uint8)
+    location_codes = rng.integers(0, len(CYPRUS_LOCATIONS), count).astype(np.uint8)
+
+    # Rents round to the nearest ten, sale prices to the nearest thousand
+    low = _PRICE_LOW[type_codes, transaction_codes]
+    high = _PRICE_HIGH[type_codes, transaction_codes]
+    price = rng.uniform(low, high)
+    price = np.where(transaction_codes == _RENT, np.round(price, -1), np.round(price, -3))
+
+    has_feature = rng.random((count, len(FEATURES))) < _FEATURE_PROBABILITIES
+    features = (has_feature * _FEATURE_BITS).sum(axis=1, dtype=FEATURE_MASK_DTYPE)
+
+    bedrooms = np.where(type_codes == _STUDIO, 1, rng.integers(1, 5, count)).astype(np.int16)
+    bathrooms = np.minimum(bedrooms, rng.integers(1, 4, count)).astype(np.int16)
+    square_feet = np.round(rng.uniform(_SIZE_LOW[type_codes], _SIZE_HIGH[type_codes]), 1)
+
+    title_index = (rng.random(count) * _TITLES_PER_TYPE[type_codes]).astype(np.int64)
+    area_index = rng.integers(0, len(AREA_DESCRIPTIONS), count)
+    title_codes = _TITLE_OFFSETS[type_codes] + title_index * len(AREA_DESCRIPTIONS) + area_index
+    image_index = (rng.random(count) * _IMAGES_PER_TYPE[type_codes]).astype(np.int64)
+    image_codes = _IMAGE_OFFSETS[type_codes] + image_index
+    templates = rng.integers(0, len(DESCRIPTION_TEMPLATES), count).astype(np.uint8)
+
+    # Drawn last so the other columns stay as they were before listings had coordinates
+    spread = _SPREAD_KM[location_codes]
+    latitude = _CENTRE_LATITUDE[location_codes] + rng.uniform(-spread, spread) / KM_PER_DEGREE
+    longitude_km = KM_PER_DEGREE * np.cos(np.radians(latitude))
+    longitude = _CENTRE_LONGITUDE[location_codes] + rng.uniform(-spread, spread) / longitude_km
+
+    type = CategoricalColumn(type_codes, TYPE_NAMES)
+    location = CategoricalColumn(location_codes, CYPRUS_LOCATIONS)
+    return PropertyStore(
+        ids=np.arange(start_id, start_id + count, dtype=np.int64),
+        type=type,
+        transaction_type=CategoricalColumn(transaction_codes, TRANSACTION_TYPES),
+        location=location,
+        price=price,
+        bedrooms=bedrooms,
+        bathrooms=bathrooms,
+        square_feet=square_feet,
+        title=CategoricalColumn(title_codes.astype(np.uint8), TITLES),
+        image_url=CategoricalColumn(image_codes.astype(np.uint8), IMAGE_URLS),
+        description=DescriptionColumn(type, location, features, templates),
+        features=features,
+        latitude=np.round(latitude, 6),
+        longitude=np.round(longitude, 6),
+    )
+
+
+def iter_inventory_chunks(
+    count: int, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE, start_id: int = 1
+) -> Iterator[PropertyStore]:
+    """Yield the inventory as consecutive stores of at most `chunk_size` listings"""
+    for chunk, offset in enumerate(range(0, count, chunk_size)):
+        rng = np.random.default_rng([seed, chunk])
+        yield _generate_chunk(rng, start_id + offset, min(chunk_size, count - offset))
+
+
+def generate_inventory(
+    count: int, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE, start_id: int = 1
+) -> PropertyStore:
+    """Generate `count` listings as a single store"""
+    chunks = list(iter_inventory_chunks(count, seed, chunk_size, start_id))
+    if len(chunks) <= 1:
+        # No listings at all is a chunk of none
+        return chunks[0] if chunks else _generate_chunk(np.random.default_rng([seed, 0]), start_id, 0)
+
+    def categorical(name: str, categories: List[str]) -> CategoricalColumn:
+        return CategoricalColumn(np.concatenate([getattr(c, name).codes for c in chunks]), categories)
+
+    type = categorical("type", TYPE_NAMES)
+    location = categorical("location", CYPRUS_LOCATIONS)
+    features = np.concatenate([c.features for c in chunks])
+    templates = np.concatenate([c.description.templates for c in chunks])  # type: ignore[attr-defined]
+    return PropertyStore(
+        ids=np.concatenate([c.ids for c in chunks]),
+        type=type,
+        transaction_type=categorical("transaction_type", TRANSACTION_TYPES),
+        location=location,
+        price=np.concatenate([c.price for c in chunks]),
+        bedrooms=np.concatenate([c.bedrooms for c in chunks]),
+        bathrooms=np.concatenate([c.bathrooms for c in chunks]),
+        square_feet=np.concatenate([c.square_feet for c in chunks]),
+        title=categorical("title", TITLES),
+        image_url=categorical("image_url", IMAGE_URLS),
+        description=DescriptionColumn(type, location, features, templates),
+        features=features,
+        latitude=np.concatenate([c.latitude for c in chunks]),
+        longitude=np.concatenate([c.longitude for c in chunks]),
+    )
+
+
+def write_jsonl(path: str, count: int, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Stream the inventory to a JSON Lines file, one listing per line"""
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in iter_inventory_chunks(count, seed, chunk_size):
+            f.writelines(
+                json.dumps(
+                    {
+                        "id": int(chunk.ids[row]),
+                        "title": chunk.title[row],
+                        "type": chunk.type[row],
+                        "transaction_type": chunk.transaction_type[row],
+                        "price": float(chunk.price[row]),
+                        "location": chunk.location[row],
+                        "bedrooms": int(chunk.bedrooms[row]),
+                        "bathrooms": int(chunk.bathrooms[row]),
+                        "square_feet": float(chunk.square_feet[row]),
+                        "description": chunk.description[row],
+                        "image_url": chunk.image_url[row],
+                        "feature_mask": int(chunk.features[row]),
+                        "latitude": float(chunk.latitude[row]),
+                        "longitude": float(chunk.longitude[row]),
+                    }
+                )
+                + "\n"
+                for row in range(len(chunk))
+            )
+
+
+def write_parquet(path: str, count: int, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Stream the inventory to a Parquet file, one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def categorical(column: CategoricalColumn) -> pa.DictionaryArray:
+        return pa.DictionaryArray.from_arrays(column.codes, column.categories)
+
+    writer: Optional[pq.ParquetWriter] = None
+    try:
+        for chunk in iter_inventory_chunks(count, seed, chunk_size):
+            table = pa.table(
+                {
+                    "id": chunk.ids,
+                    "title": categorical(chunk.title),
+                    "type": categorical(chunk.type),
+                    "transaction_type": categorical(chunk.transaction_type),
+                    "price": chunk.price,
+                    "location": categorical(chunk.location),
+                    "bedrooms": chunk.bedrooms,
+                    "bathrooms": chunk.bathrooms,
+                    "square_feet": chunk.square_feet,
+                    "description": pa.array(list(chunk.description), pa.string()),
+                    "image_url": categorical(chunk.image_url),
+                    "feature_mask": chunk.features,
+                    "latitude": chunk.latitude,
+                    "longitude": chunk.longitude,
+                }
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic property inventory")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--output", required=True, help="Path ending in .parquet or .jsonl")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.output.endswith(".parquet"):
+        write_parquet(args.output, args.count, args.seed, args.chunk_size)
+    elif args.output.endswith(".jsonl"):
+        write_jsonl(args.output, args.count, args.seed, args.chunk_size)
+    else:
+        parser.error("--output must end in .parquet or .jsonl")
+    print(f"Wrote {args.count:,} listings to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
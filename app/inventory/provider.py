@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+from functools import cached_property
+from typing import Dict, Optional, Tuple
+
+from app.inventory.settings import InventorySettings, inventory_settings
+from app.inventory.store import PropertyStore
+from app.search.embeddings import get_embedder
+from app.search.facets import FacetIndex
+from app.search.indexes import PropertyIndexes
+from app.search.market import MarketStats
+from app.search.planner import QueryPlanner
+from app.search.similar import SimilarListings
+from app.search.vectors import SemanticIndex
+
+logger = logging.getLogger(__name__)
+
+
+class Inventory:
+    """A loaded inventory: the store, its search structures and a version that changes on reload"""
+
+    def __init__(
+        self,
+        version: int,
+        store: PropertyStore,
+        indexes: Optional[PropertyIndexes] = None,
+        settings: InventorySettings = inventory_settings,
+    ):
+        self.version = version
+        self.store = store
+        self._indexes = indexes
+        self.settings = settings
+
+    @cached_property
+    def planner(self) -> QueryPlanner:
+        return QueryPlanner(self.store, self._indexes)
+
+    @cached_property
+    def facet_index(self) -> FacetIndex:
+        return FacetIndex(self.store)
+
+    @cached_property
+    def market_stats(self) -> MarketStats:
+        return MarketStats.from_store(self.store)
+
+    @cached_property
+    def semantic_index(self) -> SemanticIndex:
+        # Embedding every listing is slow, so it is left out of warm and done on the first semantic search
+        embedder = get_embedder(self.settings.listing_embedder, self.settings.embedding_dimensions)
+        return SemanticIndex(self.store, embedder)
+
+    @cached_property
+    def similar(self) -> SimilarListings:
+        # Built on the first "more like this" request, most sessions never ask for one
+        return SimilarListings(self.store)
+
+    def warm(self) -> None:
+        """Build every search structure up front"""
+        for name in ("planner", "facet_index", "market_stats"):
+            getattr(self, name)
+
+    def follow(self, previous: "Inventory") -> None:
+        """Update what was built for the inventory this one replaces, rather than building it again"""
+        if "market_stats" in previous.__dict__:
+            self.market_stats = previous.market_stats.refreshed(previous.store, self.store)
+
+
+class InventoryProvider:
+    """Owns the process-wide property inventory.
+
+    Nothing is built until the inventory is first needed. The lifecycle is:
+      - load: read listings from the configured source (generator, file, snapshot or database)
+      - warm: build the search structures so the first query pays nothing extra
+      - reload: build and warm a fresh inventory off to the side, then swap it in
+
+    Readers take `provider.current` once per request and keep using that inventory,
+    so a concurrent reload never changes data underneath them. A snapshot source
+    is remapped when its file has been replaced. A database source is cached in
+    memory until the next reload.
+    """
+
+    def __init__(self, settings: InventorySettings = inventory_settings):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._inventory: Optional[Inventory] = None
+        self._version = 0
+        self.timings: Dict[str, float] = {}
+        # Identity of the snapshot file currently mapped, and when it was last checked
+        self._snapshot_id: Optional[Tuple[int, int]] = None
+        self._snapshot_checked = 0.0
+
+    def _path(self) -> str:
+        if not self.settings.inventory_path:
+            source = self.settings.inventory_source
+            raise ValueError(f"INVENTORY_PATH must be set when INVENTORY_SOURCE is {source}")
+        return self.settings.inventory_path
+
+    def _snapshot_file_id(self) -> Tuple[int, int]:
+        stat = os.stat(self._path())
+        return stat.st_dev, stat.st_ino
+
+    def _load(self) -> Tuple[PropertyStore, Optional[PropertyIndexes]]:
+        if self.settings.inventory_source == "snapshot":
+            from app.inventory.snapshot import read_snapshot
+
+            self._snapshot_id = self._snapshot_file_id()
+            self._snapshot_checked = time.monotonic()
+            return read_snapshot(self._path())
+
+        if self.settings.inventory_source == "database":
+            from app.inventory.database import PropertyRepository
+
+            return PropertyRepository().load_store(), None
+
+        if self.settings.inventory_source == "file":
+            from app.inventory.files import read_inventory
+
+            return read_inventory(self._path()), None
+
+        from app.inventory.generator import generate_inventory
+
+        return generate_inventory(self.settings.inventory_size, seed=self.settings.inventory_seed), None
+
+    def _build(self) -> Inventory:
+        start = time.perf_counter()
+        store, indexes = self._load()
+        self.timings = {"load_seconds": time.perf_counter() - start}
+        logger.info(
+            f"Loaded {len(store):,} listings from {self.settings.inventory_source} "
+            f"in {self.timings['load_seconds']:.3f}s"
+        )
+        self._version += 1
+        return Inventory(version=self._version, store=store, indexes=indexes, settings=self.settings)
+
+    def _snapshot_check_due(self) -> bool:
+        return time.monotonic() - self._snapshot_checked >= self.settings.inventory_refresh_seconds
+
+    def _snapshot_replaced(self) -> bool:
+        """Whether the snapshot file was swapped since it was mapped, checked at most every few seconds"""
+        if not self._snapshot_check_due():
+            return False
+        self._snapshot_checked = time.monotonic()
+        try:
+            return self._snapshot_file_id() != self._snapshot_id
+        except FileNotFoundError:
+            return False
+
+    def _warm(self, inventory: Inventory) -> None:
+        start = time.perf_counter()
+        inventory.warm()
+        self.timings["warm_seconds"] = time.perf_counter() - start
+        logger.info(f"Warmed inventory version {inventory.version} in {self.timings['warm_seconds']:.3f}s")
+
+    @property
+    def loaded(self) -> bool:
+        return self._inventory is not None
+
+    @property
+    def current(self) -> Inventory:
+        """The current inventory, loaded on first access"""
+        inventory = self._inventory
+        if inventory is None:
+            with self._lock:
+                if self._inventory is None:
+                    self._inventory = self._build()
+                inventory = self._inventory
+        elif self.settings.inventory_source == "snapshot" and self._snapshot_check_due():
+            with self._lock:
+                # Checked under the lock, so concurrent requests seeing a replaced file reload it once
+                if self._snapshot_replaced():
+                    inventory = self._swap()
+                elif self._inventory is not None:
+                    # Whatever a request holding the lock before this one swapped in
+                    inventory = self._inventory
+        return inventory
+
+    def load(self) -> Inventory:
+        """Load the inventory if it is not loaded yet"""
+        return self.current
+
+    def warm(self) -> Inventory:
+        """Load the inventory and build everything a first search would need"""
+        inventory = self.current
+        if "warm_seconds" not in self.timings:
+            self._warm(inventory)
+        return inventory
+
+    def reload(self) -> Inventory:
+        """Rebuild and warm the inventory from its source, then swap it in"""
+        with self._lock:
+            return self._swap()
+
+    def _swap(self) -> Inventory:
+        """Build and warm a fresh inventory and make it current, with the lock held"""
+        inventory = self._build()
+        if self._inventory is not None:
+            inventory.follow(self._inventory)
+        self._warm(inventory)
+        self._inventory = inventory
+        return inventory
+
+    def stats(self) -> dict:
+        """Source, size, version and cold start timings of the current inventory"""
+        inventory = self._inventory
+        return {
+            "source": self.settings.inventory_source,
+            "loaded": inventory is not None,
+            "version": inventory.version if inventory else None,
+            "listings": len(inventory.store) if inventory else 0,
+            **self.timings,
+        }
+
+
+# Process-wide provider
+inventory_provider = InventoryProvider()
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from pydantic import field_validator
+from pydantic_settings import BaseSettings
+
+
+class InventorySettings(BaseSettings):
+    """Inventory settings that can be set using environment variables.
+
+    Reference: https://docs.pydantic.dev/latest/usage/pydantic_settings/
+    """
+
+    # Where listings come from: "generator", "file", "snapshot" or "database"
+    inventory_source: str = "generator"
+    # Generator source: number of listings and the seed they are drawn from
+    inventory_size: int = 100
+    inventory_seed: int = 0
+    # File source: a .parquet or .jsonl file, see app.inventory.generator
+    # Snapshot source: a memory-mapped snapshot, see app.inventory.snapshot
+    inventory_path: Optional[str] = None
+    # How often a snapshot source checks whether its file was replaced, in seconds
+    inventory_refresh_seconds: float = 5.0
+    # Memory budget of the search result cache, see app.search.cache
+    query_cache_mb: float = 64.0
+    # Embedder behind semantic listing search, "hashing" or "openai", see app.search.embeddings
+    listing_embedder: str = "hashing"
+    embedding_dimensions: int = 128
+
+    @field_validator("inventory_source")
+    def validate_inventory_source(cls, inventory_source):
+        """Validate inventory_source."""
+
+        valid_sources = ["generator", "file", "snapshot", "database"]
+        if inventory_source not in valid_sources:
+            raise ValueError(f"Invalid inventory_source: {inventory_source}")
+
+        return inventory_source
+
+    @field_validator("listing_embedder")
+    def validate_listing_embedder(cls, listing_embedder):
+        """Validate listing_embedder."""
+
+        valid_embedders = ["hashing", "openai"]
+        if listing_embedder not in valid_embedders:
+            raise ValueError(f"Invalid listing_embedder: {listing_embedder}")
+
+        return listing_embedder
+
+
+# Create InventorySettings object
+inventory_settings = InventorySettings()
@@ -0,0 +1,228 @@
+"""Versioned, memory-mapped binary inventory snapshots.
+
+A snapshot is a single file:
+
+    preamble   magic (8 bytes) | format version (uint32) | header length (uint32) | header offset (uint64)
+    arrays     raw little-endian column and index arrays, each aligned to 64 bytes
+    header     JSON: row count, array dtypes/offsets/lengths, categorical dictionaries
+
+Workers open it with a read-only mmap and wrap every array in place with
+`np.frombuffer`, so startup costs one small JSON parse whatever the inventory
+size, and the pages are shared between processes through the OS page cache.
+Prebuilt search indexes are stored alongside the columns.
+
+Snapshots are replaced atomically: a new file is written next to the old one and
+renamed over it. Processes that still map the old file keep reading it until
+they remap.
+
+Usage: python -m app.inventory.snapshot --output inventory.snap [--input inventory.parquet]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.inventory.generator import DescriptionColumn
+from app.inventory.store import CategoricalColumn, PropertyStore
+from app.search.indexes import PropertyIndexes
+
+MAGIC = b"RESNAP\x00\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sIIQ")
+_CATEGORICAL_COLUMNS = ["type", "transaction_type", "location", "title", "image_url"]
+_NUMERIC_COLUMNS = [
+    "ids",
+    "price",
+    "bedrooms",
+    "bathrooms",
+    "square_feet",
+    "features",
+    "latitude",
+    "longitude",
+]
+
+
+class StringColumn(Sequence[str]):
+    """Variable-length strings stored as an offsets array into a UTF-8 buffer, decoded on read"""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def encode(cls, values: Sequence[str]) -> "StringColumn":
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):  # type: ignore[override]
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return self.data[int(self.offsets[row]) : int(self.offsets[row + 1])].tobytes().decode("utf-8")
+
+
+class JsonColumn(Sequence[Any]):
+    """JSON values stored in a `StringColumn`, decoded on read"""
+
+    def __init__(self, strings: StringColumn):
+        self.strings = strings
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getitem__(self, row):  # type: ignore[override]
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return json.loads(self.strings[row])
+
+
+def _store_arrays(store: PropertyStore) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Flatten a store into named arrays plus the metadata needed to rebuild it"""
+    arrays: Dict[str, np.ndarray] = {name: getattr(store, name) for name in _NUMERIC_COLUMNS}
+    meta: Dict[str, Any] = {"categories": {}}
+    for name in _CATEGORICAL_COLUMNS:
+        column: CategoricalColumn = getattr(store, name)
+        arrays[f"{name}.codes"] = column.codes
+        meta["categories"][name] = column.categories
+
+    # Generated descriptions are kept as template codes and rendered on read
+    if isinstance(store.description, DescriptionColumn):
+        meta["description"] = "templates"
+        arrays["description.templates"] = store.description.templates
+    else:
+        meta["description"] = "strings"
+        strings = StringColumn.encode(store.description)
+        arrays["description.offsets"], arrays["description.data"] = strings.offsets, strings.data
+
+    if store.amenities is not None:
+        strings = StringColumn.encode([json.dumps(amenities) for amenities in store.amenities])
+        arrays["amenities.offsets"], arrays["amenities.data"] = strings.offsets, strings.data
+    return arrays, meta
+
+
+def write_snapshot(path: str, store: PropertyStore, indexes: Optional[PropertyIndexes] = None) -> None:
+    """Write `store` and its indexes to `path`, atomically replacing any existing snapshot"""
+    arrays, meta = _store_arrays(store)
+    for name, array in (indexes or PropertyIndexes(store)).arrays().items():
+        arrays[f"index.{name}"] = array
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\x00" * _PREAMBLE.size)
+            layout: Dict[str, Dict[str, Any]] = {}
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+                f.write(b"\x00" * (-f.tell() % ALIGNMENT))
+                layout[name] = {"dtype": array.dtype.str, "offset": f.tell(), "length": len(array)}
+                f.write(array.tobytes())
+
+            header = json.dumps({"rows": len(store), "arrays": layout, **meta}).encode("utf-8")
+            header_offset = f.tell()
+            f.write(header)
+            f.seek(0)
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header), header_offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot(path: str) -> Tuple[PropertyStore, PropertyIndexes]:
+    """Map a snapshot read-only and wrap its arrays without copying them"""
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_length, header_offset = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Not an inventory snapshot: {path}")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported inventory snapshot version {version} in {path}")
+    header = json.loads(buffer[header_offset : header_offset + header_length])
+
+    def array(name: str) -> np.ndarray:
+        spec = header["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        return np.frombuffer(buffer, dtype=dtype, count=spec["length"], offset=spec["offset"])
+
+    def categorical(name: str) -> CategoricalColumn:
+        return CategoricalColumn(array(f"{name}.codes"), header["categories"][name])
+
+    type, location = categorical("type"), categorical("location")
+    features = array("features")
+    description: Sequence[str]
+    if header["description"] == "templates":
+        description = DescriptionColumn(type, location, features, array("description.templates"))
+    else:
+        description = StringColumn(array("description.offsets"), array("description.data"))
+    amenities = None
+    if "amenities.offsets" in header["arrays"]:
+        amenities = JsonColumn(StringColumn(array("amenities.offsets"), array("amenities.data")))
+    # Snapshots written before listings had coordinates place them at their location's centre
+    latitude = array("latitude") if "latitude" in header["arrays"] else None
+    longitude = array("longitude") if "longitude" in header["arrays"] else None
+
+    store = PropertyStore(
+        ids=array("ids"),
+        type=type,
+        transaction_type=categorical("transaction_type"),
+        location=location,
+        price=array("price"),
+        bedrooms=array("bedrooms"),
+        bathrooms=array("bathrooms"),
+        square_feet=array("square_feet"),
+        title=categorical("title"),
+        image_url=categorical("image_url"),
+        description=description,
+        features=features,
+        amenities=amenities,
+        latitude=latitude,
+        longitude=longitude,
+    )
+    index_arrays = {
+        name[len("index.") :]: array(name) for name in header["arrays"] if name.startswith("index.")
+    }
+    return store, PropertyIndexes(store, index_arrays)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Write a memory-mapped inventory snapshot")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--input", help="A .parquet or .jsonl inventory file, generated when omitted")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.input:
+        from app.inventory.files import read_inventory
+
+        store = read_inventory(args.input)
+    else:
+        from app.inventory.generator import generate_inventory
+
+        store = generate_inventory(args.count, seed=args.seed)
+    write_snapshot(args.output, store)
+    print(f"Wrote {len(store):,} listings to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
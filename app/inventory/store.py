@@ -0,0 +1,316 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+import numpy as np
+
+from app.models.property import FEATURES, LOCATION_COORDINATES, Property, features_mask
+from app.search.conditions import AllOf, AnyOf, Condition, Not, grouped_terms
+from app.search.places import within_mask
+from app.search.query import PropertyQuery
+
+
+# Smallest unsigned integer holding one bit per feature
+FEATURE_MASK_DTYPE = np.uint16 if len(FEATURES) <= 16 else np.uint32 if len(FEATURES) <= 32 else np.uint64
+
+
+# Values tested one comparison each by `CategoricalColumn.mask_any`, more go through a lookup table
+_MAX_COMPARISONS = 8
+
+
+def _code_dtype(cardinality: int) -> type:
+    """Smallest unsigned integer type able to hold `cardinality` codes"""
+    if cardinality <= np.iinfo(np.uint8).max + 1:
+        return np.uint8
+    if cardinality <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    return np.uint32
+
+
+def _coordinate(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class CategoricalColumn:
+    """Dictionary-encoded string column: one small integer code per row"""
+
+    def __init__(self, codes: np.ndarray, categories: Sequence[str]):
+        self.codes = codes
+        self.categories = list(categories)
+        # Lookups are case-insensitive, several spellings may share a folded key
+        self._folded: Dict[str, List[int]] = {}
+        for code, category in enumerate(self.categories):
+            self._folded.setdefault(category.lower(), []).append(code)
+
+    @classmethod
+    def encode(cls, values: Iterable[str]) -> "CategoricalColumn":
+        """Build a column from raw values, assigning codes in order of first appearance"""
+        lookup: Dict[str, int] = {}
+        codes = [lookup.setdefault(value, len(lookup)) for value in values]
+        return cls(np.asarray(codes, dtype=_code_dtype(len(lookup))), list(lookup))
+
+    def codes_for(self, value: str) -> List[int]:
+        """Return the codes whose category matches `value`, ignoring case"""
+        return self._folded.get(value.lower(), [])
+
+    def mask(self, value: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean mask of the rows equal to `value`, ignoring case.
+
+        When `rows` is given only those rows are tested and the mask is aligned with them.
+        """
+        codes = self.codes if rows is None else self.codes[rows]
+        matches = self.codes_for(value)
+        if len(matches) == 1:
+            return codes == matches[0]
+        return np.isin(codes, matches)
+
+    def mask_any(self, values: Iterable[str], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean mask of the rows equal to any of `values`, ignoring case"""
+        codes = self.codes if rows is None else self.codes[rows]
+        matches = [code for value in values for code in self.codes_for(value)]
+        if len(matches) > _MAX_COMPARISONS:
+            wanted = np.zeros(len(self.categories), dtype=bool)
+            wanted[matches] = True
+            return np.take(wanted, codes)
+        mask = np.zeros(len(codes), dtype=bool)
+        for code in matches:
+            mask |= codes == code
+        return mask
+
+    def __getitem__(self, row: int) -> str:
+        return self.categories[self.codes[row]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def location_centres(location: CategoricalColumn) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitude and longitude of each row's location centre, NaN for locations without coordinates"""
+    centres = {name.lower(): centre for name, centre in LOCATION_COORDINATES.items()}
+    known = [centres.get(category.lower(), (np.nan, np.nan)) for category in location.categories]
+    latitude, longitude = np.array(known, dtype=np.float64).reshape(-1, 2).T
+    return latitude[location.codes], longitude[location.codes]
+
+
+def with_centres(
+    location: CategoricalColumn, latitude: np.ndarray, longitude: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """`latitude` and `longitude` with the rows missing either set to their location's centre"""
+    missing = np.isnan(latitude) | np.isnan(longitude)
+    if not missing.any():
+        return latitude, longitude
+    centre_latitude, centre_longitude = location_centres(location)
+    return np.where(missing, centre_latitude, latitude), np.where(missing, centre_longitude, longitude)
+
+
+class PropertyStore:
+    """Columnar, read-only property inventory.
+
+    Filterable fields are kept as NumPy arrays so a search is a single vectorized
+    mask over the inventory. Features are one bitmask per row, so amenity filters
+    are a bitwise AND over that column. `Property` objects are only built for the rows that
+    are actually read. Listings without coordinates are placed at their location's centre.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        type: CategoricalColumn,
+        transaction_type: CategoricalColumn,
+        location: CategoricalColumn,
+        price: np.ndarray,
+        bedrooms: np.ndarray,
+        bathrooms: np.ndarray,
+        square_feet: np.ndarray,
+        title: CategoricalColumn,
+        image_url: CategoricalColumn,
+        description: Sequence[str],
+        features: np.ndarray,
+        amenities: Optional[Sequence[Optional[List[str]]]] = None,
+        latitude: Optional[np.ndarray] = None,
+        longitude: Optional[np.ndarray] = None,
+    ):
+        self.ids = ids
+        self.type = type
+        self.transaction_type = transaction_type
+        self.location = location
+        self.price = price
+        self.bedrooms = bedrooms
+        self.bathrooms = bathrooms
+        self.square_feet = square_feet
+        self.title = title
+        self.image_url = image_url
+        self.description = description
+        self.features = features
+        self.amenities = amenities
+        if latitude is None or longitude is None:
+            latitude, longitude = location_centres(location)
+        self.latitude = latitude
+        self.longitude = longitude
+        self._row_by_id: Optional[Dict[int, int]] = None
+
+    @classmethod
+    def from_properties(cls, properties: Sequence[Property]) -> "PropertyStore":
+        """Build a store from a list of `Property` objects"""
+        count = len(properties)
+        amenities = [p.amenities for p in properties]
+        location = CategoricalColumn.encode(p.location for p in properties)
+        latitude = np.array([p.latitude for p in properties], dtype=np.float64)
+        longitude = np.array([p.longitude for p in properties], dtype=np.float64)
+        latitude, longitude = with_centres(location, latitude, longitude)
+        return cls(
+            ids=np.fromiter((p.id for p in properties), dtype=np.int64, count=count),
+            type=CategoricalColumn.encode(p.type for p in properties),
+            transaction_type=CategoricalColumn.encode(p.transaction_type for p in properties),
+            location=location,
+            price=np.fromiter((p.price for p in properties), dtype=np.float64, count=count),
+            bedrooms=np.fromiter((p.bedrooms for p in properties), dtype=np.int16, count=count),
+            bathrooms=np.fromiter((p.bathrooms for p in properties), dtype=np.int16, count=count),
+            square_feet=np.fromiter((p.square_feet for p in properties), dtype=np.float64, count=count),
+            title=CategoricalColumn.encode(p.title for p in properties),
+            image_url=CategoricalColumn.encode(p.image_url for p in properties),
+            description=[p.description for p in properties],
+            features=np.fromiter((p.feature_mask for p in properties), dtype=FEATURE_MASK_DTYPE, count=count),
+            amenities=amenities if any(a is not None for a in amenities) else None,
+            latitude=latitude,
+            longitude=longitude,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mask(self, query: PropertyQuery, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Evaluate every predicate of `query` into one boolean mask.
+
+        The mask covers the whole inventory, or only `rows` when a candidate set is given.
+        """
+
+        def column(values: np.ndarray) -> np.ndarray:
+            return values if rows is None else values[rows]
+
+        mask = np.ones(len(self) if rows is None else len(rows), dtype=bool)
+        if query.transaction_type:
+            mask &= self.transaction_type.mask(query.transaction_type, rows)
+        if query.property_type:
+            mask &= self.type.mask(query.property_type, rows)
+        if query.location:
+            mask &= self.location.mask(query.location, rows)
+        if query.min_price is not None:
+            mask &= column(self.price) >= query.min_price
+        if query.max_price is not None:
+            mask &= column(self.price) <= query.max_price
+        for values, low, high in (
+            (self.bedrooms, query.min_bedrooms, query.max_bedrooms),
+            (self.bathrooms, query.min_bathrooms, query.max_bathrooms),
+            (self.square_feet, query.min_square_feet, query.max_square_feet),
+        ):
+            if low is not None:
+                mask &= column(values) >= low
+            if high is not None:
+                mask &= column(values) <= high
+        if query.required_features:
+            required = features_mask(query.required_features)
+            mask &= (column(self.features) & required) == required
+        if query.excluded_features:
+            mask &= (column(self.features) & features_mask(query.excluded_features)) == 0
+        if query.where is not None:
+            mask &= self.condition_mask(query.where, rows)
+        if query.near and query.within_km is not None:
+            mask &= within_mask(column(self.latitude), column(self.longitude), query.near, query.within_km)
+        return mask
+
+    def condition_mask(self, condition: Condition, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean mask of the rows matching a normalized `Condition`, aligned with `rows` when given"""
+        if isinstance(condition, Not):
+            return ~self.condition_mask(condition.condition, rows)
+        any_of = isinstance(condition, AnyOf)
+        children = condition.conditions if isinstance(condition, (AllOf, AnyOf)) else [condition]
+        # Terms on the same field are tested together, e.g. one isin over every wanted location
+        values, others = grouped_terms(children)
+        masks = [self.condition_mask(child, rows) for child in others]
+        for field, field_values in values.items():
+            if field == "feature":
+                wanted = features_mask(field_values)
+                features = self.features if rows is None else self.features[rows]
+                masks.append((features & wanted) != 0 if any_of else (features & wanted) == wanted)
+            else:
+                column = {
+                    "transaction_type": self.transaction_type,
+                    "property_type": self.type,
+                    "location": self.location,
+                }[field]
+                if any_of:
+                    masks.append(column.mask_any(field_values, rows))
+                else:
+                    masks += [column.mask(value, rows) for value in field_values]
+        return (np.logical_or if any_of else np.logical_and).reduce(masks)
+
+    def filter(self, query: PropertyQuery, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Return the row ids matching `query`, in the order of `rows` or of the inventory"""
+        if rows is None:
+            return np.flatnonzero(self.mask(query))
+        return rows[self.mask(query, rows)]
+
+    def get(self, row: int) -> Property:
+        """Materialize the `Property` stored at `row`"""
+        return Property(
+            id=int(self.ids[row]),
+            title=self.title[row],
+            type=self.type[row],
+            transaction_type=self.transaction_type[row],
+            price=float(self.price[row]),
+            location=self.location[row],
+            bedrooms=int(self.bedrooms[row]),
+            bathrooms=int(self.bathrooms[row]),
+            square_feet=float(self.square_feet[row]),
+            description=self.description[row],
+            image_url=self.image_url[row],
+            feature_mask=int(self.features[row]),
+            amenities=self.amenities[row] if self.amenities is not None else None,
+            latitude=_coordinate(self.latitude[row]),
+            longitude=_coordinate(self.longitude[row]),
+        )
+
+    def row_of(self, property_id: int) -> Optional[int]:
+        """Return the row holding `property_id`, or None if it is not in the inventory"""
+        if self._row_by_id is None:
+            self._row_by_id = {int(pid): row for row, pid in enumerate(self.ids)}
+        return self._row_by_id.get(property_id)
+
+    def materialize(self, rows: Iterable[int]) -> List[Property]:
+        """Build `Property` objects for the given rows"""
+        return [self.get(int(row)) for row in rows]
+
+
+class PropertyResults(Sequence[Property]):
+    """Lazy list of search results backed by row ids into a `PropertyStore`.
+
+    Holding a result set costs one integer per match; a `Property` is only built
+    when an item is read, e.g. the listing currently shown in the carousel.
+    `total` is the number of matches the rows were selected from, e.g. when only
+    the best ranked ones are kept.
+    """
+
+    def __init__(self, store: PropertyStore, rows: np.ndarray, total: Optional[int] = None):
+        self.store = store
+        self.rows = rows
+        self.total = len(rows) if total is None else total
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @overload
+    def __getitem__(self, index: int) -> Property: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "PropertyResults": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Property, "PropertyResults"]:
+        if isinstance(index, slice):
+            return PropertyResults(self.store, self.rows[index])
+        return self.store.get(int(self.rows[index]))
+
+    def __iter__(self) -> Iterator[Property]:
+        for row in self.rows:
+            yield self.store.get(int(row))
+
+    def __repr__(self) -> str:
+        return f"PropertyResults({len(self)} properties)"
@@ -1,10 +1,15 @@
+import math
+import sys
 from dataclasses import dataclass
-from typing import Dict, List, Optional
-from random import randint, choice, uniform, sample
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from random import randint, choice, uniform, sample, randrange
 from pydantic import BaseModel, Field
 
-@dataclass
+@dataclass(slots=True)
 class Property:
+    """A listing. Slotted, with interned categorical strings, so each instance stays small"""
+
     id: int
     title: str
     type: str
@@ -16,8 +21,28 @@ class Property:
     square_feet: float
     description: str
     image_url: str
-    features: Dict[str, bool]
+    feature_mask: int
     amenities: Optional[List[str]] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    def __post_init__(self):
+        # A handful of distinct values repeated across every listing, keep one copy of each
+        self.title = sys.intern(self.title)
+        self.type = sys.intern(self.type)
+        self.transaction_type = sys.intern(self.transaction_type)
+        self.location = sys.intern(self.location)
+        self.image_url = sys.intern(self.image_url)
+
+    @property
+    def features(self) -> Dict[str, bool]:
+        """Features as a name -> present mapping"""
+        return decode_features(self.feature_mask)
+
+    @property
+    def feature_list(self) -> Tuple[str, ...]:
+        """Names of the features this property has"""
+        return feature_names(self.feature_mask)
 
 # Cyprus-specific data
 CYPRUS_LOCATIONS = [
@@ -33,7 +58,52 @@ CYPRUS_LOCATIONS = [
     "Alethriko"
 ]
 
-PROPERTY_TYPES = {
+# Mean Earth radius, and the length of one degree of latitude
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Approximate centre of each location as (latitude, longitude), and how far its listings spread in km
+LOCATION_COORDINATES: Dict[str, Tuple[float, float]] = {
+    "Larnaca": (34.9229, 33.6233),
+    "Pervolia": (34.8311, 33.5803),
+    "Kiti": (34.8486, 33.5694),
+    "Meneou": (34.8520, 33.6030),
+    "Aradippou": (34.9528, 33.5917),
+    "Livadia": (34.9510, 33.6310),
+    "Dromolaxia": (34.8766, 33.5858),
+    "Kornos": (34.9200, 33.3970),
+    "Delikipos": (34.9140, 33.3100),
+    "Alethriko": (34.8610, 33.4840),
+}
+
+LOCATION_SPREAD_KM: Dict[str, float] = {
+    "Larnaca": 2.5,
+    "Aradippou": 1.5,
+    "Livadia": 1.2,
+}
+DEFAULT_LOCATION_SPREAD_KM = 0.8
+
+@dataclass(frozen=True)
+class PointOfInterest:
+    """A fixed place listings can be searched and sorted by distance to"""
+
+    name: str
+    kind: str
+    latitude: float
+    longitude: float
+
+POINTS_OF_INTEREST = [
+    PointOfInterest("Larnaca Airport", "airport", 34.8751, 33.6249),
+    PointOfInterest("Finikoudes Beach", "beach", 34.9113, 33.6373),
+    PointOfInterest("Mackenzie Beach", "beach", 34.8925, 33.6356),
+    PointOfInterest("Faros Beach", "beach", 34.8205, 33.6012),
+    PointOfInterest("Larnaca Marina", "marina", 34.9185, 33.6395),
+    PointOfInterest("Larnaca Salt Lake", "nature", 34.8950, 33.6100),
+    PointOfInterest("Metropolis Mall", "shopping", 34.9330, 33.6070),
+    PointOfInterest("Larnaca General Hospital", "hospital", 34.9265, 33.6137),
+]
+
+PROPERTY_TYPES: Dict[str, Dict[str, Any]] = {
     "apartment": {
         "min_price_rent": 500,
         "max_price_rent": 3000,
@@ -107,18 +177,62 @@ FEATURES = {
     "air_conditioning": 0.9
 }
 
+# One bit per feature, in FEATURES order
+FEATURE_BITS = {name: 1 << bit for bit, name in enumerate(FEATURES)}
+
+def encode_features(features: Dict[str, bool]) -> int:
+    """Pack a name -> present mapping into a feature bitmask"""
+    mask = 0
+    for name, present in features.items():
+        if present:
+            mask |= FEATURE_BITS[name]
+    return mask
+
+def decode_features(mask: int) -> Dict[str, bool]:
+    """Unpack a feature bitmask into a name -> present mapping"""
+    return {name: bool(mask & bit) for name, bit in FEATURE_BITS.items()}
+
+@lru_cache(maxsize=None)
+def feature_names(mask: int) -> Tuple[str, ...]:
+    """Names of the features set in `mask`, shared between listings with the same features"""
+    return tuple(name for name, bit in FEATURE_BITS.items() if mask & bit)
+
+def feature_key(name: str) -> Optional[str]:
+    """Normalize a feature name such as "Air conditioning" to its FEATURES key, None if unknown"""
+    key = name.strip().lower().replace(" ", "_").replace("-", "_")
+    return key if key in FEATURE_BITS else None
+
+def features_mask(names: Iterable[str]) -> int:
+    """Bitmask for a list of feature names such as ["pool", "air conditioning"]"""
+    mask = 0
+    for name in names:
+        key = feature_key(name)
+        if key is None:
+            raise ValueError(f"Unknown property feature: {name}")
+        mask |= FEATURE_BITS[key]
+    return mask
+
+DESCRIPTION_TEMPLATES = [
+    "Beautiful {property_type} in {location} featuring {features}. Perfect for modern living.",
+    "Stunning {property_type} located in the heart of {location}. Includes {features}.",
+    "Exceptional {property_type} in prime {location} location. Comes with {features}.",
+    "Charming {property_type} situated in {location}. Highlights include {features}.",
+]
+
+@lru_cache(maxsize=2**18)
+def render_description(property_type: str, location: str, feature_mask: int, template: int) -> str:
+    """Render a description template, shared between listings generated from the same inputs"""
+    return DESCRIPTION_TEMPLATES[template].format(
+        property_type=property_type,
+        location=location,
+        features=", ".join(feature_names(feature_mask))
+    )
+
 def generate_description(property_type: str, location: str, features: Dict[str, bool]) -> str:
     """Generate a realistic property description"""
-    features_list = [k for k, v in features.items() if v]
-    features_text = ", ".join(features_list)
-    
-    templates = [
-        f"Beautiful {property_type} in {location} featuring {features_text}. Perfect for modern living.",
-        f"Stunning {property_type} located in the heart of {location}. Includes {features_text}.",
-        f"Exceptional {property_type} in prime {location} location. Comes with {features_text}.",
-        f"Charming {property_type} situated in {location}. Highlights include {features_text}.",
-    ]
-    return choice(templates)
+    return render_description(
+        property_type, location, encode_features(features), randrange(len(DESCRIPTION_TEMPLATES))
+    )
 
 def generate_sample_properties(count: int = 100) -> List[Property]:
     """Generate a list of sample properties with realistic Cyprus data"""
@@ -154,6 +268,12 @@ def generate_sample_properties(count: int = 100) -> List[Property]:
         
         # Select image
         image_url = f"{choice(PROPERTY_IMAGES[property_type])}?w=800"
+
+        # Place the listing around its location's centre
+        latitude, longitude = LOCATION_COORDINATES[location]
+        spread = LOCATION_SPREAD_KM.get(location, DEFAULT_LOCATION_SPREAD_KM)
+        latitude += uniform(-spread, spread) / KM_PER_DEGREE
+        longitude += uniform(-spread, spread) / (KM_PER_DEGREE * math.cos(math.radians(latitude)))
         
         properties.append(Property(
             id=i + 1,
@@ -167,10 +287,9 @@ def generate_sample_properties(count: int = 100) -> List[Property]:
             square_feet=square_feet,
             description=generate_description(property_type, location, features),
             image_url=image_url,
-            features=features
+            feature_mask=encode_features(features),
+            latitude=round(latitude, 6),
+            longitude=round(longitude, 6)
         ))
     
     return properties
-
-# Generate the sample properties
-SAMPLE_PROPERTIES = generate_sample_properties(100)
\ No newline at end of file
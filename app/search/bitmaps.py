@@ -0,0 +1,257 @@
+"""Compressed bitmaps of row ids, in the style of roaring bitmaps.
+
+Row ids are split into chunks of 65,536 by their high bits. A chunk holding at
+most 4,096 rows keeps their low 16 bits as a sorted uint16 array, a denser one
+keeps a 65,536-bit bitset in 1,024 uint64 words. A chunk never takes more than
+8 KiB, and rare values stay as small as their row count. Set operations go chunk
+by chunk and pick the kernel for the two container kinds: word-wise AND/OR for
+two bitsets, bit tests for an array against a bitset, sorted merges for two arrays.
+
+`BitmapIndex` keeps one bitmap per value of the categorical columns and per
+feature, and evaluates a `Condition` into the bitmap of its matching rows. A
+union of many values ORs their containers in a single pass per chunk, so asking
+for 50 locations costs about the same as asking for 5.
+"""
+
+from functools import cached_property, reduce
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.inventory.store import PropertyStore
+from app.models.property import FEATURE_BITS, features_mask
+from app.search.conditions import AnyOf, Condition, Not, Term, all_of
+from app.search.indexes import PropertyIndexes
+from app.search.query import PropertyQuery
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+# Densest chunk kept as an array, past it a bitset is smaller
+ARRAY_LIMIT = 4096
+_WORDS = CHUNK_SIZE // 64
+
+
+def _is_bitset(container: np.ndarray) -> bool:
+    return container.dtype == np.uint64
+
+
+def _bitset(container: np.ndarray) -> np.ndarray:
+    if _is_bitset(container):
+        return container
+    bits = np.zeros(CHUNK_SIZE, dtype=bool)
+    bits[container] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _members(words: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(words.view(np.uint8), bitorder="little").view(bool)
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _contains(words: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Which of the array container `values` are set in the bitset `words`"""
+    return (words.view(np.uint8)[values >> 3] >> (values & 7) & 1).astype(bool)
+
+
+def _cardinality(container: np.ndarray) -> int:
+    return int(np.bitwise_count(container).sum()) if _is_bitset(container) else len(container)
+
+
+def _compact(words: np.ndarray) -> Optional[np.ndarray]:
+    """A computed bitset as the smaller container kind, None when it is empty"""
+    count = int(np.bitwise_count(words).sum())
+    if count == 0:
+        return None
+    return _members(words) if count <= ARRAY_LIMIT else words
+
+
+def _intersection(a: np.ndarray, b: np.ndarray) -> Optional[np.ndarray]:
+    if _is_bitset(a) and _is_bitset(b):
+        return _compact(a & b)
+    if _is_bitset(a):
+        a, b = b, a
+    values = a[_contains(b, a)] if _is_bitset(b) else np.intersect1d(a, b, assume_unique=True)
+    return values if len(values) else None
+
+
+def _difference(a: np.ndarray, b: np.ndarray) -> Optional[np.ndarray]:
+    if _is_bitset(a):
+        return _compact(a & ~_bitset(b))
+    values = a[~_contains(b, a)] if _is_bitset(b) else np.setdiff1d(a, b, assume_unique=True)
+    return values if len(values) else None
+
+
+class Bitmap:
+    """Immutable set of row ids, one container per chunk of 65,536 ids"""
+
+    def __init__(self, chunks: Dict[int, np.ndarray]):
+        # Chunk key -> container, keys ascending, empty chunks left out
+        self.chunks = chunks
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "Bitmap":
+        """Bitmap of ascending, distinct row ids"""
+        rows = np.asarray(rows)
+        keys, starts = np.unique(rows >> CHUNK_BITS, return_index=True)
+        bounds = np.append(starts, len(rows)).tolist()
+        chunks = {}
+        for key, start, stop in zip(keys.tolist(), bounds, bounds[1:]):
+            values = (rows[start:stop] & (CHUNK_SIZE - 1)).astype(np.uint16)
+            chunks[key] = values if len(values) <= ARRAY_LIMIT else _bitset(values)
+        return cls(chunks)
+
+    @classmethod
+    def full(cls, size: int) -> "Bitmap":
+        """Every row id below `size`"""
+        return cls.from_rows(np.arange(size))
+
+    @staticmethod
+    def union(bitmaps: Iterable["Bitmap"]) -> "Bitmap":
+        """Rows in any of `bitmaps`, ORing every chunk's containers at once"""
+        grouped: Dict[int, List[np.ndarray]] = {}
+        for bitmap in bitmaps:
+            for key, container in bitmap.chunks.items():
+                grouped.setdefault(key, []).append(container)
+        chunks = {}
+        for key in sorted(grouped):
+            containers = grouped[key]
+            if len(containers) == 1:
+                chunks[key] = containers[0]
+                continue
+            arrays = [container for container in containers if not _is_bitset(container)]
+            bitsets = [container for container in containers if _is_bitset(container)]
+            if not bitsets and sum(map(len, arrays)) <= ARRAY_LIMIT:
+                values = np.sort(np.concatenate(arrays))
+                chunks[key] = values[np.concatenate(([True], values[1:] != values[:-1]))]
+                continue
+            words = np.bitwise_or.reduce(bitsets) if bitsets else np.zeros(_WORDS, dtype=np.uint64)
+            if arrays:
+                words = words | _bitset(np.concatenate(arrays))
+            chunks[key] = words if bitsets else _compact(words)  # type: ignore[assignment]
+        return Bitmap(chunks)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for key in sorted(self.chunks.keys() & other.chunks.keys()):
+            container = _intersection(self.chunks[key], other.chunks[key])
+            if container is not None:
+                chunks[key] = container
+        return Bitmap(chunks)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap.union((self, other))
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for key, container in self.chunks.items():
+            if key in other.chunks:
+                container = _difference(container, other.chunks[key])  # type: ignore[assignment]
+            if container is not None:
+                chunks[key] = container
+        return Bitmap(chunks)
+
+    def __len__(self) -> int:
+        return sum(_cardinality(container) for container in self.chunks.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(container.nbytes for container in self.chunks.values())
+
+    def rows(self) -> np.ndarray:
+        """The row ids, ascending"""
+        parts = [
+            (_members(container) if _is_bitset(container) else container).astype(np.intp)
+            + (key << CHUNK_BITS)
+            for key, container in self.chunks.items()
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+
+class BitmapIndex:
+    """One bitmap per transaction type, property type, location and feature"""
+
+    def __init__(self, store: PropertyStore, indexes: PropertyIndexes):
+        self.size = len(store)
+        self._bitmaps: Dict[Term, Bitmap] = {}
+        for field, index in (
+            ("transaction_type", indexes.transaction_type),
+            ("property_type", indexes.type),
+            ("location", indexes.location),
+        ):
+            for value in {category.lower() for category in index.column.categories}:
+                self._bitmaps[Term(field, value)] = Bitmap.from_rows(index.lookup(value))
+        for name, bit in FEATURE_BITS.items():
+            self._bitmaps[Term("feature", name)] = Bitmap.from_rows(np.flatnonzero(store.features & bit))
+        self._counts = {term: len(bitmap) for term, bitmap in self._bitmaps.items()}
+
+    @cached_property
+    def everything(self) -> Bitmap:
+        return Bitmap.full(self.size)
+
+    def term(self, term: Term) -> Bitmap:
+        """Rows matching a normalized term"""
+        if term.field == "feature":
+            # Unknown features fail here as they do in `PropertyStore.mask`
+            features_mask([term.value])
+        return self._bitmaps.get(term, Bitmap({}))
+
+    def evaluate(self, condition: Condition) -> Bitmap:
+        """Rows matching a normalized condition"""
+        if isinstance(condition, Term):
+            return self.term(condition)
+        if isinstance(condition, Not):
+            return self.everything - self.evaluate(condition.condition)
+        if isinstance(condition, AnyOf):
+            return Bitmap.union(self.evaluate(child) for child in condition.conditions)
+        # Intersect the smallest bitmaps first, then take out the negated conditions
+        excluded = [child.condition for child in condition.conditions if isinstance(child, Not)]
+        required = sorted(
+            (self.evaluate(child) for child in condition.conditions if not isinstance(child, Not)), key=len
+        )
+        rows = reduce(Bitmap.__and__, required) if required else self.everything
+        for child in excluded:
+            rows = rows - self.evaluate(child)
+        return rows
+
+    def estimate(self, condition: Condition) -> int:
+        """At least the number of rows matching a normalized condition, from the term counts alone"""
+        if isinstance(condition, Term):
+            return self._counts.get(condition, 0)
+        if isinstance(condition, Not):
+            return self.size
+        if isinstance(condition, AnyOf):
+            return min(self.size, sum(self.estimate(child) for child in condition.conditions))
+        return min(self.estimate(child) for child in condition.conditions)
+
+    def lookup(self, condition: Condition) -> np.ndarray:
+        """Sorted row ids matching a normalized condition"""
+        return self.evaluate(condition).rows()
+
+    def matching(self, query: PropertyQuery) -> Bitmap:
+        """Rows matching every categorical and feature predicate of a normalized query"""
+        condition = query_condition(query)
+        return self.everything if condition is None else self.evaluate(condition)
+
+    @property
+    def entries(self) -> int:
+        """Row ids held over all bitmaps"""
+        return sum(self._counts.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bitmap.nbytes for bitmap in self._bitmaps.values())
+
+
+def query_condition(query: PropertyQuery) -> Optional[Condition]:
+    """Every categorical and feature predicate of a normalized query as one condition"""
+    conditions: List[Condition] = [] if query.where is None else [query.where]
+    for field, value in (
+        ("transaction_type", query.transaction_type),
+        ("property_type", query.property_type),
+        ("location", query.location),
+    ):
+        if value:
+            conditions.append(Term(field, value))
+    conditions += [Term("feature", name) for name in query.required_features]
+    conditions += [Not(Term("feature", name)) for name in query.excluded_features]
+    return all_of(conditions) if conditions else None
@@ -0,0 +1,182 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from app.inventory.settings import inventory_settings
+from app.inventory.store import PropertyStore
+from app.search.facets import FacetCounts, FacetIndex
+from app.search.geo import GeoIndex
+from app.search.query import PropertyQuery
+from app.search.ranking import rank
+from app.search.text import TextIndex
+
+# Bookkeeping per cached entry on top of its arrays, roughly
+_ENTRY_OVERHEAD = 512
+
+
+class SearchResult:
+    """Matches of one query against one inventory version, ranked on demand.
+
+    The ranked prefix only grows: asking for more listings than are ranked
+    re-ranks at least twice as many, so paging deeper stays amortized. Keyword
+    searches also rank by BM25 relevance from `text_index`, searches near a
+    place by the distances cached on `geo_index`. Facet counts are kept with the
+    matches, they are a few dozen integers.
+    """
+
+    def __init__(
+        self,
+        store: PropertyStore,
+        query: PropertyQuery,
+        rows: np.ndarray,
+        text_index: Optional[TextIndex] = None,
+        geo_index: Optional[GeoIndex] = None,
+    ):
+        self.store = store
+        self.query = query
+        self.rows = rows
+        self.text_index = text_index
+        self.geo_index = geo_index
+        self._ranked = rows[:0]
+        self._relevance: Optional[np.ndarray] = None
+        self._distance: Optional[np.ndarray] = None
+        self._facets: Optional[FacetCounts] = None
+
+    @property
+    def nbytes(self) -> int:
+        # The ranked prefix can grow to the size of rows after the entry is cached
+        size = 2 * self.rows.nbytes + _ENTRY_OVERHEAD
+        for signal in (self.query.keywords, self.query.near):
+            if signal:
+                size += len(self.rows) * np.dtype(np.float32).itemsize
+        return size
+
+    def relevance(self) -> Optional[np.ndarray]:
+        """BM25 scores of the matches for the query's keywords, None without keywords"""
+        if self._relevance is None and self.query.keywords and self.text_index is not None:
+            self._relevance = self.text_index.score_rows(self.query.keywords, self.rows)
+        return self._relevance
+
+    def distance(self) -> Optional[np.ndarray]:
+        """Km from each match to the place the query is near, None when it is not near one"""
+        if self._distance is None and self.query.near and self.geo_index is not None:
+            self._distance = self.geo_index.distances(self.query.near)[self.rows]
+        return self._distance
+
+    def facets(self, index: FacetIndex) -> FacetCounts:
+        """Facet counts over the matches, counted with `index` on first use"""
+        if self._facets is None:
+            self._facets = index.count(self.rows)
+        return self._facets
+
+    def ranked(self, k: int) -> np.ndarray:
+        """The best `k` matches, best first"""
+        ranked = self._ranked
+        if len(ranked) < min(k, len(self.rows)):
+            ranked = rank(
+                self.store,
+                self.rows,
+                self.query,
+                max(k, 2 * len(ranked)),
+                relevance=self.relevance(),
+                distance=self.distance(),
+            )
+            self._ranked = ranked
+        return ranked[:k]
+
+
+class QueryCache:
+    """Process-wide LRU cache of search results, keyed on normalized queries.
+
+    Entries belong to one inventory version. The first lookup made with a newer
+    version drops everything cached for older ones, so a reload never serves
+    stale rows. Entries are evicted least recently used first once their total
+    size exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[PropertyQuery, SearchResult]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _is_current(self, version: int) -> bool:
+        """Move to `version` if it is newer, dropping older entries; False if it is already outdated"""
+        if self._version is None or version > self._version:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+        return version == self._version
+
+    def get(self, version: int, query: PropertyQuery) -> Optional[SearchResult]:
+        with self._lock:
+            if not self._is_current(version):
+                self.misses += 1
+                return None
+            result = self._entries.get(query)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return result
+
+    def peek(self, version: int, query: PropertyQuery) -> Optional[SearchResult]:
+        """The cached result for `query` if any, without counting a lookup or refreshing its recency"""
+        with self._lock:
+            return self._entries.get(query) if version == self._version else None
+
+    def put(self, version: int, query: PropertyQuery, result: SearchResult) -> None:
+        with self._lock:
+            if not self._is_current(version) or result.nbytes > self.max_bytes:
+                return
+            previous = self._entries.pop(query, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[query] = result
+            self._bytes += result.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def get_or_search(
+        self, version: int, query: PropertyQuery, search: Callable[[], SearchResult]
+    ) -> SearchResult:
+        """The cached result for `query`, running `search` and caching it on a miss"""
+        result = self.get(version, query)
+        if result is None:
+            result = search()
+            self.put(version, query, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Hit, miss, eviction and invalidation counters and the current size"""
+        with self._lock:
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Process-wide cache shared by every session
+query_cache = QueryCache(int(inventory_settings.query_cache_mb * 2**20))
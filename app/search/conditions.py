@@ -0,0 +1,168 @@
+"""Boolean conditions over the categorical fields and features of a listing.
+
+A condition combines terms such as `Term("location", "kiti")` with `AllOf`,
+`AnyOf` and `Not`, so a search can ask for "Kiti or Meneou, apartment or
+studio, with a pool or a garden". Conditions are frozen and normalized like the
+rest of a `PropertyQuery`, so equivalent ones compare and hash equal.
+
+The assistant sends them as JSON: `{"location": ["Kiti", "Meneou"]}` is any of
+the locations, several keys in one object must all hold, and `{"any": [...]}`,
+`{"all": [...]}` and `{"not": {...}}` combine conditions explicitly.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Set, Tuple, Union
+
+from app.models.property import feature_key
+
+# Fields a term may test, "feature" matches listings having that feature
+FIELDS = ("transaction_type", "property_type", "location", "feature")
+
+
+@dataclass(frozen=True)
+class Term:
+    """Listings whose `field` equals `value`, ignoring case"""
+
+    field: str
+    value: str
+
+
+@dataclass(frozen=True)
+class AllOf:
+    """Listings matching every condition"""
+
+    conditions: FrozenSet["Condition"]
+
+
+@dataclass(frozen=True)
+class AnyOf:
+    """Listings matching at least one condition"""
+
+    conditions: FrozenSet["Condition"]
+
+
+@dataclass(frozen=True)
+class Not:
+    """Listings not matching the condition"""
+
+    condition: "Condition"
+
+
+Condition = Union[Term, AllOf, AnyOf, Not]
+
+
+def any_of(field: str, values: Iterable[str]) -> Condition:
+    """Listings whose `field` is any of `values`"""
+    return normalized(AnyOf(frozenset(Term(field, value) for value in values)))
+
+
+def all_of(conditions: Iterable[Condition]) -> Condition:
+    """Listings matching every one of `conditions`"""
+    return normalized(AllOf(frozenset(conditions)))
+
+
+def normalized(condition: Condition) -> Condition:
+    """The same condition in canonical form.
+
+    Values are case-folded and feature names mapped to their FEATURES keys,
+    nested `AllOf` and `AnyOf` are flattened, single-child groups and double
+    negations removed.
+    """
+    if isinstance(condition, Term):
+        if condition.field not in FIELDS:
+            raise ValueError(f"Unknown condition field: {condition.field}")
+        value = condition.value.strip().lower()
+        if condition.field == "feature":
+            # Unknown names are kept so they still fail when the query runs
+            value = feature_key(value) or value
+        return Term(condition.field, value)
+    if isinstance(condition, Not):
+        inner = normalized(condition.condition)
+        return inner.condition if isinstance(inner, Not) else Not(inner)
+    children: Set[Condition] = set()
+    for child in map(normalized, condition.conditions):
+        if type(child) is type(condition):
+            children.update(child.conditions)  # type: ignore[union-attr]
+        else:
+            children.add(child)
+    if not children:
+        raise ValueError(f"Empty {type(condition).__name__} condition")
+    if len(children) == 1:
+        return children.pop()
+    return type(condition)(frozenset(children))
+
+
+def conjuncts(condition: Condition) -> FrozenSet[Condition]:
+    """The conditions a normalized condition requires all of"""
+    return condition.conditions if isinstance(condition, AllOf) else frozenset((condition,))
+
+
+def terms(condition: Condition) -> Iterator[Term]:
+    """Every term in `condition`"""
+    if isinstance(condition, Term):
+        yield condition
+    elif isinstance(condition, Not):
+        yield from terms(condition.condition)
+    else:
+        for child in condition.conditions:
+            yield from terms(child)
+
+
+def grouped_terms(conditions: Iterable[Condition]) -> Tuple[Dict[str, List[str]], List[Condition]]:
+    """The values of the terms among `conditions` per field, and the other conditions.
+
+    Lets the alternatives of an `AnyOf` be tested together, e.g. one membership
+    test against several locations instead of one comparison per location. Both
+    come out in canonical order, so the same condition always gives the same SQL.
+    """
+    values: Dict[str, List[str]] = {}
+    others: List[Condition] = []
+    for condition in sorted(conditions, key=describe):
+        if isinstance(condition, Term):
+            values.setdefault(condition.field, []).append(condition.value)
+        else:
+            others.append(condition)
+    return values, others
+
+
+def describe(condition: Condition) -> str:
+    """Canonical text of a normalized condition, children sorted so equal conditions read the same"""
+    if isinstance(condition, Term):
+        return f"{condition.field} = {condition.value}"
+    if isinstance(condition, Not):
+        inner = describe(condition.condition)
+        return f"not {inner}" if isinstance(condition.condition, Term) else f"not ({inner})"
+    joiner = " and " if isinstance(condition, AllOf) else " or "
+    parts = sorted(
+        describe(child) if isinstance(child, (Term, Not)) else f"({describe(child)})"
+        for child in condition.conditions
+    )
+    return joiner.join(parts)
+
+
+def parse_condition(data: Any) -> Condition:
+    """Build a normalized condition from its JSON form, see the module docstring"""
+    if isinstance(data, (Term, AllOf, AnyOf, Not)):
+        return normalized(data)
+    if isinstance(data, list):
+        return all_of(parse_condition(item) for item in data)
+    if not isinstance(data, dict) or not data:
+        raise ValueError(f"Not a condition: {data!r}")
+    conditions = []
+    for key, value in data.items():
+        if key == "not":
+            conditions.append(normalized(Not(parse_condition(value))))
+        elif key in ("all", "any"):
+            if not isinstance(value, list):
+                raise ValueError(f'"{key}" expects a list of conditions, got {value!r}')
+            children = frozenset(parse_condition(item) for item in value)
+            conditions.append(normalized(AllOf(children) if key == "all" else AnyOf(children)))
+        elif key in FIELDS or key == "features":
+            field = "feature" if key == "features" else key
+            values = [value] if isinstance(value, str) else value
+            if not isinstance(values, list) or not all(isinstance(item, str) for item in values):
+                raise ValueError(f'"{key}" expects a value or a list of values, got {value!r}')
+            conditions.append(any_of(field, values))
+        else:
+            raise ValueError(f"Unknown condition field: {key}")
+    return all_of(conditions)
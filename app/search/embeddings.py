@@ -0,0 +1,112 @@
+"""Text embedders for semantic listing search.
+
+An embedder turns texts into unit-length float32 vectors, so the inner product
+of two embeddings is their cosine similarity. `HashingEmbedder` needs no model
+or network and always gives the same vectors, for tests and offline use.
+`OpenAIEmbedder` calls the OpenAI embeddings API.
+"""
+
+import hashlib
+from typing import Dict, List, Optional, Protocol, Sequence
+
+import numpy as np
+
+from app.inventory.store import PropertyStore
+from app.search.text import tokenize
+
+# Most words and word pairs whose bucket a HashingEmbedder remembers
+MAX_SLOTS = 100_000
+
+
+class Embedder(Protocol):
+    """Anything that embeds texts into unit vectors of a fixed size"""
+
+    dimensions: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """One unit-length float32 row per text"""
+        ...
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder:
+    """Bag of words and word pairs hashed into a fixed number of signed buckets.
+
+    Texts sharing words end up close, there is no notion of synonyms. Buckets
+    come from a cryptographic hash, so vectors are the same in every process.
+    """
+
+    def __init__(self, dimensions: int = 128):
+        self.dimensions = dimensions
+        self._slots: Dict[str, int] = {}
+
+    def _slot(self, feature: str) -> int:
+        """Bucket of `feature` times two, plus one when it is subtracted"""
+        slot = self._slots.get(feature)
+        if slot is None:
+            value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            slot = (value % self.dimensions) * 2 + (value >> 63)
+            if len(self._slots) >= MAX_SLOTS:
+                # Every word pair ever seen would pile up, start over instead
+                self._slots = {}
+            self._slots[feature] = slot
+        return slot
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        codes: List[int] = []
+        counts: List[int] = []
+        for text in texts:
+            tokens = tokenize(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            slots = self._slots
+            codes.extend(slots[feature] if feature in slots else self._slot(feature) for feature in features)
+            counts.append(len(features))
+        slot = np.asarray(codes, dtype=np.intp)
+        rows = np.repeat(np.arange(len(texts)), counts)
+        signs = 1.0 - 2.0 * (slot & 1)
+        cells = rows * self.dimensions + (slot >> 1)
+        vectors = np.bincount(cells, weights=signs, minlength=len(texts) * self.dimensions)
+        return _normalize(vectors.reshape(len(texts), self.dimensions).astype(np.float32))
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API, requested in batches"""
+
+    def __init__(self, model: Optional[str] = None, dimensions: int = 256, batch_size: int = 512):
+        from openai import OpenAI
+
+        from agents.settings import agent_settings
+
+        self.client = OpenAI()
+        self.model = model or agent_settings.embedding_model
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = list(texts[start : start + self.batch_size])
+            response = self.client.embeddings.create(
+                model=self.model, input=batch, dimensions=self.dimensions
+            )
+            vectors[start : start + len(batch)] = [item.embedding for item in response.data]
+        return _normalize(vectors)
+
+
+EMBEDDERS = {"hashing": HashingEmbedder, "openai": OpenAIEmbedder}
+
+
+def get_embedder(name: str, dimensions: int) -> Embedder:
+    """The embedder called `name`, see EMBEDDERS"""
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder: {name}")
+    return EMBEDDERS[name](dimensions=dimensions)
+
+
+def listing_text(store: PropertyStore, row: int) -> str:
+    """The text a listing is embedded from"""
+    return f"{store.title[row]}. {store.description[row]}"
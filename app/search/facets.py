@@ -0,0 +1,126 @@
+"""Facet counts over the matches of a search.
+
+How many matches fall in each transaction type, property type, location,
+bedroom count and price bucket, so the UI and the assistant can point at
+non-empty refinements without running a search per value.
+
+`FacetIndex` gives every listing one integer, its cell in the cube of all
+facet values. Counting the matches of a search is then a single `np.bincount`
+over the cells of the matching rows, and every facet is a sum over that cube.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.inventory.store import CategoricalColumn, PropertyStore
+
+# Upper bounds of the price buckets, rents fall in the first few and sale prices in the rest
+PRICE_BUCKETS = [1_000, 2_000, 3_000, 5_000, 150_000, 200_000, 250_000, 300_000, 400_000]
+# Largest cube counted in one pass, past that every facet is counted on its own
+_MAX_CELLS = 1 << 22
+
+
+def price_bucket_labels(bounds: Sequence[float] = PRICE_BUCKETS) -> List[str]:
+    """Label of every price bucket, lowest first: "up to €1,000", "€1,000-€2,000" and so on"""
+    labels = [f"up to €{bounds[0]:,.0f}"]
+    labels += [f"€{low:,.0f}-€{high:,.0f}" for low, high in zip(bounds, bounds[1:])]
+    labels.append(f"over €{bounds[-1]:,.0f}")
+    return labels
+
+
+@dataclass(frozen=True)
+class FacetCounts:
+    """Number of matches per facet value, values without matches are left out.
+
+    Categories are ordered by count, bedrooms and price buckets by value.
+    """
+
+    total: int
+    transaction_type: Dict[str, int]
+    property_type: Dict[str, int]
+    location: Dict[str, int]
+    bedrooms: Dict[int, int]
+    price: Dict[str, int]
+
+    def summary(self) -> str:
+        """The total, then one line per facet such as "Location: Larnaca 38, Kiti 12" for the assistant"""
+        if not self.total:
+            return "No matching listings."
+        lines = [f"{self.total:,} matching listings."]
+        for name, counts in (
+            ("Transaction", self.transaction_type),
+            ("Type", self.property_type),
+            ("Location", self.location),
+            ("Bedrooms", self.bedrooms),
+            ("Price", self.price),
+        ):
+            lines.append(f"{name}: " + ", ".join(f"{value} {count:,}" for value, count in counts.items()))
+        return "\n".join(lines)
+
+
+def _category_counts(column: CategoricalColumn, per_code: np.ndarray) -> Dict[str, int]:
+    """Matches per category, spellings differing only in case counted together"""
+    counts: Dict[str, int] = {}
+    for code in np.flatnonzero(per_code):
+        name = column.categories[column.codes_for(column.categories[code])[0]]
+        counts[name] = counts.get(name, 0) + int(per_code[code])
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+
+class FacetIndex:
+    """Facet value codes of every listing, built once per inventory"""
+
+    def __init__(self, store: PropertyStore):
+        self.store = store
+        bedrooms = store.bedrooms.astype(np.intp)
+        # Transaction type, property type, location, bedrooms and price bucket of every row
+        self._codes = [
+            store.transaction_type.codes,
+            store.type.codes,
+            store.location.codes,
+            bedrooms,
+            np.searchsorted(PRICE_BUCKETS, store.price, side="left"),
+        ]
+        self.shape = (
+            len(store.transaction_type.categories),
+            len(store.type.categories),
+            len(store.location.categories),
+            int(bedrooms.max()) + 1 if len(store) else 1,
+            len(PRICE_BUCKETS) + 1,
+        )
+        # Number of cells in the cube of all facet values
+        self.size = int(np.prod(self.shape))
+        self._cells: Optional[np.ndarray] = None
+        if self.size <= _MAX_CELLS:
+            cells = np.ravel_multi_index(self._codes, self.shape)
+            self._cells = cells.astype(np.uint16 if self.size <= 1 << 16 else np.uint32)
+
+    def _counts(self, rows: Optional[np.ndarray]) -> List[np.ndarray]:
+        """Matches per value of every facet"""
+        if self._cells is not None:
+            cells = self._cells if rows is None else self._cells[rows]
+            cube = np.bincount(cells, minlength=self.size).reshape(self.shape)
+            return [
+                cube.sum(axis=tuple(other for other in range(cube.ndim) if other != axis))
+                for axis in range(cube.ndim)
+            ]
+        return [
+            np.bincount(codes if rows is None else codes[rows], minlength=size)
+            for codes, size in zip(self._codes, self.shape)
+        ]
+
+    def count(self, rows: Optional[np.ndarray] = None) -> FacetCounts:
+        """Facet counts over `rows`, or over the whole inventory"""
+        if rows is not None and len(rows) == len(self.store):
+            rows = None
+        transactions, types, locations, bedrooms, prices = self._counts(rows)
+        return FacetCounts(
+            total=len(self.store) if rows is None else len(rows),
+            transaction_type=_category_counts(self.store.transaction_type, transactions),
+            property_type=_category_counts(self.store.type, types),
+            location=_category_counts(self.store.location, locations),
+            bedrooms={int(value): int(bedrooms[value]) for value in np.flatnonzero(bedrooms)},
+            price={label: int(count) for label, count in zip(price_bucket_labels(), prices) if count},
+        )
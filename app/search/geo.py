@@ -0,0 +1,139 @@
+"""Grid index over listing coordinates for radius and bounding-box searches.
+
+Listings are bucketed into a uniform latitude/longitude grid, the way a geohash
+prefix buckets them, with cells about half a kilometre wide. Rows are reordered
+by cell so each cell is one contiguous slice. A query only visits the cells
+overlapping it: a cell lying wholly inside the circle or box is taken as it is,
+without looking at its rows, and only the rows of the cells crossing its edge
+get an exact test. A 5 km radius over a million listings runs a few thousand
+haversines rather than a million.
+
+Distances from every listing to a place are computed the first time a search
+sorts or ranks by them and cached on the index, so there is one array per point
+of interest, kind of point or location asked about.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+from app.search.indexes import slice_positions
+from app.search.places import bounding_box, distance_km, haversine_km, place_key, place_points
+
+# Side of a grid cell in degrees, about 550 m of latitude
+DEFAULT_CELL_DEGREES = 0.005
+# Cells the grid may hold, cells grow past DEFAULT_CELL_DEGREES for inventories spread wider
+MAX_CELLS = 1 << 20
+# Cells are ruled out from their nearest corner or edge, an estimate good to well under a metre
+_EDGE_SLACK_KM = 0.001
+
+
+class GeoIndex:
+    """Listings bucketed into a uniform latitude/longitude grid, each cell's rows stored together"""
+
+    def __init__(
+        self, latitude: np.ndarray, longitude: np.ndarray, cell_degrees: float = DEFAULT_CELL_DEGREES
+    ):
+        self.latitude = latitude
+        self.longitude = longitude
+        located = ~(np.isnan(latitude) | np.isnan(longitude))
+        self.south = float(latitude[located].min()) if located.any() else 0.0
+        self.west = float(longitude[located].min()) if located.any() else 0.0
+        height = float(latitude[located].max()) - self.south if located.any() else 0.0
+        width = float(longitude[located].max()) - self.west if located.any() else 0.0
+        self.cell_degrees = max(cell_degrees, np.sqrt(height * width / MAX_CELLS))
+        self.rows = int(height / self.cell_degrees) + 1
+        self.columns = int(width / self.cell_degrees) + 1
+
+        # Rows without coordinates go in one extra cell past the grid that no query visits
+        cells = np.full(len(latitude), self.rows * self.columns, dtype=np.int64)
+        cells[located] = self._cell(latitude[located], longitude[located])
+        self.order = np.argsort(cells, kind="stable")
+        self.starts = np.searchsorted(cells[self.order], np.arange(self.rows * self.columns + 1))
+        self.sorted_latitude = latitude[self.order]
+        self.sorted_longitude = longitude[self.order]
+        self._distances: Dict[str, np.ndarray] = {}
+
+    def _cell(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        row = np.clip(((latitude - self.south) / self.cell_degrees).astype(np.int64), 0, self.rows - 1)
+        column = np.clip(((longitude - self.west) / self.cell_degrees).astype(np.int64), 0, self.columns - 1)
+        return row * self.columns + column
+
+    def _cells_in(self, south: float, west: float, north: float, east: float) -> Tuple[np.ndarray, ...]:
+        """Ids and (south, west, north, east) edges of the cells overlapping a box"""
+        size = self.cell_degrees
+        first_row, last_row = int((south - self.south) // size), int((north - self.south) // size)
+        first_column, last_column = int((west - self.west) // size), int((east - self.west) // size)
+        rows = np.arange(max(first_row, 0), min(last_row, self.rows - 1) + 1)
+        columns = np.arange(max(first_column, 0), min(last_column, self.columns - 1) + 1)
+        row, column = (grid.ravel() for grid in np.meshgrid(rows, columns, indexing="ij"))
+        cell_south = self.south + row * size
+        cell_west = self.west + column * size
+        return row * self.columns + column, cell_south, cell_west, cell_south + size, cell_west + size
+
+    def _rows(self, whole: np.ndarray, edge: np.ndarray, keep) -> np.ndarray:
+        """Rows of the `whole` cells, and those of the `edge` cells passing `keep(latitude, longitude)`"""
+        tested = slice_positions(self.starts[edge], self.starts[edge + 1])
+        kept = tested[keep(self.sorted_latitude[tested], self.sorted_longitude[tested])]
+        return self.order[np.concatenate((slice_positions(self.starts[whole], self.starts[whole + 1]), kept))]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Rows within `radius_km` of a point, in no particular order"""
+        cells, south, west, north, east = self._cells_in(*bounding_box(latitude, longitude, radius_km))
+        # The farthest point of a cell is one of its corners
+        farthest = np.maximum.reduce(
+            [haversine_km(lat, lon, latitude, longitude) for lat in (south, north) for lon in (west, east)]
+        )
+        closest = np.clip(latitude, south, north), np.clip(longitude, west, east)
+        nearest = haversine_km(*closest, latitude, longitude)
+        inside = farthest <= radius_km
+        edge = ~inside & (nearest <= radius_km + _EDGE_SLACK_KM)
+        return self._rows(
+            cells[inside],
+            cells[edge],
+            lambda lat, lon: haversine_km(lat, lon, latitude, longitude) <= radius_km,
+        )
+
+    def in_box(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Rows inside a (south, west, north, east) box, in no particular order"""
+        cells, cell_south, cell_west, cell_north, cell_east = self._cells_in(south, west, north, east)
+        inside = (cell_south >= south) & (cell_north <= north) & (cell_west >= west) & (cell_east <= east)
+        return self._rows(
+            cells[inside],
+            cells[~inside],
+            lambda lat, lon: (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east),
+        )
+
+    def near(self, place: str, radius_km: float) -> np.ndarray:
+        """Sorted rows within `radius_km` of any point of `place`"""
+        parts = [self.within(latitude, longitude, radius_km) for latitude, longitude in place_points(place)]
+        rows = np.concatenate(parts)
+        if len(rows) > len(self.order) // 64:
+            # Marking rows in a mask is cheaper than sorting a large share of the inventory
+            mask = np.zeros(len(self.order), dtype=bool)
+            mask[rows] = True
+            return np.flatnonzero(mask)
+        rows = np.sort(rows)
+        return rows[np.concatenate(([True], rows[1:] != rows[:-1]))] if len(parts) > 1 else rows
+
+    def estimate(self, place: str, radius_km: float) -> int:
+        """At least the number of rows within `radius_km` of `place`, from the cells its boxes overlap"""
+        total = 0
+        for latitude, longitude in place_points(place):
+            cells = self._cells_in(*bounding_box(latitude, longitude, radius_km))[0]
+            total += int((self.starts[cells + 1] - self.starts[cells]).sum())
+        return min(total, len(self.order))
+
+    def distances(self, place: str) -> np.ndarray:
+        """Distance in km from every row to the nearest point of `place`, computed once per place"""
+        key = place_key(place)
+        if key is None:
+            raise ValueError(f"Unknown place: {place}")
+        if key not in self._distances:
+            self._distances[key] = distance_km(self.latitude, self.longitude, key).astype(np.float32)
+        return self._distances[key]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.order, self.starts, self.sorted_latitude, self.sorted_longitude]
+        return sum(array.nbytes for array in arrays + list(self._distances.values()))
@@ -0,0 +1,357 @@
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.inventory.store import CategoricalColumn, PropertyStore
+
+
+class HashIndex:
+    """Posting lists of row ids for every value of a dictionary-encoded column"""
+
+    def __init__(self, column: CategoricalColumn, order: np.ndarray, bounds: np.ndarray):
+        self.column = column
+        self.order = order
+        self.bounds = bounds
+        self._postings: List[np.ndarray] = [
+            order[bounds[code] : bounds[code + 1]] for code in range(len(column.categories))
+        ]
+
+    @classmethod
+    def build(cls, column: CategoricalColumn) -> "HashIndex":
+        counts = np.bincount(column.codes, minlength=len(column.categories))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        # A stable sort keeps every posting list in ascending row order
+        order = np.argsort(column.codes, kind="stable")
+        return cls(column, order, bounds)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"order": self.order, "bounds": self.bounds}
+
+    @property
+    def cardinality(self) -> int:
+        """Number of distinct values in the column"""
+        return sum(1 for posting in self._postings if len(posting))
+
+    def count(self, value: str) -> int:
+        """Number of rows equal to `value`, ignoring case"""
+        return sum(len(self._postings[code]) for code in self.column.codes_for(value))
+
+    def lookup(self, value: str) -> np.ndarray:
+        """Sorted row ids equal to `value`, ignoring case"""
+        postings = [self._postings[code] for code in self.column.codes_for(value)]
+        if not postings:
+            return np.empty(0, dtype=np.intp)
+        if len(postings) == 1:
+            return postings[0]
+        return np.sort(np.concatenate(postings))
+
+
+class SortedIndex:
+    """Row ids ordered by a numeric column, range-scanned with binary search"""
+
+    def __init__(self, order: np.ndarray, sorted_values: np.ndarray):
+        self.order = order
+        self.sorted_values = sorted_values
+
+    @classmethod
+    def build(cls, values: np.ndarray) -> "SortedIndex":
+        order = np.argsort(values, kind="stable")
+        return cls(order, values[order])
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"order": self.order, "sorted_values": self.sorted_values}
+
+    def _bounds(self, low: Optional[float], high: Optional[float]) -> tuple[int, int]:
+        values = self.sorted_values
+        start = 0 if low is None else int(np.searchsorted(values, low, side="left"))
+        stop = len(values) if high is None else int(np.searchsorted(values, high, side="right"))
+        return start, max(start, stop)
+
+    def count(self, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Number of rows with `low <= value <= high`"""
+        start, stop = self._bounds(low, high)
+        return stop - start
+
+    def range(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """Row ids with `low <= value <= high`, in value order"""
+        start, stop = self._bounds(low, high)
+        return self.order[start:stop]
+
+
+class CompositeIndex:
+    """Rows grouped by a tuple of categorical columns and sorted by a numeric column within each group.
+
+    An equality match on every key column plus a range on the sort column is answered
+    by a binary search inside a single group, so only the matching rows are touched.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[CategoricalColumn],
+        order: np.ndarray,
+        sorted_values: np.ndarray,
+        bounds: np.ndarray,
+    ):
+        self.columns = list(columns)
+        self._sizes = [len(column.categories) for column in self.columns]
+        self.order = order
+        self.sorted_values = sorted_values
+        self._bounds = bounds
+
+    @classmethod
+    def build(cls, columns: Sequence[CategoricalColumn], sort_by: np.ndarray) -> "CompositeIndex":
+        sizes = [len(column.categories) for column in columns]
+        keys = np.zeros(len(sort_by), dtype=np.int64)
+        for column, size in zip(columns, sizes):
+            keys = keys * size + column.codes
+        order = np.lexsort((sort_by, keys))
+        counts = np.bincount(keys, minlength=int(np.prod(sizes)))
+        return cls(columns, order, sort_by[order], np.concatenate(([0], np.cumsum(counts))))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"order": self.order, "sorted_values": self.sorted_values, "bounds": self._bounds}
+
+    def _slices(self, values: Sequence[str], low: Optional[float], high: Optional[float]) -> List[slice]:
+        slices = []
+        for codes in product(*(column.codes_for(value) for column, value in zip(self.columns, values))):
+            key = 0
+            for code, size in zip(codes, self._sizes):
+                key = key * size + code
+            start, stop = int(self._bounds[key]), int(self._bounds[key + 1])
+            group = self.sorted_values[start:stop]
+            if low is not None:
+                start += int(np.searchsorted(group, low, side="left"))
+            if high is not None:
+                stop -= len(group) - int(np.searchsorted(group, high, side="right"))
+            if stop > start:
+                slices.append(slice(start, stop))
+        return slices
+
+    def count(self, values: Sequence[str], low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Number of rows equal to `values` on the key columns and within the range on the sort column"""
+        return sum(s.stop - s.start for s in self._slices(values, low, high))
+
+    def lookup(
+        self, values: Sequence[str], low: Optional[float] = None, high: Optional[float] = None
+    ) -> np.ndarray:
+        """Row ids equal to `values` on the key columns and within the range, in sort column order"""
+        slices = self._slices(values, low, high)
+        if not slices:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([self.order[s] for s in slices])
+
+
+# Numeric columns covered by the range index, in the order of its dimensions
+RANGE_COLUMNS = ["price", "square_feet", "bedrooms", "bathrooms"]
+
+
+def slice_positions(starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """Every position in the slices `starts[i]:stops[i]`, slice after slice"""
+    lengths = stops - starts
+    if not len(lengths):
+        return np.empty(0, dtype=np.intp)
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return shifts + np.arange(int(lengths.sum()))
+
+
+class RangeIndex:
+    """Static k-d tree over several numeric columns, answering box queries.
+
+    Each node splits its rows at the median of the dimension with the widest
+    relative spread, down to leaves of about `leaf_size` rows, so the tree is
+    complete and node `i` has children `2i + 1` and `2i + 2`. Rows are reordered
+    so every node covers a contiguous slice, and every node keeps the bounding
+    box of its rows. A query walks the tree one level at a time over all open
+    nodes at once: nodes inside the box are reported whole, nodes outside it are
+    dropped, and only the rows of leaves straddling its edges are tested. The work
+    grows with the rows returned and the surface of the box, not the inventory.
+    """
+
+    def __init__(
+        self,
+        order: np.ndarray,
+        values: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        starts: np.ndarray,
+        stops: np.ndarray,
+    ):
+        self.order = order
+        # Snapshots keep the 2-D arrays flattened, the node count gives their shape back
+        dimensions = lower.size // len(starts)
+        # One row per dimension, columns in `order`
+        self.values = values.reshape(dimensions, -1)
+        # Bounding box of every node, one row per node
+        self.lower = lower.reshape(len(starts), dimensions)
+        self.upper = upper.reshape(len(starts), dimensions)
+        self.starts = starts
+        self.stops = stops
+        self.depth = int(np.log2(len(starts) + 1)) - 1
+        self._last_walk: Optional[Tuple[Tuple[bytes, bytes], Tuple[np.ndarray, np.ndarray]]] = None
+
+    @classmethod
+    def build(cls, columns: Sequence[np.ndarray], leaf_size: int = 64) -> "RangeIndex":
+        count = len(columns[0])
+        values = np.vstack([np.asarray(column, dtype=np.float64) for column in columns])
+        order = np.arange(count)
+        depth = max(0, int(np.ceil(np.log2(max(count, 1) / leaf_size))))
+        nodes = 2 ** (depth + 1) - 1
+        starts = np.zeros(nodes, dtype=np.intp)
+        stops = np.zeros(nodes, dtype=np.intp)
+        stops[0] = count
+        # Splits are chosen on ranks, so skewed columns split as evenly as uniform ones
+        ranks = np.empty(values.shape, dtype=np.float32)
+        for dimension, row in enumerate(values):
+            by_value = np.argsort(row, kind="stable")
+            ordered = row[by_value]
+            # Equal values share the rank of the first of them
+            ranks[dimension, by_value] = np.searchsorted(ordered, ordered) / max(count, 1)
+        for node in range(nodes // 2):
+            start, stop = int(starts[node]), int(stops[node])
+            middle = start + (stop - start) // 2
+            if stop - start >= 2:
+                block = ranks[:, start:stop]
+                dimension = int(np.argmax(block.max(axis=1) - block.min(axis=1)))
+                key = block[dimension]
+                median = np.partition(key, middle - start)[middle - start]
+                below, equal = key < median, key == median
+                split = np.concatenate(
+                    (np.flatnonzero(below), np.flatnonzero(equal), np.flatnonzero(~below & ~equal))
+                )
+                # Keep equal values on one side when that leaves both sides at least a quarter
+                size, smaller = stop - start, int(below.sum())
+                boundaries = (smaller, smaller + int(equal.sum()))
+                for boundary in sorted(boundaries, key=lambda b: abs(b - size // 2)):
+                    if size // 4 <= boundary <= size - size // 4:
+                        middle = start + boundary
+                        break
+                values[:, start:stop] = values[:, start:stop][:, split]
+                ranks[:, start:stop] = block[:, split]
+                order[start:stop] = order[start:stop][split]
+            starts[2 * node + 1], stops[2 * node + 1] = start, middle
+            starts[2 * node + 2], stops[2 * node + 2] = middle, stop
+
+        # Leaf boxes from their rows, then every parent from its two children
+        lower = np.full((nodes, len(columns)), np.inf)
+        upper = np.full((nodes, len(columns)), -np.inf)
+        leaves = np.arange(nodes // 2, nodes)
+        filled = leaves[stops[leaves] > starts[leaves]]
+        if len(filled):
+            lower[filled] = np.minimum.reduceat(values, starts[filled], axis=1).T
+            upper[filled] = np.maximum.reduceat(values, starts[filled], axis=1).T
+        for level in range(depth - 1, -1, -1):
+            parents = np.arange(2**level - 1, 2 ** (level + 1) - 1)
+            lower[parents] = np.minimum(lower[2 * parents + 1], lower[2 * parents + 2])
+            upper[parents] = np.maximum(upper[2 * parents + 1], upper[2 * parents + 2])
+        return cls(order, values, lower, upper, starts, stops)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "order": self.order,
+            "values": self.values.ravel(),
+            "lower": self.lower.ravel(),
+            "upper": self.upper.ravel(),
+            "starts": self.starts,
+            "stops": self.stops,
+        }
+
+    def _walk(self, low: np.ndarray, high: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nodes inside the box `low <= value <= high`, and leaves only partly inside it"""
+        key = (low.tobytes(), high.tobytes())
+        last = self._last_walk
+        if last is not None and last[0] == key:
+            return last[1]
+        # Open sides never exclude a node, only the bounded dimensions are compared
+        bounded = np.flatnonzero(np.isfinite(low) | np.isfinite(high))
+        low, high = low[bounded], high[bounded]
+        lower_bounds, upper_bounds = self.lower[:, bounded], self.upper[:, bounded]
+        inside = []
+        frontier = np.zeros(1, dtype=np.intp)
+        for level in range(self.depth + 1):
+            lower, upper = lower_bounds[frontier], upper_bounds[frontier]
+            overlaps = ((upper >= low) & (lower <= high)).all(axis=1)
+            contained = overlaps & ((lower >= low) & (upper <= high)).all(axis=1)
+            inside.append(frontier[contained])
+            frontier = frontier[overlaps & ~contained]
+            if level < self.depth:
+                frontier = np.column_stack((2 * frontier + 1, 2 * frontier + 2)).ravel()
+        walk = np.concatenate(inside), frontier
+        # The planner estimates a box and then fetches it, both walk the same nodes
+        self._last_walk = (key, walk)
+        return walk
+
+    def estimate(self, low: Sequence[Optional[float]], high: Sequence[Optional[float]]) -> int:
+        """At least the number of rows in the box, counting every row of a partly covered leaf"""
+        inside, partial = self._walk(*self._box(low, high))
+        nodes = np.concatenate((inside, partial))
+        return int((self.stops[nodes] - self.starts[nodes]).sum())
+
+    def _box(
+        self, low: Sequence[Optional[float]], high: Sequence[Optional[float]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            np.array([-np.inf if value is None else value for value in low], dtype=np.float64),
+            np.array([np.inf if value is None else value for value in high], dtype=np.float64),
+        )
+
+    def range(self, low: Sequence[Optional[float]], high: Sequence[Optional[float]]) -> np.ndarray:
+        """Row ids with `low <= value <= high` in every dimension, None leaving a side open"""
+        box_low, box_high = self._box(low, high)
+        inside, partial = self._walk(box_low, box_high)
+        tested = slice_positions(self.starts[partial], self.stops[partial])
+        values = self.values[:, tested]
+        kept = tested[np.all((values >= box_low[:, None]) & (values <= box_high[:, None]), axis=0)]
+        positions = np.concatenate((slice_positions(self.starts[inside], self.stops[inside]), kept))
+        return self.order[positions]
+
+
+class PropertyIndexes:
+    """Secondary indexes over a `PropertyStore`.
+
+    Built from the store by default, or rebuilt without any sorting from the arrays
+    of a previous build, e.g. the ones saved in an inventory snapshot.
+    """
+
+    def __init__(self, store: PropertyStore, arrays: Optional[Dict[str, np.ndarray]] = None):
+        if arrays is None:
+            self.transaction_type = HashIndex.build(store.transaction_type)
+            self.type = HashIndex.build(store.type)
+            self.location = HashIndex.build(store.location)
+            self.price = SortedIndex.build(store.price)
+            self.listing = CompositeIndex.build(
+                [store.transaction_type, store.type, store.location], store.price
+            )
+            self.range = RangeIndex.build([getattr(store, name) for name in RANGE_COLUMNS])
+            return
+
+        def part(index: str, name: str) -> np.ndarray:
+            return arrays[f"{index}.{name}"]
+
+        self.transaction_type = HashIndex(
+            store.transaction_type, part("transaction_type", "order"), part("transaction_type", "bounds")
+        )
+        self.type = HashIndex(store.type, part("type", "order"), part("type", "bounds"))
+        self.location = HashIndex(store.location, part("location", "order"), part("location", "bounds"))
+        self.price = SortedIndex(part("price", "order"), part("price", "sorted_values"))
+        self.listing = CompositeIndex(
+            [store.transaction_type, store.type, store.location],
+            part("listing", "order"),
+            part("listing", "sorted_values"),
+            part("listing", "bounds"),
+        )
+        if "range.order" in arrays:
+            names = ["order", "values", "lower", "upper", "starts", "stops"]
+            self.range = RangeIndex(*(part("range", name) for name in names))
+        else:
+            # Snapshots written before the range index existed
+            self.range = RangeIndex.build([getattr(store, name) for name in RANGE_COLUMNS])
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Every array backing the indexes, keyed by index name and array name"""
+        arrays = {}
+        for name in ["transaction_type", "type", "location", "price", "listing", "range"]:
+            index = getattr(self, name)
+            for key, array in index.arrays().items():
+                arrays[f"{name}.{key}"] = array
+        return arrays
@@ -0,0 +1,259 @@
+"""Market statistics per location, property type and transaction type.
+
+For every group of comparable listings: how many there are, price and price
+per square foot percentiles, and how many have each number of bedrooms. The
+assistant reads them to suggest a realistic budget, so a lookup is one dict
+access and never scans the inventory.
+
+Prices are kept as histograms over bins growing by BIN_RATIO, so listings can
+be added and removed by adjusting counts, and only the summaries of the groups
+that changed are recomputed. Percentiles are the middle of their bin, within
+half a percent of the exact value.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.inventory.store import CategoricalColumn, PropertyStore
+
+PERCENTILES = (10, 25, 50, 75, 90)
+# Each price bin is this much wider than the one below it
+BIN_RATIO = 1.01
+# Prices and prices per square foot outside this range go to the first or last bin
+_LOWEST, _HIGHEST = 0.1, 1e9
+_BINS = math.ceil(math.log(_HIGHEST / _LOWEST) / math.log(BIN_RATIO)) + 1
+# Bedroom counts from 0 up to this, larger counts are counted here
+_MAX_BEDROOMS = 15
+
+# (location, property type, transaction type), lower case
+GroupKey = Tuple[str, str, str]
+
+
+def _bins(values: np.ndarray) -> np.ndarray:
+    """Bin of every value"""
+    bins = np.floor(np.log(np.maximum(values, _LOWEST) / _LOWEST) / math.log(BIN_RATIO))
+    return np.minimum(bins, _BINS - 1).astype(np.intp)
+
+
+def _percentiles(histogram: np.ndarray, count: int) -> Dict[int, float]:
+    """Value at each of PERCENTILES, the geometric middle of the bin it falls in"""
+    if not count:
+        return {}
+    cumulative = np.cumsum(histogram)
+    ranks = np.ceil(np.asarray(PERCENTILES) / 100 * count)
+    bins = np.searchsorted(cumulative, np.maximum(ranks, 1))
+    return {p: round(_LOWEST * BIN_RATIO ** (int(b) + 0.5), 2) for p, b in zip(PERCENTILES, bins)}
+
+
+@dataclass(frozen=True)
+class MarketSummary:
+    """What the listings of one location, property type and transaction type look like"""
+
+    location: str
+    property_type: str
+    transaction_type: str
+    count: int
+    # Percentile -> value, e.g. {50: 1750.0} for a median of €1,750
+    price: Dict[int, float]
+    price_per_sqft: Dict[int, float]
+    # Bedroom count -> listings, counts without listings left out
+    bedrooms: Dict[int, int]
+
+    def describe(self) -> str:
+        """One line for the assistant: count, median and middle half of prices, price per sq ft, bedrooms"""
+        action = "to rent" if self.transaction_type.lower() == "rent" else "to buy"
+        if not self.count:
+            return f"{self.location}, {self.property_type} {action}: no listings"
+        bedrooms = ", ".join(f"{rooms} bed {count:,}" for rooms, count in self.bedrooms.items())
+        return (
+            f"{self.location}, {self.property_type} {action}: {self.count:,} listings, "
+            f"median €{self.price[50]:,.0f}, middle half €{self.price[25]:,.0f}-€{self.price[75]:,.0f}, "
+            f"median €{self.price_per_sqft[50]:,.2f} per sq ft, bedrooms {bedrooms}"
+        )
+
+
+class _Group:
+    """Histograms of one group of listings"""
+
+    def __init__(self, names: Tuple[str, str, str]):
+        self.names = names
+        self.count = 0
+        self.price = np.zeros(_BINS, dtype=np.int64)
+        self.price_per_sqft = np.zeros(_BINS, dtype=np.int64)
+        self.bedrooms = np.zeros(_MAX_BEDROOMS + 1, dtype=np.int64)
+
+    def copy(self) -> "_Group":
+        group = _Group(self.names)
+        group.count = self.count
+        group.price = self.price.copy()
+        group.price_per_sqft = self.price_per_sqft.copy()
+        group.bedrooms = self.bedrooms.copy()
+        return group
+
+    def summary(self) -> MarketSummary:
+        location, property_type, transaction_type = self.names
+        return MarketSummary(
+            location=location,
+            property_type=property_type,
+            transaction_type=transaction_type,
+            count=self.count,
+            price=_percentiles(self.price, self.count),
+            price_per_sqft=_percentiles(self.price_per_sqft, self.count),
+            bedrooms={int(rooms): int(self.bedrooms[rooms]) for rooms in np.flatnonzero(self.bedrooms)},
+        )
+
+
+class MarketStats:
+    """Market summaries of every location, property type and transaction type.
+
+    Built from a store with `from_store`, then kept up to date with `add` and
+    `remove`. A reloaded inventory gets its statistics from `refreshed`, which
+    only applies the listings that differ.
+    """
+
+    def __init__(self) -> None:
+        self._groups: Dict[GroupKey, _Group] = {}
+        self._summaries: Dict[GroupKey, MarketSummary] = {}
+
+    @classmethod
+    def from_store(cls, store: PropertyStore) -> "MarketStats":
+        stats = cls()
+        stats.add(store, np.arange(len(store)))
+        return stats
+
+    def _groups_of(self, store: PropertyStore, rows: np.ndarray) -> Iterator[Tuple[_Group, np.ndarray]]:
+        """Every group `rows` fall in and the rows in it, creating groups on first sight"""
+        codes = (store.location.codes[rows], store.type.codes[rows], store.transaction_type.codes[rows])
+        shape = (
+            len(store.location.categories),
+            len(store.type.categories),
+            len(store.transaction_type.categories),
+        )
+        cells = np.ravel_multi_index(codes, shape)
+        order = np.argsort(cells, kind="stable")
+        boundaries = np.flatnonzero(np.diff(cells[order])) + 1
+        for members in np.split(rows[order], boundaries) if len(rows) else []:
+            row = int(members[0])
+            names = (store.location[row], store.type[row], store.transaction_type[row])
+            key = (names[0].lower(), names[1].lower(), names[2].lower())
+            if key not in self._groups:
+                self._groups[key] = _Group(names)
+            yield self._groups[key], members
+
+    def _update(self, store: PropertyStore, rows: np.ndarray, sign: int) -> None:
+        rows = np.asarray(rows, dtype=np.intp)
+        for group, members in self._groups_of(store, rows):
+            price = store.price[members]
+            per_sqft = price / np.maximum(store.square_feet[members], 1.0)
+            bedrooms = np.clip(store.bedrooms[members], 0, _MAX_BEDROOMS)
+            group.count += sign * len(members)
+            group.price += sign * np.bincount(_bins(price), minlength=_BINS)
+            group.price_per_sqft += sign * np.bincount(_bins(per_sqft), minlength=_BINS)
+            group.bedrooms += sign * np.bincount(bedrooms, minlength=_MAX_BEDROOMS + 1)
+            key = (group.names[0].lower(), group.names[1].lower(), group.names[2].lower())
+            self._summaries[key] = group.summary()
+
+    def add(self, store: PropertyStore, rows: np.ndarray) -> None:
+        """Count the listings at `rows` of `store`"""
+        self._update(store, rows, 1)
+
+    def remove(self, store: PropertyStore, rows: np.ndarray) -> None:
+        """Stop counting the listings at `rows` of `store`, which must have been added"""
+        self._update(store, rows, -1)
+
+    def copy(self) -> "MarketStats":
+        stats = MarketStats()
+        stats._groups = {key: group.copy() for key, group in self._groups.items()}
+        stats._summaries = dict(self._summaries)
+        return stats
+
+    def refreshed(self, old: PropertyStore, new: PropertyStore) -> "MarketStats":
+        """Statistics of `new`, from these statistics of `old` and the listings that differ.
+
+        Listings are matched by id. A listing whose price, size, bedrooms or group
+        changed is removed with its old values and added with its new ones.
+        """
+        removed, added = changed_rows(old, new)
+        stats = self.copy()
+        stats.remove(old, removed)
+        stats.add(new, added)
+        return stats
+
+    def summary(self, location: str, property_type: str, transaction_type: str) -> Optional[MarketSummary]:
+        """Summary of one group, None if it never had listings"""
+        return self._summaries.get((location.lower(), property_type.lower(), transaction_type.lower()))
+
+    def summaries(
+        self,
+        location: Optional[str] = None,
+        property_type: Optional[str] = None,
+        transaction_type: Optional[str] = None,
+    ) -> List[MarketSummary]:
+        """Summaries of the groups with listings matching the given fields, largest first"""
+        fields = (location, property_type, transaction_type)
+        wanted = [None if value is None else value.lower() for value in fields]
+        found = [
+            summary
+            for key, summary in self._summaries.items()
+            if summary.count and all(value is None or value == part for value, part in zip(wanted, key))
+        ]
+        return sorted(found, key=lambda summary: -summary.count)
+
+
+def _translated(old: CategoricalColumn, new: CategoricalColumn) -> np.ndarray:
+    """Code in `new` of every category of `old` ignoring case, -1 when it has none"""
+    lookup = {category.lower(): code for code, category in reversed(list(enumerate(new.categories)))}
+    return np.asarray([lookup.get(category.lower(), -1) for category in old.categories], dtype=np.int64)
+
+
+def _matching_rows(old_ids: np.ndarray, new_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of the ids found in both, in `old_ids` and in `new_ids`"""
+    if not len(old_ids) or not len(new_ids):
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    low, high = int(min(old_ids.min(), new_ids.min())), int(max(old_ids.max(), new_ids.max()))
+    if high - low < 4 * (len(old_ids) + len(new_ids)):
+        # Dense ids: look rows up in a table indexed by id instead of searching
+        table = np.full(high - low + 1, -1, dtype=np.intp)
+        table[old_ids - low] = np.arange(len(old_ids))
+        old_rows = table[new_ids - low]
+    else:
+        sorter = np.argsort(old_ids, kind="stable")
+        positions = np.minimum(np.searchsorted(old_ids, new_ids, sorter=sorter), len(old_ids) - 1)
+        old_rows = sorter[positions]
+        old_rows[old_ids[old_rows] != new_ids] = -1
+    found = old_rows >= 0
+    return old_rows[found], np.flatnonzero(found)
+
+
+def changed_rows(old: PropertyStore, new: PropertyStore) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of `old` gone from `new` or changed in it, and rows of `new` that are new or changed"""
+    if np.array_equal(old.ids, new.ids):
+        # Same listings in the same rows, compare whole columns instead of gathering them
+        old_rows: Union[slice, np.ndarray] = slice(None)
+        new_rows: Union[slice, np.ndarray] = slice(None)
+    else:
+        old_rows, new_rows = _matching_rows(old.ids, new.ids)
+    same = (
+        (old.price[old_rows] == new.price[new_rows])
+        & (old.square_feet[old_rows] == new.square_feet[new_rows])
+        & (old.bedrooms[old_rows] == new.bedrooms[new_rows])
+    )
+    for old_column, new_column in (
+        (old.location, new.location),
+        (old.type, new.type),
+        (old.transaction_type, new.transaction_type),
+    ):
+        if old_column.categories == new_column.categories:
+            same &= old_column.codes[old_rows] == new_column.codes[new_rows]
+            continue
+        # Compare categories by their first spelling in `new`, codes differ between stores
+        old_codes = _translated(old_column, new_column)[old_column.codes[old_rows]]
+        same &= old_codes == _translated(new_column, new_column)[new_column.codes[new_rows]]
+    kept_old = np.zeros(len(old), dtype=bool)
+    kept_old[np.arange(len(old))[old_rows][same]] = True
+    kept_new = np.zeros(len(new), dtype=bool)
+    kept_new[np.arange(len(new))[new_rows][same]] = True
+    return np.flatnonzero(~kept_old), np.flatnonzero(~kept_new)
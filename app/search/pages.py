@@ -0,0 +1,78 @@
+import hashlib
+from dataclasses import dataclass, replace
+
+from app.search.conditions import describe
+from app.search.query import PropertyQuery
+
+# Listings per page in the carousel and the sidebar
+DEFAULT_PAGE_SIZE = 10
+
+
+def query_fingerprint(query: PropertyQuery) -> str:
+    """Short stable digest identifying `query`, the same for equal queries in any process"""
+    key = (
+        query.transaction_type,
+        query.property_type,
+        query.location,
+        query.min_price,
+        query.max_price,
+        query.min_bedrooms,
+        query.max_bedrooms,
+        query.min_bathrooms,
+        query.max_bathrooms,
+        query.min_square_feet,
+        query.max_square_feet,
+        sorted(query.required_features),
+        sorted(query.excluded_features),
+        describe(query.where) if query.where is not None else None,
+        query.near,
+        query.within_km,
+        query.keywords,
+    )
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class PageHandle:
+    """A position in the ranked results of a search.
+
+    A handle holds the query rather than its matches, so keeping one costs the
+    same whether ten or a million listings match. Pages are fetched from it on
+    demand with `fetch_page`.
+    """
+
+    query: PropertyQuery
+    fingerprint: str
+    inventory_version: int
+    total: int
+    # Ranked position of the first listing on the page
+    cursor: int = 0
+    page_size: int = DEFAULT_PAGE_SIZE
+
+    @property
+    def page(self) -> int:
+        return self.cursor // self.page_size
+
+    @property
+    def pages(self) -> int:
+        return -(-self.total // self.page_size)
+
+    @property
+    def has_next(self) -> bool:
+        return self.cursor + self.page_size < self.total
+
+    @property
+    def has_previous(self) -> bool:
+        return self.cursor > 0
+
+    def next(self) -> "PageHandle":
+        return replace(self, cursor=self.cursor + self.page_size)
+
+    def previous(self) -> "PageHandle":
+        return replace(self, cursor=max(self.cursor - self.page_size, 0))
+
+    def first(self) -> "PageHandle":
+        return replace(self, cursor=0)
+
+    def last(self) -> "PageHandle":
+        return replace(self, cursor=max(self.pages - 1, 0) * self.page_size)
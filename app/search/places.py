@@ -0,0 +1,91 @@
+"""Places a search can be near, and great-circle distances to them.
+
+A place is one of the `POINTS_OF_INTEREST` by name ("Larnaca Airport"), a
+kind of them ("beach", meaning whichever beach is nearest), or a location, which
+stands for its centre. Names are matched ignoring case and a leading "the".
+
+Radius tests never run the haversine over every row: a bounding box around
+each point is compared against the raw coordinates first, and only the rows
+inside it get an exact distance.
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.property import EARTH_RADIUS_KM, LOCATION_COORDINATES, POINTS_OF_INTEREST
+
+
+def _places() -> Dict[str, List[Tuple[float, float]]]:
+    """Place key -> the (latitude, longitude) of every point it stands for"""
+    places: Dict[str, List[Tuple[float, float]]] = {}
+    for poi in POINTS_OF_INTEREST:
+        places[poi.name.lower()] = [(poi.latitude, poi.longitude)]
+        places.setdefault(poi.kind, []).append((poi.latitude, poi.longitude))
+    for name, centre in LOCATION_COORDINATES.items():
+        places.setdefault(name.lower(), [centre])
+    return places
+
+
+PLACES = _places()
+
+
+def place_key(name: str) -> Optional[str]:
+    """Normalize a place such as "the Beach" to its PLACES key, None if unknown"""
+    key = " ".join(name.lower().split())
+    key = key[4:] if key.startswith("the ") else key
+    return key if key in PLACES else None
+
+
+def place_points(name: str) -> np.ndarray:
+    """The (latitude, longitude) rows of every point `name` stands for"""
+    key = place_key(name)
+    if key is None:
+        raise ValueError(f"Unknown place: {name}")
+    return np.array(PLACES[key])
+
+
+def haversine_km(latitude, longitude, point_latitude: float, point_longitude: float):
+    """Great-circle distance in km from each coordinate to one point"""
+    latitude = np.radians(latitude)
+    point = math.radians(point_latitude)
+    half_dlat = (latitude - point) / 2
+    half_dlon = (np.radians(longitude) - math.radians(point_longitude)) / 2
+    a = np.sin(half_dlat) ** 2 + np.cos(latitude) * math.cos(point) * np.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of the smallest box holding every point within `radius_km`.
+
+    Boxes do not wrap around the poles or the antimeridian, every inventory so far is in Cyprus.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    ratio = math.sin(angle) / max(math.cos(math.radians(latitude)), 1e-12)
+    dlon = 180.0 if ratio >= 1 else math.degrees(math.asin(ratio))
+    # A hair wider, so rounding never leaves a point on the circle outside its box
+    dlat, dlon = dlat + 1e-9, dlon + 1e-9
+    return latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon
+
+
+def distance_km(latitude: np.ndarray, longitude: np.ndarray, place: str) -> np.ndarray:
+    """Distance in km from each coordinate to the nearest point of `place`"""
+    points = place_points(place)
+    distance = haversine_km(latitude, longitude, *points[0])
+    for point in points[1:]:
+        distance = np.minimum(distance, haversine_km(latitude, longitude, *point))
+    return distance
+
+
+def within_mask(latitude: np.ndarray, longitude: np.ndarray, place: str, radius_km: float) -> np.ndarray:
+    """Boolean mask of the coordinates within `radius_km` of any point of `place`"""
+    mask = np.zeros(len(latitude), dtype=bool)
+    for point_latitude, point_longitude in place_points(place):
+        south, west, north, east = bounding_box(point_latitude, point_longitude, radius_km)
+        boxed = (latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east)
+        rows = np.flatnonzero(boxed & ~mask)
+        distance = haversine_km(latitude[rows], longitude[rows], point_latitude, point_longitude)
+        mask[rows] = distance <= radius_km
+    return mask
@@ -0,0 +1,172 @@
+from dataclasses import dataclass, replace
+from functools import cached_property, partial
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.inventory.store import PropertyStore
+from app.search.bitmaps import BitmapIndex, query_condition
+from app.search.geo import GeoIndex
+from app.search.indexes import PropertyIndexes
+from app.search.query import PropertyQuery
+from app.search.text import TextIndex, tokenize
+
+# Above this fraction of the inventory a sequential mask is cheaper than gathering rows
+SCAN_THRESHOLD = 0.25
+# Range index rows come from scattered leaves and are costlier to gather than a sorted run
+RANGE_SCAN_THRESHOLD = 0.05
+
+
+@dataclass
+class AccessPath:
+    """One way of producing candidate rows for a query"""
+
+    name: str
+    estimated_rows: int
+    fetch: Callable[[], np.ndarray]
+
+
+@dataclass
+class QueryPlan:
+    """How a query will be executed"""
+
+    access_path: str
+    estimated_rows: int
+    candidates: List[str]
+
+
+def _numeric(query: PropertyQuery) -> PropertyQuery:
+    """`query` without its categorical and feature predicates"""
+    return replace(
+        query,
+        transaction_type=None,
+        property_type=None,
+        location=None,
+        required_features=frozenset(),
+        excluded_features=frozenset(),
+        where=None,
+    )
+
+
+class QueryPlanner:
+    """Selectivity-aware search over a `PropertyStore`.
+
+    Every indexed predicate of a query is costed from the index statistics. The
+    most selective one produces the candidate rows, and the remaining predicates
+    are only evaluated against those candidates. A query fixing transaction type,
+    property type and location is answered from the composite listing index,
+    which also applies the price range by binary search. Ranges on size, bedrooms
+    or bathrooms go through the k-d tree over the numeric columns, together with
+    any price range. When no index narrows the search enough the planner falls
+    back to a full vectorized scan. Keywords are matched through the full-text
+    index, built on the first keyword search. Boolean conditions, such as several
+    locations at once, are evaluated on the bitmap index, built on the first search
+    with a condition. Searches within a distance of a place go through the grid
+    index over the coordinates, built on the first search near a place.
+    """
+
+    def __init__(self, store: PropertyStore, indexes: Optional[PropertyIndexes] = None):
+        self.store = store
+        self.indexes = indexes or PropertyIndexes(store)
+
+    @cached_property
+    def text_index(self) -> TextIndex:
+        return TextIndex(self.store)
+
+    @cached_property
+    def bitmap_index(self) -> BitmapIndex:
+        return BitmapIndex(self.store, self.indexes)
+
+    @cached_property
+    def geo_index(self) -> GeoIndex:
+        return GeoIndex(self.store.latitude, self.store.longitude)
+
+    def _access_paths(self, query: PropertyQuery) -> List[AccessPath]:
+        paths = []
+        for name, value, index in (
+            ("transaction_type", query.transaction_type, self.indexes.transaction_type),
+            ("property_type", query.property_type, self.indexes.type),
+            ("location", query.location, self.indexes.location),
+        ):
+            if value:
+                paths.append(AccessPath(name, index.count(value), partial(index.lookup, value)))
+        if query.min_price is not None or query.max_price is not None:
+            price = self.indexes.price
+            low, high = query.min_price, query.max_price
+            paths.append(AccessPath("price", price.count(low, high), partial(price.range, low, high)))
+        # Bounds in RANGE_COLUMNS order; price alone is better served by the sorted price index
+        lows = [query.min_price, query.min_square_feet, query.min_bedrooms, query.min_bathrooms]
+        highs = [query.max_price, query.max_square_feet, query.max_bedrooms, query.max_bathrooms]
+        if any(value is not None for value in lows[1:] + highs[1:]):
+            box = self.indexes.range
+            estimate = box.estimate(lows, highs)
+            if estimate <= RANGE_SCAN_THRESHOLD * len(self.store):
+                paths.append(AccessPath("range", estimate, partial(box.range, lows, highs)))
+        if query.transaction_type and query.property_type and query.location:
+            listing = self.indexes.listing
+            key = (query.transaction_type, query.property_type, query.location)
+            low, high = query.min_price, query.max_price
+            paths.append(
+                AccessPath("listing", listing.count(key, low, high), partial(listing.lookup, key, low, high))
+            )
+        condition = query_condition(query) if query.where is not None else None
+        if condition is not None:
+            bitmaps = self.bitmap_index
+            estimate = bitmaps.estimate(condition)
+            paths.append(AccessPath("bitmap", estimate, partial(bitmaps.lookup, condition)))
+        if query.near and query.within_km is not None:
+            geo = self.geo_index
+            estimate = geo.estimate(query.near, query.within_km)
+            paths.append(AccessPath("geo", estimate, partial(geo.near, query.near, query.within_km)))
+        if query.keywords:
+            text = self.text_index
+            estimate = text.estimate(tokenize(query.keywords))
+            paths.append(AccessPath("keywords", estimate, partial(text.matching, query.keywords)))
+        return sorted(paths, key=lambda path: path.estimated_rows)
+
+    def _driver(self, paths: List[AccessPath]) -> Optional[AccessPath]:
+        if paths and paths[0].estimated_rows <= SCAN_THRESHOLD * len(self.store):
+            return paths[0]
+        # A scan still runs the haversine on every row in the bounding box, the grid only on its edge cells
+        return next((path for path in paths if path.name == "geo"), None)
+
+    def plan(self, query: PropertyQuery) -> QueryPlan:
+        """Choose the access path for `query` without executing it"""
+        paths = self._access_paths(query)
+        driver = self._driver(paths)
+        names = [path.name for path in paths]
+        if driver is None:
+            return QueryPlan("scan", len(self.store), names)
+        return QueryPlan(driver.name, driver.estimated_rows, names)
+
+    def execute(self, query: PropertyQuery, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Return the row ids matching `query`, in inventory order.
+
+        `candidates` are rows, in inventory order, already known to contain every
+        match, e.g. the matches of a query this one refines. They are filtered
+        directly when they are fewer than the best access path would fetch.
+        """
+        driver = self._driver(self._access_paths(query))
+        driver_rows = driver.estimated_rows if driver else len(self.store)
+        if candidates is not None and len(candidates) <= driver_rows:
+            rows = self.store.filter(query, candidates)
+        elif driver is None:
+            rows = self.store.filter(query)
+        else:
+            fetched = driver.fetch()
+            if len(fetched) == 0:
+                return fetched
+            if driver.name == "bitmap":
+                # Bitmaps answer every categorical and feature predicate, in inventory order
+                rows = self.store.filter(_numeric(query), fetched)
+            elif driver.name == "geo":
+                # Every fetched row is already within the distance, and they come sorted
+                rows = self.store.filter(replace(query, near=None, within_km=None), fetched)
+            else:
+                # Index scans come back in index order, restore inventory order
+                rows = np.sort(self.store.filter(query, fetched))
+            if driver.name == "keywords":
+                return rows
+        if query.keywords:
+            rows = self.text_index.matching(query.keywords, rows)
+        return rows
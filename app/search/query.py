@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from app.models.property import feature_key
+from app.search.conditions import Condition, conjuncts, normalized
+from app.search.places import place_key
+
+
+def _fold(value: Optional[str]) -> Optional[str]:
+    return (value.strip().lower() or None) if value is not None else None
+
+
+def _fold_keywords(keywords: Optional[str]) -> Optional[str]:
+    return (" ".join(keywords.lower().split()) or None) if keywords is not None else None
+
+
+def _round_price(price: Optional[float]) -> Optional[float]:
+    return round(float(price), 2) if price is not None else None
+
+
+def _int(value: Optional[int]) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+def _float(value: Optional[float]) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _place(name: Optional[str]) -> Optional[str]:
+    # Unknown places are kept so they still fail when the query runs
+    return (place_key(name) or _fold(name)) if name is not None else None
+
+
+def _feature_keys(names: FrozenSet[str]) -> FrozenSet[str]:
+    # Unknown names are kept so they still fail when the query runs
+    return frozenset(feature_key(name) or name for name in names)
+
+
+@dataclass(frozen=True)
+class PropertyQuery:
+    """Structured property search, one field per supported filter"""
+
+    transaction_type: Optional[str] = None
+    property_type: Optional[str] = None
+    location: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_bedrooms: Optional[int] = None
+    max_bedrooms: Optional[int] = None
+    min_bathrooms: Optional[int] = None
+    max_bathrooms: Optional[int] = None
+    min_square_feet: Optional[float] = None
+    max_square_feet: Optional[float] = None
+    required_features: FrozenSet[str] = frozenset()
+    excluded_features: FrozenSet[str] = frozenset()
+    # Any AND/OR/NOT combination of categorical values and features, e.g. several locations
+    where: Optional[Condition] = None
+    # A point of interest, kind of them or location, see `app.search.places`. Matches are limited to
+    # `within_km` of it when that is set, and ranked closer first either way
+    near: Optional[str] = None
+    within_km: Optional[float] = None
+    # Free text matched against titles, descriptions and feature names, any word may match
+    keywords: Optional[str] = None
+
+    def normalized(self) -> "PropertyQuery":
+        """The same search in canonical form, so equivalent queries compare and hash equal.
+
+        Strings are case-folded, keyword whitespace collapsed, prices rounded to
+        the cent, counts made integers, feature names mapped to their FEATURES keys,
+        places to their PLACES keys and conditions put in canonical form.
+        """
+        return PropertyQuery(
+            transaction_type=_fold(self.transaction_type),
+            property_type=_fold(self.property_type),
+            location=_fold(self.location),
+            min_price=_round_price(self.min_price),
+            max_price=_round_price(self.max_price),
+            min_bedrooms=_int(self.min_bedrooms),
+            max_bedrooms=_int(self.max_bedrooms),
+            min_bathrooms=_int(self.min_bathrooms),
+            max_bathrooms=_int(self.max_bathrooms),
+            min_square_feet=_float(self.min_square_feet),
+            max_square_feet=_float(self.max_square_feet),
+            required_features=_feature_keys(self.required_features),
+            excluded_features=_feature_keys(self.excluded_features),
+            where=normalized(self.where) if self.where is not None else None,
+            near=_place(self.near),
+            within_km=_float(self.within_km),
+            keywords=_fold_keywords(self.keywords),
+        )
+
+    def refines(self, other: "PropertyQuery") -> bool:
+        """Whether every listing matching this query also matches `other`.
+
+        True when this query only keeps or tightens the constraints of `other`,
+        both taken in normalized form.
+        """
+        for mine, theirs in (
+            (self.transaction_type, other.transaction_type),
+            (self.property_type, other.property_type),
+            (self.location, other.location),
+            (self.keywords, other.keywords),
+        ):
+            if theirs is not None and mine != theirs:
+                return False
+        for low, other_low in (
+            (self.min_price, other.min_price),
+            (self.min_bedrooms, other.min_bedrooms),
+            (self.min_bathrooms, other.min_bathrooms),
+            (self.min_square_feet, other.min_square_feet),
+        ):
+            if other_low is not None and (low is None or low < other_low):
+                return False
+        for high, other_high in (
+            (self.max_price, other.max_price),
+            (self.max_bedrooms, other.max_bedrooms),
+            (self.max_bathrooms, other.max_bathrooms),
+            (self.max_square_feet, other.max_square_feet),
+        ):
+            if other_high is not None and (high is None or high > other_high):
+                return False
+        if other.where is not None:
+            # Only tightened by adding conditions, each listing must still meet every earlier one
+            if self.where is None or not conjuncts(self.where) >= conjuncts(other.where):
+                return False
+        if other.near and other.within_km is not None:
+            if self.near != other.near or self.within_km is None or self.within_km > other.within_km:
+                return False
+        return (
+            self.required_features >= other.required_features
+            and self.excluded_features >= other.excluded_features
+        )
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import numpy as np
+
+from app.inventory.store import PropertyStore
+from app.models.property import features_mask
+from app.search.conditions import AllOf, AnyOf, Condition, Term
+from app.search.query import PropertyQuery
+
+# Listings shown for a search when no other limit is given
+DEFAULT_TOP_K = 10
+
+
+@dataclass(frozen=True)
+class RankingWeights:
+    """Contribution of each signal to a listing's score, every signal is scaled to [0, 1]"""
+
+    budget: float = 0.4
+    bedrooms: float = 0.15
+    amenities: float = 0.2
+    price_per_square_foot: float = 0.25
+    # Only applies to keyword searches
+    keywords: float = 0.5
+    # Only applies to searches near a place
+    distance: float = 0.5
+
+
+DEFAULT_WEIGHTS = RankingWeights()
+
+
+def _budget_fit(price: np.ndarray, query: PropertyQuery) -> np.ndarray:
+    """1 at the middle of the budget, falling to 0 at its edges"""
+    if query.max_price is not None:
+        low = query.min_price or 0.0
+        midpoint, spread = (low + query.max_price) / 2, (query.max_price - low) / 2
+    elif query.min_price:
+        # No upper bound: the closer to the minimum the better, 0 from twice the minimum
+        midpoint, spread = query.min_price, query.min_price
+    else:
+        return np.zeros(len(price))
+    if spread <= 0:
+        return (price == midpoint).astype(np.float64)
+    return 1 - np.minimum(np.abs(price - midpoint) / spread, 1)
+
+
+def _bedroom_surplus(bedrooms: np.ndarray, query: PropertyQuery) -> np.ndarray:
+    """Bedrooms beyond the requested minimum, with diminishing returns"""
+    surplus = np.maximum(bedrooms - (query.min_bedrooms or 0), 0).astype(np.float64)
+    return surplus / (surplus + 1)
+
+
+def _wanted_features(condition: Condition) -> Iterator[str]:
+    """Features a condition asks for, leaving out the ones it rules out"""
+    if isinstance(condition, Term):
+        if condition.field == "feature":
+            yield condition.value
+    elif isinstance(condition, (AllOf, AnyOf)):
+        for child in condition.conditions:
+            yield from _wanted_features(child)
+
+
+def _amenity_match(features: np.ndarray, query: PropertyQuery) -> np.ndarray:
+    """Share of the features the query asks for that each listing has, 0 when it asks for none"""
+    names = set(query.required_features)
+    if query.where is not None:
+        names.update(_wanted_features(query.where))
+    if not names:
+        return np.zeros(len(features))
+    return np.bitwise_count(features & features_mask(names)) / len(names)
+
+
+def _relative_value(price: np.ndarray, square_feet: np.ndarray) -> np.ndarray:
+    """1 for the cheapest price per square foot among the candidates, 0 for the dearest"""
+    price_per_square_foot = price / np.maximum(square_feet, 1)
+    low, high = price_per_square_foot.min(), price_per_square_foot.max()
+    if high == low:
+        return np.ones(len(price))
+    return (high - price_per_square_foot) / (high - low)
+
+
+def _closeness(distance: np.ndarray) -> np.ndarray:
+    """1 for the candidate nearest the place searched for, 0 for the farthest or one without coordinates"""
+    distance = np.nan_to_num(distance, nan=np.inf)
+    located = np.isfinite(distance)
+    if not located.any():
+        return np.zeros(len(distance))
+    low, high = distance[located].min(), distance[located].max()
+    if high == low:
+        return located.astype(np.float64)
+    return np.where(located, (high - np.minimum(distance, high)) / (high - low), 0.0)
+
+
+def score(
+    store: PropertyStore,
+    rows: np.ndarray,
+    query: PropertyQuery,
+    weights: RankingWeights = DEFAULT_WEIGHTS,
+    relevance: Optional[np.ndarray] = None,
+    distance: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Preference fit of each of `rows` for `query`, higher is better.
+
+    `relevance` holds the keyword scores of `rows` (e.g. BM25), scaled so the
+    most relevant listing among them counts fully. `distance` holds the km from
+    each of `rows` to the place the query is near, the nearest counting fully.
+    """
+    if len(rows) == 0:
+        return np.zeros(0)
+    price = store.price[rows]
+    scores = (
+        weights.budget * _budget_fit(price, query)
+        + weights.bedrooms * _bedroom_surplus(store.bedrooms[rows], query)
+        + weights.amenities * _amenity_match(store.features[rows], query)
+        + weights.price_per_square_foot * _relative_value(price, store.square_feet[rows])
+    )
+    if relevance is not None and relevance.max() > 0:
+        scores += weights.keywords * relevance / relevance.max()
+    if distance is not None:
+        scores += weights.distance * _closeness(distance)
+    return scores
+
+
+def top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """The `k` best scoring rows, best first, without sorting the rest.
+
+    Selection is a linear `np.partition`, only the `k` survivors are sorted, so
+    ranking n matches costs O(n + k log k). Ties are broken by row, so the same
+    inputs always give the same order.
+    """
+    if k <= 0 or len(rows) == 0:
+        return rows[:0]
+    if k < len(rows):
+        # Everything strictly above the k-th best score, then the first of the ties
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[: k - len(above)]
+        selected = np.concatenate((above, tied))
+    else:
+        selected = np.arange(len(rows))
+    order = np.lexsort((rows[selected], -scores[selected]))
+    return rows[selected[order]]
+
+
+def rank(
+    store: PropertyStore,
+    rows: np.ndarray,
+    query: PropertyQuery,
+    k: int = DEFAULT_TOP_K,
+    weights: RankingWeights = DEFAULT_WEIGHTS,
+    relevance: Optional[np.ndarray] = None,
+    distance: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """The `k` rows among `rows` that best fit `query`, best first"""
+    return top_k(rows, score(store, rows, query, weights, relevance, distance), k)
@@ -0,0 +1,190 @@
+"""Similar listings ("more like this") by nearest neighbours over numeric features.
+
+A listing is described by its log price, log floor area, bedrooms and
+bathrooms, each standardized within its transaction type, plus one dimension
+per feature bit. Rents and sales are never similar to each other, and a
+listing elsewhere is LOCATION_PENALTY further away, so there is one KD-tree per
+transaction type and location; other locations are only searched while that
+penalty can still beat the current k-th neighbour.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.inventory.store import PropertyStore
+from app.models.property import FEATURE_BITS
+
+# Squared distance added for a listing in another location
+LOCATION_PENALTY = 2.0
+# Weight of each feature bit: one differing feature adds 0.25 to the squared distance
+FEATURE_WEIGHT = 0.5
+# Points per leaf, scored together with one vectorized distance computation
+LEAF_SIZE = 32
+
+
+class KDTree:
+    """Static KD-tree over the rows of a matrix, exact k nearest neighbours by Euclidean distance.
+
+    Nodes split at the median of their widest dimension. Points are reordered so
+    every leaf is a contiguous slice, and node fields are plain lists because the
+    search reads them one at a time.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE):
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(points))
+        # Per node: split dimension (-1 for a leaf), split value, children, and the leaf's slice
+        self._dimension: List[int] = []
+        self._value: List[float] = []
+        self._children: List[Tuple[int, int]] = []
+        self._slice: List[Tuple[int, int]] = []
+        if len(points):
+            self._build(points, 0, len(points))
+        self.points = points[self.order]
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _build(self, points: np.ndarray, start: int, end: int) -> int:
+        node = len(self._dimension)
+        self._dimension.append(-1)
+        self._value.append(0.0)
+        self._children.append((-1, -1))
+        self._slice.append((start, end))
+        if end - start <= self.leaf_size:
+            return node
+        members = self.order[start:end]
+        values = points[members]
+        spread = values.max(axis=0) - values.min(axis=0)
+        dimension = int(np.argmax(spread))
+        if spread[dimension] == 0:
+            # Identical points, nothing left to split on
+            return node
+        middle = (end - start) // 2
+        partition = np.argpartition(values[:, dimension], middle)
+        self.order[start:end] = members[partition]
+        self._dimension[node] = dimension
+        self._value[node] = float(values[partition[middle], dimension])
+        left = self._build(points, start, start + middle)
+        right = self._build(points, start + middle, end)
+        self._children[node] = (left, right)
+        return node
+
+    def query(self, point: np.ndarray, k: int, bound: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions of the `k` points nearest to `point` and their squared distances, nearest first.
+
+        Only points closer than `bound` (a squared distance) are returned.
+        """
+        if not len(self):
+            return np.zeros(0, dtype=np.intp), np.zeros(0)
+        best_distances = np.zeros(0)
+        best_positions = np.zeros(0, dtype=np.intp)
+        kth = bound
+        # Nodes still to visit by the lower bound on their distance, with the
+        # offset of `point` from their box along every dimension making up that bound
+        pending = [(0.0, 0, (0.0,) * point.shape[0])]
+        while pending:
+            lower, node, offsets = heapq.heappop(pending)
+            if lower >= kth:
+                break
+            dimension = self._dimension[node]
+            if dimension < 0:
+                start, end = self._slice[node]
+                distances = ((self.points[start:end] - point) ** 2).sum(axis=1)
+                best_distances = np.concatenate((best_distances, distances))
+                best_positions = np.concatenate((best_positions, np.arange(start, end)))
+                if len(best_distances) > k:
+                    keep = np.argpartition(best_distances, k - 1)[:k]
+                    best_distances, best_positions = best_distances[keep], best_positions[keep]
+                if len(best_distances) == k:
+                    kth = min(bound, float(best_distances.max()))
+                continue
+            offset = float(point[dimension]) - self._value[node]
+            left, right = self._children[node]
+            near, far = (left, right) if offset < 0 else (right, left)
+            heapq.heappush(pending, (lower, near, offsets))
+            far_lower = lower - offsets[dimension] ** 2 + offset * offset
+            if far_lower < kth:
+                far_offsets = offsets[:dimension] + (offset,) + offsets[dimension + 1 :]
+                heapq.heappush(pending, (far_lower, far, far_offsets))
+        within = best_distances < bound
+        best_distances, best_positions = best_distances[within], best_positions[within]
+        order = np.lexsort((self.order[best_positions], best_distances))
+        return self.order[best_positions[order]], best_distances[order]
+
+
+def _standardized(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """`values` minus the mean of their group, over the standard deviation of the group"""
+    result = np.zeros(len(values), dtype=np.float64)
+    for group in np.unique(groups):
+        members = groups == group
+        spread = values[members].std()
+        result[members] = (values[members] - values[members].mean()) / (spread if spread > 0 else 1.0)
+    return result
+
+
+def listing_vectors(store: PropertyStore) -> np.ndarray:
+    """The vector each listing is compared by, one row per listing"""
+    transaction = store.transaction_type.codes
+    columns = [
+        _standardized(np.log1p(store.price), transaction),
+        _standardized(np.log1p(store.square_feet), transaction),
+        _standardized(store.bedrooms.astype(np.float64), transaction),
+        _standardized(store.bathrooms.astype(np.float64), transaction),
+    ]
+    columns += [FEATURE_WEIGHT * ((store.features & bit) != 0) for bit in FEATURE_BITS.values()]
+    return np.column_stack(columns).astype(np.float32)
+
+
+class SimilarListings:
+    """Nearest listings to a given listing, built once per inventory"""
+
+    def __init__(self, store: PropertyStore):
+        self.store = store
+        self.vectors = listing_vectors(store)
+        # (transaction code, location code) -> rows of that group and the tree over them
+        self._trees: Dict[Tuple[int, int], Tuple[np.ndarray, KDTree]] = {}
+        keys = store.transaction_type.codes.astype(np.int64) * 65536 + store.location.codes
+        order = np.argsort(keys, kind="stable")
+        boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+        for rows in np.split(order, boundaries) if len(order) else []:
+            key = (int(store.transaction_type.codes[rows[0]]), int(store.location.codes[rows[0]]))
+            self._trees[key] = (rows, KDTree(self.vectors[rows]))
+
+    def similar_rows(self, row: int, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the `k` listings most like `row`, nearest first, and their distances"""
+        transaction = int(self.store.transaction_type.codes[row])
+        location = int(self.store.location.codes[row])
+        point = self.vectors[row]
+        rows: List[np.ndarray] = []
+        distances: List[np.ndarray] = []
+
+        def search(key: Tuple[int, int], penalty: float, kth: float) -> None:
+            group, tree = self._trees[key]
+            # One extra neighbour, the listing itself is dropped below
+            positions, squared = tree.query(point, k + 1, bound=max(kth - penalty, 0.0))
+            rows.append(group[positions])
+            distances.append(squared + penalty)
+
+        search((transaction, location), 0.0, np.inf)
+        for key in self._trees:
+            if key[0] == transaction and key[1] != location:
+                found = np.concatenate(distances)
+                kth = np.sort(found)[k] if len(found) > k else np.inf
+                if LOCATION_PENALTY < kth:
+                    search(key, LOCATION_PENALTY, kth)
+
+        found_rows, found_distances = np.concatenate(rows), np.concatenate(distances)
+        others = found_rows != row
+        found_rows, found_distances = found_rows[others], found_distances[others]
+        order = np.lexsort((found_rows, found_distances))[:k]
+        return found_rows[order], np.sqrt(found_distances[order])
+
+    def similar(self, property_id: int, k: int = 5) -> Optional[np.ndarray]:
+        """Rows of the `k` listings most like the listing with id `property_id`, None if there is none"""
+        row = self.store.row_of(property_id)
+        if row is None:
+            return None
+        return self.similar_rows(row, k)[0]
@@ -0,0 +1,208 @@
+"""BM25 keyword search over listing titles, descriptions and feature names.
+
+Most listing text is repeated: a title, a location or a description template is
+shared by thousands of listings. The inverted index therefore tokenizes each
+distinct field value once, and a term's postings are the field values holding
+it, with their counts, rather than a list of rows. The rows of a posting are the
+rows whose code for that field is the value's code, so postings are resolved
+with one table lookup over the code column. Feature names are posted against
+their bit of the feature mask.
+
+Scoring is Okapi BM25 over the whole document (title, description and feature
+names together), with the usual k1 = 1.2 and b = 0.75, evaluated densely over
+the candidate rows.
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.inventory.generator import DescriptionColumn
+from app.inventory.store import CategoricalColumn, PropertyStore
+from app.models.property import DESCRIPTION_TEMPLATES, FEATURE_BITS
+
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_PLACEHOLDER = re.compile(r"\{\w+\}")
+# A term held by this few values of a field is looked up by comparing codes, by a gather above
+_MAX_COMPARISONS = 8
+# Above this fraction of the inventory, rows are scored by scoring the whole inventory
+_DENSE_FRACTION = 0.25
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in includes include is it its of on or the this to with"
+    " comes featuring located situated perfect".split()
+)
+
+
+def _stem(token: str) -> str:
+    # Plural to singular only: "villas" -> "villa", "gardens" -> "garden", but not "glass"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of `text` without stopwords, plurals folded to the singular"""
+    return [_stem(token) for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _fields(store: PropertyStore) -> Tuple[List[Tuple[np.ndarray, Sequence[str]]], int]:
+    """Code column and values of every field of the document, and how often feature names occur in it"""
+    fields: List[Tuple[np.ndarray, Sequence[str]]] = [(store.title.codes, store.title.categories)]
+    if isinstance(store.description, DescriptionColumn):
+        # A generated description is its template plus the type, location and feature names
+        description = store.description
+        templates = [_PLACEHOLDER.sub(" ", template) for template in DESCRIPTION_TEMPLATES]
+        fields.append((description.templates, templates))
+        fields.append((description.type.codes, description.type.categories))
+        fields.append((description.location.codes, description.location.categories))
+        return fields, 2
+    column = CategoricalColumn.encode(store.description)
+    fields.append((column.codes, column.categories))
+    return fields, 1
+
+
+def _lookup(table: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """`table[codes]` for a uint8 table, comparing codes when only a few entries are non-zero"""
+    holders = np.flatnonzero(table)
+    if len(holders) > _MAX_COMPARISONS:
+        return np.take(table, codes)
+    result = np.zeros(len(codes), dtype=np.uint8)
+    for code in holders:
+        result += (codes == code).view(np.uint8) * table[code]
+    return result
+
+
+class TextIndex:
+    """Inverted index with BM25 scoring, built once per inventory"""
+
+    def __init__(self, store: PropertyStore):
+        self.size = len(store)
+        self._features = store.features
+        fields, feature_mentions = _fields(store)
+        self._codes = [codes for codes, _ in fields]
+        self._sizes = [np.bincount(codes, minlength=len(values)) for codes, values in fields]
+
+        # term -> [(field, count of the term per value code)]
+        self._postings: Dict[str, List[Tuple[int, np.ndarray]]] = {}
+        lengths = np.zeros(self.size, dtype=np.int32)
+        for f, (codes, values) in enumerate(fields):
+            value_lengths = np.zeros(len(values), dtype=np.int32)
+            for code, value in enumerate(values):
+                counts = Counter(tokenize(value))
+                value_lengths[code] = sum(counts.values())
+                for term, count in counts.items():
+                    if term not in self._postings or self._postings[term][-1][0] != f:
+                        self._postings.setdefault(term, []).append((f, np.zeros(len(values), dtype=np.uint8)))
+                    self._postings[term][-1][1][code] = min(count, 255)
+            lengths += value_lengths[codes]
+
+        # term -> [(feature bit, count)]
+        self._feature_postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._feature_counts: Dict[int, int] = {}
+        for name, bit in FEATURE_BITS.items():
+            counts = Counter(tokenize(name.replace("_", " ")))
+            has_feature = (store.features & bit) != 0
+            lengths += has_feature * (sum(counts.values()) * feature_mentions)
+            self._feature_counts[bit] = int(np.count_nonzero(has_feature))
+            for term, count in counts.items():
+                self._feature_postings.setdefault(term, []).append((bit, count * feature_mentions))
+
+        self._length_norm = (K1 * (1 - B + B * lengths / max(float(lengths.mean()), 1.0))).astype(np.float32)
+        self._document_frequencies: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def estimate(self, terms: Iterable[str]) -> int:
+        """Upper bound on the number of rows containing any of `terms`"""
+        terms = set(terms)
+        if not terms:
+            return self.size
+        total = 0
+        for term in terms:
+            for f, counts in self._postings.get(term, ()):
+                total += int(self._sizes[f][counts > 0].sum())
+            for bit, _ in self._feature_postings.get(term, ()):
+                total += self._feature_counts[bit]
+        return min(total, self.size)
+
+    def _term_frequencies(
+        self, term: str, rows: Optional[np.ndarray], codes: Dict[int, np.ndarray]
+    ) -> np.ndarray:
+        """How often `term` occurs in each of `rows`, or in every row when `rows` is None"""
+        tf = np.zeros(self.size if rows is None else len(rows), dtype=np.uint8)
+        for f, counts in self._postings.get(term, ()):
+            if f not in codes:
+                codes[f] = self._codes[f] if rows is None else self._codes[f][rows]
+            tf += _lookup(counts, codes[f])
+        if term in self._feature_postings:
+            features = self._features if rows is None else self._features[rows]
+            for bit, count in self._feature_postings[term]:
+                tf += ((features & bit) != 0).view(np.uint8) * np.uint8(count)
+        return tf
+
+    def _document_frequency(self, term: str) -> int:
+        """Number of rows containing `term`, counted once per term"""
+        with self._lock:
+            df = self._document_frequencies.get(term)
+        if df is None:
+            df = int(np.count_nonzero(self._term_frequencies(term, None, {})))
+            with self._lock:
+                self._document_frequencies[term] = df
+        return df
+
+    def score_rows(self, text: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """BM25 scores of `text` for `rows` (every row when None), 0 for rows without any of its terms"""
+        if rows is not None and len(rows) > _DENSE_FRACTION * self.size:
+            # Scoring every row in place is cheaper than gathering the columns of most of them
+            return self.score_rows(text)[rows]
+        scores = np.zeros(self.size if rows is None else len(rows), dtype=np.float32)
+        if len(scores) == 0:
+            return scores
+        length_norm = self._length_norm if rows is None else self._length_norm[rows]
+        codes: Dict[int, np.ndarray] = {}
+        for term in set(tokenize(text)):
+            df = self._document_frequency(term)
+            if df == 0:
+                continue
+            tf = self._term_frequencies(term, rows, codes)
+            idf = np.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            # idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average length)), in place
+            contribution = tf + length_norm
+            np.divide(tf, contribution, out=contribution)
+            contribution *= np.float32(idf * (K1 + 1))
+            scores += contribution
+        return scores
+
+    def scores(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows matching any term of `text` in inventory order, and their BM25 scores"""
+        scores = self.score_rows(text)
+        rows = np.flatnonzero(scores > 0)
+        return rows, scores[rows]
+
+    def matching(self, text: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rows containing any term of `text`, restricted to `rows` (in inventory order) when given.
+
+        Text made only of stopwords constrains nothing.
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return np.arange(self.size) if rows is None else rows
+        # Whether each value of a field holds any of the terms, and the bits of the matching features
+        tables: Dict[int, np.ndarray] = {}
+        bits = 0
+        for term in terms:
+            for f, counts in self._postings.get(term, ()):
+                holds = (counts > 0).view(np.uint8)
+                tables[f] = tables[f] | holds if f in tables else holds
+            for bit, _ in self._feature_postings.get(term, ()):
+                bits |= bit
+        features = self._features if rows is None else self._features[rows]
+        matched = (features & bits) != 0
+        for f, table in tables.items():
+            matched |= _lookup(table, self._codes[f] if rows is None else self._codes[f][rows]).view(bool)
+        return np.flatnonzero(matched) if rows is None else rows[matched]
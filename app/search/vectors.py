@@ -0,0 +1,196 @@
+"""Approximate nearest-neighbour search over listing embeddings.
+
+`IVFIndex` is an inverted file index: k-means splits the vectors into lists
+around centroids, and a search only scores the vectors in the `nprobe` lists
+whose centroids are closest to the query. Vectors are stored once, in id order,
+and the lists only hold ids, so a search restricted to a candidate set can also
+gather those candidates directly and score them exactly. Storage is float32,
+4 bytes per dimension and listing: converting float16 on every search costs
+more than the scoring itself.
+"""
+
+import logging
+import math
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.inventory.store import PropertyStore
+from app.search.embeddings import Embedder, listing_text
+from app.search.ranking import DEFAULT_TOP_K, top_k
+
+logger = logging.getLogger(__name__)
+
+# Candidate sets up to this size are scored exactly instead of probing lists
+EXACT_SEARCH_ROWS = 20_000
+# Vectors scored per batch when assigning them to lists
+_ASSIGN_BATCH = 65_536
+
+
+def list_count(size: int) -> int:
+    """Number of IVF lists for `size` vectors, about the square root"""
+    return max(1, int(round(np.sqrt(size))))
+
+
+def _best(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The `k` best ids and their scores, best first and equal scores by id"""
+    positions = top_k(np.arange(len(ids)), scores, k)
+    positions = positions[np.lexsort((ids[positions], -scores[positions]))]
+    return ids[positions], scores[positions]
+
+
+class IVFIndex:
+    """Inverted file index over unit vectors, similarity is the inner product.
+
+    Ids are insertion positions: the first vector added is 0, the next 1, and so on.
+    """
+
+    def __init__(self, dimensions: int, lists: int, nprobe: Optional[int] = None):
+        self.dimensions = dimensions
+        self.lists = lists
+        # Enough lists to see most true neighbours, see tests/benchmarks/vector_search.py
+        self.nprobe = nprobe or min(lists, max(16, lists // 32))
+        self.centroids = np.zeros((0, dimensions), dtype=np.float32)
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._size = 0
+        self._ids: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Every vector added, in id order"""
+        return self._vectors[: self._size]
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Index of the nearest centroid of each vector"""
+        return np.concatenate(
+            [
+                np.argmax(vectors[start : start + _ASSIGN_BATCH] @ centroids.T, axis=1)
+                for start in range(0, len(vectors), _ASSIGN_BATCH)
+            ]
+            or [np.zeros(0, dtype=np.intp)]
+        )
+
+    def train(self, sample: np.ndarray, iterations: int = 10, seed: int = 0) -> None:
+        """Place the list centroids with spherical k-means over `sample`"""
+        rng = np.random.default_rng(seed)
+        lists = min(self.lists, len(sample))
+        centroids = sample[rng.choice(len(sample), lists, replace=False)].astype(np.float32)
+        for _ in range(iterations):
+            assignment = self._assign(sample, centroids)
+            counts = np.bincount(assignment, minlength=lists)
+            order = np.argsort(assignment, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            filled = counts > 0
+            sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+            centroids[filled] = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+            # Lists nobody joined restart from random vectors
+            empty = np.flatnonzero(~filled)
+            centroids[empty] = sample[rng.choice(len(sample), len(empty))]
+        self.centroids = centroids
+        self.lists = lists
+        self._ids = [np.zeros(0, dtype=np.int32) for _ in range(lists)]
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Insert a batch of vectors, returning their ids"""
+        if len(self.centroids) == 0:
+            raise RuntimeError("IVFIndex must be trained before vectors are added")
+        end = self._size + len(vectors)
+        if end > len(self._vectors):
+            grown = np.zeros((max(end, 2 * len(self._vectors)), self.dimensions), dtype=np.float32)
+            grown[: self._size] = self.vectors
+            self._vectors = grown
+        self._vectors[self._size : end] = vectors
+        ids = np.arange(self._size, end, dtype=np.int32)
+        self._size = end
+
+        assignment = self._assign(vectors, self.centroids)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(self.lists + 1))
+        for list_id in np.flatnonzero(np.diff(bounds)):
+            joined = ids[order[bounds[list_id] : bounds[list_id + 1]]]
+            self._ids[list_id] = np.concatenate((self._ids[list_id], joined))
+        return ids
+
+    def exact(
+        self, query: np.ndarray, k: int, candidates: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """The `k` nearest ids and their similarities by scoring every vector, or every candidate"""
+        ids = np.arange(self._size) if candidates is None else np.asarray(candidates)
+        vectors = self.vectors if candidates is None else self._vectors[ids]
+        return _best(ids, vectors @ query, k)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = DEFAULT_TOP_K,
+        candidates: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """The `k` ids most similar to `query`, best first, and their similarities.
+
+        With `candidates` only those ids are returned. Candidate sets no larger
+        than what probing would score are scored exactly. Otherwise more lists
+        are probed the fewer candidates there are, so about as many candidates
+        are scored as a search without them would score vectors. Twice as many
+        lists are probed again until `k` candidates were seen or every list was.
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        nprobe = nprobe or self.nprobe
+        allowed = None
+        if candidates is not None:
+            if len(candidates) <= max(EXACT_SEARCH_ROWS, nprobe * self._size / self.lists):
+                return self.exact(query, k, candidates)
+            nprobe = math.ceil(nprobe * self._size / len(candidates))
+            allowed = np.zeros(self._size, dtype=bool)
+            allowed[candidates] = True
+
+        ranked_lists = np.argsort(-(self.centroids @ query), kind="stable")
+        found_ids: List[np.ndarray] = []
+        found_scores: List[np.ndarray] = []
+        found, probed = 0, 0
+        while probed < len(ranked_lists):
+            lists = ranked_lists[probed:nprobe]
+            probed = nprobe
+            nprobe *= 2
+            ids = np.concatenate([self._ids[list_id] for list_id in lists])
+            if allowed is not None:
+                ids = ids[allowed[ids]]
+            found_ids.append(ids)
+            found_scores.append(self._vectors[ids] @ query)
+            found += len(ids)
+            if found >= k:
+                break
+        return _best(np.concatenate(found_ids), np.concatenate(found_scores), k)
+
+
+class SemanticIndex:
+    """Every listing of a store embedded into an `IVFIndex`, ids are inventory rows"""
+
+    def __init__(self, store: PropertyStore, embedder: Embedder, batch_size: int = 20_000, seed: int = 0):
+        start = time.perf_counter()
+        self.store = store
+        self.embedder = embedder
+        self.index = IVFIndex(embedder.dimensions, lists=list_count(len(store)))
+        if len(store):
+            # k-means wants a few dozen vectors per list, drawn from the whole inventory
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(len(store), min(len(store), 64 * self.index.lists), replace=False))
+            self.index.train(self._embed(sample), seed=seed)
+            for offset in range(0, len(store), batch_size):
+                self.index.add(self._embed(np.arange(offset, min(offset + batch_size, len(store)))))
+        logger.info(f"Embedded {len(store):,} listings in {time.perf_counter() - start:.1f}s")
+
+    def _embed(self, rows: np.ndarray) -> np.ndarray:
+        return self.embedder.embed([listing_text(self.store, int(row)) for row in rows])
+
+    def search(
+        self, text: str, k: int = DEFAULT_TOP_K, candidates: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the `k` listings closest in meaning to `text`, best first, and their similarities"""
+        if len(self.index) == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return self.index.search(self.embedder.embed([text])[0], k, candidates)
@@ -0,0 +1,242 @@
+"""Rule-based extraction of simple preferences from a user's message.
+
+Many messages only fill in a preference or two: "rent", "apartment in Larnaca",
+"max 1200". `extract_preferences` recognizes transaction types, property types,
+locations (misspelt ones too), prices and bedroom and bathroom counts with a
+handful of patterns, in well under a millisecond, so they are applied and
+searched before the assistant is asked anything. When every other word of the
+message is filler the turn is pure slot filling, `Extraction.complete` is set
+and the chat can answer it without the assistant.
+
+Anything it is unsure of is left to the assistant: a question, a message with
+a negation ("not in Kiti") or one naming both transaction types gives no
+preferences, a location after "from" ("moving from Kiti") is not one they want,
+and a number without a currency, "budget" or "max" around it is not a price. A
+room count is a minimum, "2 bedrooms" takes larger places too.
+"""
+
+import re
+from dataclasses import dataclass, field
+from difflib import get_close_matches
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.property import CYPRUS_LOCATIONS, PROPERTY_TYPES
+
+TRANSACTION_WORDS = {
+    "buy": "buy",
+    "buying": "buy",
+    "purchase": "buy",
+    "purchasing": "buy",
+    "sale": "buy",
+    "rent": "rent",
+    "renting": "rent",
+    "rental": "rent",
+    "lease": "rent",
+    "leasing": "rent",
+}
+PROPERTY_TYPE_WORDS = {
+    **{name: name for name in PROPERTY_TYPES},
+    **{name + "s": name for name in PROPERTY_TYPES},
+    "flat": "apartment",
+    "flats": "apartment",
+    "houses": "house",
+    "villa": "house",
+    "villas": "house",
+}
+NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+}
+# Words that carry no preference of their own
+FILLER_WORDS = set(
+    "a an and any are around budget can could do eur euro euros for get hello hi i i'd i'm id im in is it"
+    " just like looking looks me month monthly my need of ok okay or per please price prefer preferably"
+    " property properties range search show so some something the to want we would".split()
+)
+# Words that turn a preference around, the assistant deals with these
+NEGATIONS = set("but don't dont except exclude excluding isn't never no not without".split())
+# And words asking about places rather than choosing them, like "?"
+QUESTIONS = set("? compare difference how what what's which who why".split())
+# Words after which a location is where the client is, not where they want to be
+ORIGIN_WORDS = set("from leaving".split())
+# Least similarity for a misspelt word to count as a location
+LOCATION_CUTOFF = 0.8
+# Smallest price taken without a currency or a "k", "at least 3" is no price
+MIN_BARE_PRICE = 100
+
+_LOCATIONS = {name.lower(): name for name in CYPRUS_LOCATIONS}
+_NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+_ROOMS = r"(bed(?:room)?s?|br|baths?(?:room)?s?)\b"
+_AT_LEAST = r"at least|min(?:imum)?|from|over|above|more than"
+_AT_MOST = r"at most|max(?:imum)?|up to|under|below|less than|no more than|budget(?: of| is)?"
+_AMOUNT = r"(€\s*)?(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(k|m)?\b\s*(€|eur(?:os?)?\b)?"
+
+_ROOM_RANGE = re.compile(rf"\b{_NUMBER}\s*(?:-|to|or)\s*{_NUMBER}\s*-?\s*{_ROOMS}")
+_ROOM_COUNT = re.compile(rf"(?:\b({_AT_LEAST}|{_AT_MOST})\s+)?\b{_NUMBER}\s*(\+)?\s*-?\s*{_ROOMS}")
+_PRICE_RANGE = re.compile(rf"(?:\b(between)\s+)?{_AMOUNT}\s*(?:-|to|and)\s*{_AMOUNT}")
+_PRICE_BOUND = re.compile(rf"\b({_AT_LEAST}|{_AT_MOST})\s*:?\s*{_AMOUNT}")
+_PRICE = re.compile(_AMOUNT)
+_WORD = re.compile(r"[a-z][a-z'-]*|\d+|\S")
+
+
+@dataclass
+class Extraction:
+    """Preferences found in a message, and whether they account for all of it"""
+
+    preferences: Dict[str, Any] = field(default_factory=dict)
+    complete: bool = False
+
+
+def _count(word: str) -> int:
+    return NUMBER_WORDS.get(word) or int(word)
+
+
+def _amount(
+    currency: Optional[str], digits: str, scale: Optional[str], suffix: Optional[str], bare: bool = True
+) -> Optional[float]:
+    """The price an _AMOUNT match stands for, None for a small number with `bare` and no currency or scale"""
+    value = float(digits.replace(",", "")) * {"k": 1_000, "m": 1_000_000}.get(scale or "", 1)
+    if not (currency or scale or suffix) and (not bare or value < MIN_BARE_PRICE):
+        return None
+    return value
+
+
+def _rooms(unit: str) -> str:
+    return "bathrooms" if unit.startswith("bath") else "bedrooms"
+
+
+def _is_lower_bound(word: str) -> bool:
+    return re.fullmatch(_AT_LEAST, word) is not None
+
+
+def _numbers(text: str, preferences: Dict[str, Any]) -> str:
+    """Take room counts and prices out of `text` into `preferences`, returning what is left"""
+
+    def room_range(match: re.Match) -> str:
+        rooms = _rooms(match.group(3))
+        preferences[f"min_{rooms}"], preferences[f"max_{rooms}"] = sorted(map(_count, match.group(1, 2)))
+        return " "
+
+    def room_count(match: re.Match) -> str:
+        bound, number, plus, unit = match.groups()
+        rooms = _rooms(unit)
+        # "2 bedrooms" is at least two, as the assistant reads it too
+        if bound is None or plus or _is_lower_bound(bound):
+            preferences[f"min_{rooms}"] = _count(number)
+        else:
+            preferences[f"max_{rooms}"] = _count(number)
+        return " "
+
+    def price_range(match: re.Match) -> str:
+        between, *amounts = match.groups()
+        # "1200 to 1500" alone could be anything, it needs "between" or a currency or scale
+        marked = between or any(amounts[i] for i in (0, 2, 3, 4, 6, 7))
+        low, high = _amount(*amounts[:4]), _amount(*amounts[4:])
+        if not marked or low is None or high is None:
+            return match.group()
+        preferences["min_price"], preferences["max_price"] = min(low, high), max(low, high)
+        return " "
+
+    def price_bound(match: re.Match) -> str:
+        bound, *amount = match.groups()
+        value = _amount(*amount)
+        if value is None:
+            return match.group()
+        preferences["min_price" if _is_lower_bound(bound) else "max_price"] = value
+        return " "
+
+    def price(match: re.Match) -> str:
+        # A number on its own is only a budget with a currency or a scale
+        currency, digits, scale, suffix = match.groups()
+        value = _amount(currency, digits, scale, suffix, bare=False)
+        if value is None:
+            return match.group()
+        preferences["max_price"] = value
+        return " "
+
+    text = _ROOM_RANGE.sub(room_range, text)
+    text = _ROOM_COUNT.sub(room_count, text)
+    text = _PRICE_RANGE.sub(price_range, text)
+    text = _PRICE_BOUND.sub(price_bound, text)
+    return _PRICE.sub(price, text)
+
+
+def _choice(values: List[str]) -> Any:
+    """One value, or the list of values any of which will do"""
+    values = list(dict.fromkeys(values))
+    return values[0] if len(values) == 1 else values
+
+
+def extract_preferences(text: str) -> Extraction:
+    """Preferences stated plainly in `text`, see the module docstring"""
+    preferences: Dict[str, Any] = {}
+    rest = _numbers(text.lower(), preferences)
+    words = _WORD.findall(rest)
+    if NEGATIONS.intersection(words) or QUESTIONS.intersection(words):
+        return Extraction()
+
+    transactions: List[str] = []
+    types: List[str] = []
+    locations: List[str] = []
+    leftover = []
+    for number, word in enumerate(words):
+        if number and words[number - 1] in ORIGIN_WORDS:
+            # "moving from Kiti", the assistant works out what it means for the search
+            leftover.append(word)
+        elif word in TRANSACTION_WORDS:
+            transactions.append(TRANSACTION_WORDS[word])
+        elif word in PROPERTY_TYPE_WORDS:
+            types.append(PROPERTY_TYPE_WORDS[word])
+        elif word in _LOCATIONS:
+            locations.append(_LOCATIONS[word])
+        elif word in FILLER_WORDS or not word[0].isalnum():
+            continue
+        else:
+            match = get_close_matches(word, _LOCATIONS, n=1, cutoff=LOCATION_CUTOFF) if len(word) > 3 else []
+            if match:
+                locations.append(_LOCATIONS[match[0]])
+            else:
+                leftover.append(word)
+
+    if len(set(transactions)) > 1:
+        return Extraction()
+    if transactions:
+        preferences["transaction_type"] = transactions[0]
+    if types:
+        preferences["property_type"] = _choice(types)
+    if locations:
+        preferences["location"] = _choice(locations)
+    return Extraction(preferences, complete=bool(preferences) and not leftover)
+
+
+def describe_preferences(preferences: Dict[str, Any]) -> str:
+    """Short readable form of extracted preferences, e.g. "rent, apartment, Larnaca, up to €1,200" """
+    parts: List[str] = []
+    for key in ["transaction_type", "property_type", "location"]:
+        value = preferences.get(key)
+        if value:
+            parts.append(" or ".join(value) if isinstance(value, list) else value)
+    bounds: List[Tuple[str, str, str]] = [
+        ("price", "€{:,.0f}", ""),
+        ("bedrooms", "{}", " bedrooms"),
+        ("bathrooms", "{}", " bathrooms"),
+    ]
+    for name, number, unit in bounds:
+        low, high = preferences.get(f"min_{name}"), preferences.get(f"max_{name}")
+        if low is not None and low == high:
+            parts.append(number.format(low) + unit)
+        elif low is not None and high is not None:
+            parts.append(f"{number.format(low)} to {number.format(high)}{unit}")
+        elif low is not None:
+            parts.append(f"at least {number.format(low)}{unit}")
+        elif high is not None:
+            parts.append(f"up to {number.format(high)}{unit}")
+    return ", ".join(parts)
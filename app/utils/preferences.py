@@ -1,4 +1,18 @@
 import streamlit as st
+from typing import Any, Dict, Optional
+from app.models.property import feature_key
+from app.search.conditions import describe, parse_condition, terms
+from app.search.facets import FacetCounts
+from app.search.pages import PageHandle, query_fingerprint
+from app.search.places import place_key
+
+# Preference keys the assistant may set, in filter_properties argument order
+PREFERENCE_FIELDS = [
+    "transaction_type", "property_type", "location", "min_price", "max_price",
+    "min_bedrooms", "max_bedrooms", "min_bathrooms", "max_bathrooms", "min_square_feet",
+    "max_square_feet", "required_features", "excluded_features", "keywords", "where", "near",
+    "within_km"
+]
 
 def is_preferences_complete() -> bool:
     """Check if essential preferences are complete"""
@@ -19,43 +33,125 @@ def get_missing_preferences() -> list[str]:
         missing.append("preferred location")
     return missing
 
-def update_preferences(preferences: dict) -> bool:
-    """Update preferences and return whether they changed"""
-    changed = False
+def apply_preferences(preferences: dict) -> list[str]:
+    """Store preferences from a tool call, reply JSON or the message and return the fields that changed"""
+    updated_fields = []
     for key, value in preferences.items():
-        if key in ["transaction_type", "property_type", "location", 
-                  "min_price", "max_price", "min_bedrooms"]:
+        if key in PREFERENCE_FIELDS:
             if st.session_state.get(key) != value:
                 st.session_state[key] = value
-                changed = True
-    return changed
-
-def get_matching_properties():
-    """Get matching properties based on preferences"""
-    from app.utils.property_filters import filter_properties
+                updated_fields.append(f"{key}: {value}")
     
-    properties = filter_properties(
-        transaction_type=st.session_state.transaction_type,
-        property_type=st.session_state.property_type,
-        location=st.session_state.location,
-        min_price=st.session_state.min_price,
-        max_price=st.session_state.max_price,
-        min_bedrooms=st.session_state.min_bedrooms
+    if updated_fields:
+        st.toast(
+            "Updated preferences:\n" + "\n".join(updated_fields),
+            icon="✅"
+        )
+    return updated_fields
+
+def get_preference_filters() -> Dict[str, Any]:
+    """Return the session preferences as filter_properties keyword arguments"""
+    filters: Dict[str, Any] = {key: st.session_state.get(key) for key in PREFERENCE_FIELDS}
+    # Feature names come from the assistant, drop the ones we don't know about
+    for key in ["required_features", "excluded_features"]:
+        if filters[key]:
+            filters[key] = [name for name in filters[key] if feature_key(name)]
+    # So are conditions, drop one that doesn't parse or names an unknown feature
+    if filters["where"] is not None and describe_condition(filters["where"]) is None:
+        filters["where"] = None
+    # And places, a search near one we have no coordinates for is dropped
+    if filters["near"] and not place_key(filters["near"]):
+        filters["near"] = filters["within_km"] = None
+    return filters
+
+def describe_condition(where) -> Optional[str]:
+    """Readable form of a `where` preference, None when it is not a valid condition"""
+    try:
+        condition = parse_condition(where)
+    except (TypeError, ValueError):
+        return None
+    if any(term.field == "feature" and not feature_key(term.value) for term in terms(condition)):
+        return None
+    return describe(condition)
+
+def has_preferences() -> bool:
+    """Check whether any preference is set"""
+    return any(st.session_state.get(key) for key in PREFERENCE_FIELDS)
+
+def get_facet_counts() -> FacetCounts:
+    """Return the facet counts of the listings matching the current preferences"""
+    from app.utils.property_filters import facet_counts
+
+    return facet_counts(**get_preference_filters())
+
+def get_market_context() -> Optional[str]:
+    """Describe typical prices for the preferred location, None until a location is known"""
+    from app.utils.property_filters import market_summaries
+
+    location = st.session_state.get("location")
+    if not location:
+        return None
+    summaries = market_summaries(
+        location, st.session_state.get("property_type"), st.session_state.get("transaction_type")
     )
+    if not summaries:
+        return None
+    return "\n".join(summary.describe() for summary in summaries)
+
+def open_page(handle: Optional[PageHandle]):
+    """Show the page `handle` points at and fetch the following page ahead of time.
+
+    Session state only ever holds the handle and two pages of listings, however
+    many properties match.
+    """
+    from app.utils.property_filters import fetch_page
+
+    if handle is None or handle.total == 0:
+        st.session_state.property_page = handle
+        st.session_state.page_properties = []
+        st.session_state.lookahead_page = None
+        return
+
+    lookahead = st.session_state.get("lookahead_page")
+    if lookahead is not None and lookahead[0] == handle:
+        properties = lookahead[1]
+    else:
+        properties = list(fetch_page(handle))
+
+    st.session_state.property_page = handle
+    st.session_state.page_properties = properties
+    st.session_state.lookahead_page = (
+        (handle.next(), list(fetch_page(handle.next()))) if handle.has_next else None
+    )
+
+def is_current_search(handle: Optional[PageHandle]) -> bool:
+    """Check whether `handle` was searched with the current preferences"""
+    from app.utils.property_filters import build_query
+
+    if handle is None:
+        return False
+    return handle.fingerprint == query_fingerprint(build_query(**get_preference_filters()))
+
+def get_matching_properties() -> PageHandle:
+    """Search with the current preferences and show the first page of the best matches"""
+    from app.utils.property_filters import search_properties
     
-    if properties:
-        st.session_state.current_properties = properties
-    return properties
+    handle = search_properties(previous=st.session_state.get("property_page"), **get_preference_filters())
+    open_page(handle)
+    st.session_state.carousel_index = 0
+    return handle
 
 def display_matching_properties():
     """Display matching properties based on preferences"""
     from app.components.property_card import display_property_card
     
-    properties = get_matching_properties()
+    handle = st.session_state.get("property_page")
+    if handle is None or not is_current_search(handle):
+        handle = get_matching_properties()
     
-    if properties:
+    if handle.total:
         st.subheader("🏠 Matching Properties")
-        for property in properties:
+        for property in st.session_state.page_properties:
             display_property_card(property)
     else:
-        st.info("No properties match your current preferences.")
\ No newline at end of file
+        st.info("No properties match your current preferences.")
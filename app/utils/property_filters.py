@@ -1,31 +1,259 @@
-from typing import List, Optional
-from app.models.property import Property, SAMPLE_PROPERTIES
+from dataclasses import replace
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+import numpy as np
+from app.models.property import Property
+from app.inventory.provider import Inventory, inventory_provider
+from app.inventory.store import PropertyStore, PropertyResults
+from app.search.cache import SearchResult, query_cache
+from app.search.conditions import Condition, all_of, any_of, parse_condition
+from app.search.facets import FacetCounts
+from app.search.market import MarketSummary
+from app.search.pages import DEFAULT_PAGE_SIZE, PageHandle, query_fingerprint
+from app.search.planner import QueryPlanner
+from app.search.query import PropertyQuery
+from app.search.ranking import DEFAULT_TOP_K, top_k as best_rows
+
+def get_property_store() -> PropertyStore:
+    """Return the columnar store holding the property inventory"""
+    return inventory_provider.current.store
+
+def get_query_planner() -> QueryPlanner:
+    """Return the planner running searches against the property store"""
+    return inventory_provider.current.planner
+
+def _search(
+    inventory: Inventory, query: PropertyQuery, previous: Optional[PropertyQuery] = None
+) -> SearchResult:
+    """Matches of a normalized query, shared through the process-wide query cache.
+
+    When `query` only narrows `previous` and its matches are still cached, only
+    those matches are filtered again instead of searching the whole inventory.
+    """
+    def search() -> SearchResult:
+        candidates = None
+        if previous is not None and query.refines(previous):
+            earlier = query_cache.peek(inventory.version, previous)
+            if earlier is not None:
+                candidates = earlier.rows
+        planner = inventory.planner
+        rows = planner.execute(query, candidates)
+        return SearchResult(
+            inventory.store,
+            query,
+            rows,
+            planner.text_index if query.keywords else None,
+            planner.geo_index if query.near else None
+        )
+
+    return query_cache.get_or_search(inventory.version, query, search)
+
+# One value, or any of several values, e.g. location=["Kiti", "Meneou"]
+Choice = Union[str, Sequence[str], None]
+
+def _choices(value: Choice) -> List[Optional[str]]:
+    """The values of a choice, [None] when it is left out"""
+    if value is None or isinstance(value, str):
+        return [value]
+    return list(value) or [None]
+
+def build_query(
+    transaction_type: Choice = None,
+    property_type: Choice = None,
+    location: Choice = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_bedrooms: Optional[int] = None,
+    max_bedrooms: Optional[int] = None,
+    min_bathrooms: Optional[int] = None,
+    max_bathrooms: Optional[int] = None,
+    min_square_feet: Optional[float] = None,
+    max_square_feet: Optional[float] = None,
+    required_features: Optional[Iterable[str]] = None,
+    excluded_features: Optional[Iterable[str]] = None,
+    keywords: Optional[str] = None,
+    where: Union[Condition, dict, list, None] = None,
+    near: Optional[str] = None,
+    within_km: Optional[float] = None
+) -> PropertyQuery:
+    """Build the normalized search for a set of preferences.
+
+    Transaction type, property type and location take one value or a list of
+    values any of which may match. `where` is a `Condition` or its JSON form,
+    see app.search.conditions, e.g. {"not": {"location": "Larnaca"}}. `near`
+    is a place from app.search.places, such as "Larnaca Airport" or "beach".
+    """
+    conditions = [] if where is None else [parse_condition(where)]
+    fields: Dict[str, Any] = {}
+    for field, value in (
+        ("transaction_type", transaction_type), ("property_type", property_type), ("location", location)
+    ):
+        values = {choice.strip().lower() for choice in _choices(value) if choice}
+        if len(values) > 1:
+            conditions.append(any_of(field, values))
+        else:
+            fields[field] = values.pop() if values else None
+    query = PropertyQuery(
+        **fields,
+        min_price=min_price,
+        max_price=max_price,
+        min_bedrooms=min_bedrooms,
+        max_bedrooms=max_bedrooms,
+        min_bathrooms=min_bathrooms,
+        max_bathrooms=max_bathrooms,
+        min_square_feet=min_square_feet,
+        max_square_feet=max_square_feet,
+        required_features=frozenset(required_features or ()),
+        excluded_features=frozenset(excluded_features or ()),
+        where=all_of(conditions) if conditions else None,
+        near=near,
+        within_km=within_km,
+        keywords=keywords
+    )
+    return query.normalized()
 
 def filter_properties(
-    transaction_type: Optional[str] = None,
-    property_type: Optional[str] = None,
-    location: Optional[str] = None,
+    transaction_type: Choice = None,
+    property_type: Choice = None,
+    location: Choice = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    min_bedrooms: Optional[int] = None
-) -> List[Property]:
-    """Filter properties based on preferences"""
-    filtered = SAMPLE_PROPERTIES
-    
-    if transaction_type:
-        filtered = [p for p in filtered if hasattr(p, 'transaction_type') and 
-                   p.transaction_type.lower() == transaction_type.lower()]
-    
-    if property_type:
-        filtered = [p for p in filtered if hasattr(p, 'type') and
-                   p.type.lower() == property_type.lower()]
-    
-    if min_price is not None:
-        filtered = [p for p in filtered if hasattr(p, 'price') and p.price >= min_price]
-    if max_price is not None:
-        filtered = [p for p in filtered if hasattr(p, 'price') and p.price <= max_price]
-    
-    if min_bedrooms is not None:
-        filtered = [p for p in filtered if hasattr(p, 'bedrooms') and p.bedrooms >= min_bedrooms]
-    
-    return filtered
\ No newline at end of file
+    min_bedrooms: Optional[int] = None,
+    max_bedrooms: Optional[int] = None,
+    min_bathrooms: Optional[int] = None,
+    max_bathrooms: Optional[int] = None,
+    min_square_feet: Optional[float] = None,
+    max_square_feet: Optional[float] = None,
+    required_features: Optional[Iterable[str]] = None,
+    excluded_features: Optional[Iterable[str]] = None,
+    keywords: Optional[str] = None,
+    where: Union[Condition, dict, list, None] = None,
+    near: Optional[str] = None,
+    within_km: Optional[float] = None,
+    top_k: Optional[int] = None
+) -> Sequence[Property]:
+    """Filter properties based on preferences, e.g. required_features=["pool", "parking"]
+
+    `keywords` is free text such as "quiet beachfront villa"; listings mentioning
+    any of its words match. Several locations, types or transactions can be
+    given as lists, and `where` combines them freely, see `build_query`. With
+    `near` and `within_km`, only listings that close to the place match, and
+    closer ones rank higher. Matches come back in inventory order, or with `top_k`
+    as the best `top_k` matches ranked by how well they fit the preferences.
+    """
+    query = build_query(
+        transaction_type, property_type, location, min_price, max_price,
+        min_bedrooms, max_bedrooms, min_bathrooms, max_bathrooms, min_square_feet, max_square_feet,
+        required_features, excluded_features, keywords, where, near, within_km
+    )
+    # Take the inventory once so a concurrent reload can't mix two versions
+    inventory = inventory_provider.current
+    result = _search(inventory, query)
+    if top_k is None:
+        return PropertyResults(inventory.store, result.rows)
+    return PropertyResults(inventory.store, result.ranked(top_k), total=len(result.rows))
+
+def search_properties(
+    page_size: int = DEFAULT_PAGE_SIZE, previous: Optional[PageHandle] = None, **preferences
+) -> PageHandle:
+    """Start a paged search, takes the same preferences as `filter_properties`.
+
+    `previous` is the session's last search; when the new preferences only
+    tighten it, just its matches are filtered again.
+    """
+    query = build_query(**preferences)
+    inventory = inventory_provider.current
+    previous_query = None
+    if previous is not None and previous.inventory_version == inventory.version:
+        previous_query = previous.query
+    return PageHandle(
+        query=query,
+        fingerprint=query_fingerprint(query),
+        inventory_version=inventory.version,
+        total=len(_search(inventory, query, previous_query).rows),
+        page_size=page_size
+    )
+
+def fetch_page(handle: PageHandle) -> PropertyResults:
+    """Return the ranked listings on the page `handle` points at.
+
+    Only the listings up to the end of the page are ranked, the rest of the
+    matches are never sorted. Repeated fetches are served from the query cache.
+    """
+    inventory = inventory_provider.current
+    result = _search(inventory, handle.query)
+    ranked = result.ranked(handle.cursor + handle.page_size)
+    return PropertyResults(inventory.store, ranked[handle.cursor:], total=len(result.rows))
+
+def facet_counts(**preferences) -> FacetCounts:
+    """Return how many listings matching `preferences` fall in each location, type, price bucket and so on.
+
+    Takes the same preferences as `filter_properties`. The counts are kept with
+    the cached matches, so asking again for the same preferences is free.
+    """
+    inventory = inventory_provider.current
+    return _search(inventory, build_query(**preferences)).facets(inventory.facet_index)
+
+def market_summaries(
+    location: Choice = None,
+    property_type: Choice = None,
+    transaction_type: Choice = None
+) -> List[MarketSummary]:
+    """Return price and bedroom statistics of every location, property type and transaction type given.
+
+    Fields left out match anything, e.g. only a location gives one summary per
+    property type and transaction type there, and lists give the summaries of
+    each of their values. Statistics are precomputed per inventory, nothing is searched.
+    """
+    stats = inventory_provider.current.market_stats
+    return [
+        summary
+        for place in _choices(location)
+        for kind in _choices(property_type)
+        for transaction in _choices(transaction_type)
+        for summary in stats.summaries(place, kind, transaction)
+    ]
+
+def semantic_search(text: str, top_k: int = DEFAULT_TOP_K, **preferences) -> PropertyResults:
+    """Return the `top_k` listings closest in meaning to `text`, best first.
+
+    Takes the same preferences as `filter_properties`; when any is set only
+    the listings matching them are considered.
+    """
+    query = build_query(**preferences)
+    inventory = inventory_provider.current
+    candidates = None
+    if query != PropertyQuery():
+        candidates = _search(inventory, query).rows
+    rows, _ = inventory.semantic_index.search(text, top_k, candidates)
+    total = len(inventory.store) if candidates is None else len(candidates)
+    return PropertyResults(inventory.store, rows, total=total)
+
+def nearest_properties(near: str, top_k: int = DEFAULT_TOP_K, **preferences) -> PropertyResults:
+    """Return the `top_k` listings closest to the place `near`, closest first.
+
+    Takes the same preferences as `filter_properties`; when any is set only
+    the listings matching them are considered. Distances to each place are
+    computed once per inventory, so sorting by them is a lookup.
+    """
+    query = build_query(near=near, **preferences)
+    inventory = inventory_provider.current
+    distances = inventory.planner.geo_index.distances(near)
+    if replace(query, near=None) == PropertyQuery():
+        rows = np.arange(len(inventory.store))
+    else:
+        rows = _search(inventory, query).rows
+    # Listings without coordinates go last
+    closeness = -np.nan_to_num(distances[rows], nan=np.inf)
+    return PropertyResults(inventory.store, best_rows(rows, closeness, top_k), total=len(rows))
+
+def similar_properties(property_id: int, top_k: int = 5) -> PropertyResults:
+    """Return the `top_k` listings most like the listing with id `property_id`, most similar first.
+
+    Only listings of the same transaction type are considered, listings in the
+    same location come before comparable ones elsewhere. An unknown id has none.
+    """
+    inventory = inventory_provider.current
+    rows = inventory.similar.similar(property_id, top_k)
+    if rows is None:
+        rows = np.zeros(0, dtype=np.intp)
+    return PropertyResults(inventory.store, rows)
@@ -0,0 +1,191 @@
+"""Push parser splitting a streamed assistant reply into prose and JSON objects.
+
+The assistant answers in prose and appends its preferences as a JSON object,
+sometimes inside a ``` code fence. `ReplyParser` is fed the reply chunk by chunk
+as it streams in, and returns what each chunk completes: prose to show, and each
+JSON object as soon as its closing brace arrives, so preferences can be applied
+while the model is still talking. Its position is kept between chunks, so a
+string, escape or fence split over two chunks parses as in one piece, and every
+character is looked at once: prose is searched for the next `{`, objects for the
+next brace or quote.
+
+A `{` only opens an object when a quoted key or `}` comes next, so braces in
+prose such as "a {quiet} street" stay prose. An object that does not parse,
+never closes or grows past MAX_OBJECT_CHARS goes back to the prose. Fence lines
+are dropped from the prose.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+# Longest text read as one object before giving up on it
+MAX_OBJECT_CHARS = 64 * 1024
+
+# A whole ``` fence line, and a line start that may still become one
+_FENCE = re.compile(r"[ \t]*```[\w-]*[ \t]*\r?")
+_FENCE_START = re.compile(r"[ \t]*(?:`{1,3}[\w-]*[ \t]*\r?)?")
+# The characters that change the state of an object, outside and inside a string
+_STRUCTURE = re.compile(r'[{}"]')
+_STRING = re.compile(r'["\\]')
+
+
+@dataclass(frozen=True)
+class Prose:
+    """Conversational text, to be shown as it is"""
+
+    text: str
+
+
+@dataclass(frozen=True)
+class JsonObject:
+    """A complete JSON object in the reply and its source text"""
+
+    value: Dict[str, Any]
+    text: str
+
+
+ReplyEvent = Union[Prose, JsonObject]
+
+
+class ReplyParser:
+    """Resumable parser for one reply, see the module docstring"""
+
+    def __init__(self) -> None:
+        # Prose of the current line held back because it may be a fence, and whether the prose
+        # shown so far ends a line, only a whole line can be a fence
+        self._line = ""
+        self._line_start = True
+        # Text of the object being read, None while reading prose
+        self._object: Optional[List[str]] = None
+        self._length = 0
+        self._depth = 0
+        self._keyed = False
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[ReplyEvent]:
+        """Events completed by the next chunk of the reply"""
+        events: List[ReplyEvent] = []
+        position = 0
+        while position < len(chunk):
+            if self._object is None:
+                start = chunk.find("{", position)
+                self._prose(chunk[position:] if start < 0 else chunk[position:start], events)
+                if start < 0:
+                    break
+                if self._line:
+                    # A line going on with "{" is no fence
+                    events.append(Prose(self._line))
+                    self._line = ""
+                self._line_start = False
+                self._open()
+                position = start + 1
+            else:
+                position = self._read_object(chunk, position, events)
+        return events
+
+    def close(self) -> List[ReplyEvent]:
+        """Events left at the end of the reply: an unfinished object and a held back line become prose"""
+        events: List[ReplyEvent] = []
+        if self._object is not None:
+            self._reject(events)
+        if self._line and not _FENCE.fullmatch(self._line):
+            events.append(Prose(self._line))
+        self._line = ""
+        return events
+
+    def _prose(self, text: str, events: List[ReplyEvent]) -> None:
+        # A held back line started a line, so the text does too
+        text, self._line = self._line + text, ""
+        end = text.rfind("\n") + 1
+        complete, partial = text[:end], text[end:]
+        if "`" in complete:
+            lines = complete.split("\n")[:-1]
+            complete = "".join(
+                line + "\n"
+                for number, line in enumerate(lines)
+                if not ((number or self._line_start) and _FENCE.fullmatch(line))
+            )
+        if end:
+            self._line_start = True
+        if partial and self._line_start and _FENCE_START.fullmatch(partial):
+            self._line, partial = partial, ""
+        elif partial:
+            self._line_start = False
+        if complete or partial:
+            events.append(Prose(complete + partial))
+
+    def _open(self) -> None:
+        self._object = ["{"]
+        self._length = 1
+        self._depth = 1
+        self._keyed = self._in_string = self._escaped = False
+
+    def _reject(self, events: List[ReplyEvent]) -> None:
+        text = "".join(self._object or ())
+        self._object = None
+        self._prose(text, events)
+
+    def _read_object(self, chunk: str, position: int, events: List[ReplyEvent]) -> int:
+        """Read the object from `position`, returning where the rest of `chunk` starts"""
+        assert self._object is not None
+        start = position
+        # Read no further than the character making the object too long, wherever the chunks split
+        stop = min(len(chunk), position + MAX_OBJECT_CHARS + 1 - self._length)
+        if not self._keyed:
+            # Only a key or the end of an empty object may follow the opening brace
+            while position < stop and chunk[position].isspace():
+                position += 1
+            if position < stop and chunk[position] not in '"}':
+                self._object.append(chunk[start:position])
+                self._reject(events)
+                return position
+            self._keyed = position < stop
+        while self._keyed and position < stop:
+            if self._escaped:
+                self._escaped = False
+                position += 1
+                continue
+            match = (_STRING if self._in_string else _STRUCTURE).search(chunk, position, stop)
+            if match is None:
+                position = stop
+                break
+            character, position = match.group(), match.end()
+            if self._in_string:
+                if character == "\\":
+                    self._escaped = True
+                else:
+                    self._in_string = False
+            elif character == '"':
+                self._in_string = True
+            elif character == "{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    break
+        self._object.append(chunk[start:position])
+        self._length += position - start
+        if self._length > MAX_OBJECT_CHARS:
+            self._reject(events)
+        elif self._depth == 0:
+            self._close(events)
+        return position
+
+    def _close(self, events: List[ReplyEvent]) -> None:
+        text = "".join(self._object or ())
+        self._object = None
+        try:
+            value = json.loads(text)
+        except ValueError:
+            self._prose(text, events)
+            return
+        events.append(JsonObject(value, text))
+
+
+def parse_reply(text: str) -> List[ReplyEvent]:
+    """Every event of a complete reply"""
+    parser = ReplyParser()
+    return parser.feed(text) + parser.close()
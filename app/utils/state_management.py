@@ -23,4 +23,34 @@ def initialize_session_state():
     if "max_price" not in st.session_state:
         st.session_state.max_price = None
     if "min_bedrooms" not in st.session_state:
-        st.session_state.min_bedrooms = None
\ No newline at end of file
+        st.session_state.min_bedrooms = None
+    if "max_bedrooms" not in st.session_state:
+        st.session_state.max_bedrooms = None
+    if "min_bathrooms" not in st.session_state:
+        st.session_state.min_bathrooms = None
+    if "max_bathrooms" not in st.session_state:
+        st.session_state.max_bathrooms = None
+    if "min_square_feet" not in st.session_state:
+        st.session_state.min_square_feet = None
+    if "max_square_feet" not in st.session_state:
+        st.session_state.max_square_feet = None
+    if "required_features" not in st.session_state:
+        st.session_state.required_features = None
+    if "excluded_features" not in st.session_state:
+        st.session_state.excluded_features = None
+    if "keywords" not in st.session_state:
+        st.session_state.keywords = None
+    if "where" not in st.session_state:
+        st.session_state.where = None
+    if "near" not in st.session_state:
+        st.session_state.near = None
+    if "within_km" not in st.session_state:
+        st.session_state.within_km = None
+
+    # Initialize the paged search results, see app.utils.preferences.open_page
+    if "property_page" not in st.session_state:
+        st.session_state.property_page = None
+    if "page_properties" not in st.session_state:
+        st.session_state.page_properties = []
+    if "lookahead_page" not in st.session_state:
+        st.session_state.lookahead_page = None
@@ -28,9 +28,10 @@ target_metadata = Base.metadata
 
 # -*- Only include tables that are in the target_metadata
 # See: https://alembic.sqlalchemy.org/en/latest/autogenerate.html#omitting-table-names-from-the-autogenerate-process
+# Tables are keyed "public.<name>" in the metadata but reflected without the schema
 def include_name(name, type_, parent_names):
     if type_ == "table":
-        return name in target_metadata.tables
+        return name in {table.name for table in target_metadata.tables.values()}
     else:
         return True
 
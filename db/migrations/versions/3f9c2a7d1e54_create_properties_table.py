@@ -0,0 +1,95 @@
+"""create properties table
+
+Revision ID: 3f9c2a7d1e54
+Revises:
+Create Date: 2026-10-18 10:12:43.518207
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "3f9c2a7d1e54"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Bits used by feature_mask, see FEATURE_BITS in app.models.property
+FEATURE_COUNT = 14
+
+
+def upgrade() -> None:
+    op.create_table(
+        "properties",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("transaction_type", sa.String(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("location", sa.String(), nullable=False),
+        sa.Column("bedrooms", sa.SmallInteger(), nullable=False),
+        sa.Column("bathrooms", sa.SmallInteger(), nullable=False),
+        sa.Column("square_feet", sa.Float(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("image_url", sa.String(), nullable=False),
+        sa.Column("feature_mask", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("amenities", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        schema="public",
+    )
+    op.create_index(
+        "ix_properties_listing",
+        "properties",
+        [
+            sa.text("lower(transaction_type)"),
+            sa.text("lower(type)"),
+            sa.text("lower(location)"),
+            "price",
+            "id",
+        ],
+        unique=False,
+        schema="public",
+    )
+    op.create_index(
+        "ix_properties_location_price",
+        "properties",
+        [sa.text("lower(location)"), "price", "id"],
+        unique=False,
+        schema="public",
+    )
+    op.create_index("ix_properties_price", "properties", ["price", "id"], unique=False, schema="public")
+    op.create_index(
+        "ix_properties_buy_location",
+        "properties",
+        [sa.text("lower(location)"), "price", "id"],
+        unique=False,
+        schema="public",
+        postgresql_where=sa.text("lower(transaction_type) = 'buy'"),
+    )
+    op.create_index(
+        "ix_properties_rent_location",
+        "properties",
+        [sa.text("lower(location)"), "price", "id"],
+        unique=False,
+        schema="public",
+        postgresql_where=sa.text("lower(transaction_type) = 'rent'"),
+    )
+    # Without these, "feature_mask & bit" gets a fixed 0.5% selectivity guess and
+    # the planner sorts every candidate instead of walking a (price, id) index
+    for bit in range(FEATURE_COUNT):
+        op.execute(
+            f"CREATE STATISTICS public.properties_feature_{bit} "
+            f"ON ((feature_mask & {1 << bit})) FROM public.properties"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_properties_rent_location", table_name="properties", schema="public")
+    op.drop_index("ix_properties_buy_location", table_name="properties", schema="public")
+    op.drop_index("ix_properties_price", table_name="properties", schema="public")
+    op.drop_index("ix_properties_location_price", table_name="properties", schema="public")
+    op.drop_index("ix_properties_listing", table_name="properties", schema="public")
+    op.drop_table("properties", schema="public")
@@ -0,0 +1,46 @@
+"""create llm responses table
+
+Revision ID: 5d2e8a4c7b19
+Revises: 8c1e5b3f2a90
+Create Date: 2026-10-18 21:37:05.402861
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5d2e8a4c7b19"
+down_revision = "8c1e5b3f2a90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_responses",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("exact_key", sa.String(), nullable=False),
+        sa.Column("scope", sa.String(), nullable=True),
+        sa.Column("prompt", sa.Text(), nullable=False),
+        sa.Column("embedding", sa.LargeBinary(), nullable=True),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.Column("last_used_at", sa.Float(), nullable=False),
+        sa.Column("hits", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+        schema="public",
+    )
+    op.create_index(
+        "ix_llm_responses_scope", "llm_responses", ["scope", "last_used_at"], unique=False, schema="public"
+    )
+    op.create_index(
+        "ix_llm_responses_last_used_at", "llm_responses", ["last_used_at"], unique=False, schema="public"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_llm_responses_last_used_at", table_name="llm_responses", schema="public")
+    op.drop_index("ix_llm_responses_scope", table_name="llm_responses", schema="public")
+    op.drop_table("llm_responses", schema="public")
@@ -0,0 +1,53 @@
+"""add property coordinates
+
+Revision ID: 8c1e5b3f2a90
+Revises: 3f9c2a7d1e54
+Create Date: 2026-10-18 16:04:27.731945
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8c1e5b3f2a90"
+down_revision = "3f9c2a7d1e54"
+branch_labels = None
+depends_on = None
+
+# Location centres at the time of this migration, see LOCATION_COORDINATES in app.models.property
+LOCATION_CENTRES = {
+    "larnaca": (34.9229, 33.6233),
+    "pervolia": (34.8311, 33.5803),
+    "kiti": (34.8486, 33.5694),
+    "meneou": (34.8520, 33.6030),
+    "aradippou": (34.9528, 33.5917),
+    "livadia": (34.9510, 33.6310),
+    "dromolaxia": (34.8766, 33.5858),
+    "kornos": (34.9200, 33.3970),
+    "delikipos": (34.9140, 33.3100),
+    "alethriko": (34.8610, 33.4840),
+}
+
+
+def upgrade() -> None:
+    op.add_column("properties", sa.Column("latitude", sa.Float(), nullable=True), schema="public")
+    op.add_column("properties", sa.Column("longitude", sa.Float(), nullable=True), schema="public")
+    # Existing listings get their location's centre, as the in-memory store does
+    for location, (latitude, longitude) in LOCATION_CENTRES.items():
+        op.execute(
+            sa.text(
+                "UPDATE public.properties SET latitude = :latitude, longitude = :longitude "
+                "WHERE lower(location) = :location AND latitude IS NULL"
+            ).bindparams(latitude=latitude, longitude=longitude, location=location)
+        )
+    op.create_index(
+        "ix_properties_coordinates", "properties", ["latitude", "longitude"], unique=False, schema="public"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_properties_coordinates", table_name="properties", schema="public")
+    op.drop_column("properties", "longitude", schema="public")
+    op.drop_column("properties", "latitude", schema="public")
@@ -1 +1,3 @@
 from db.tables.base import Base
+from db.tables.properties import PropertyDB
+from db.tables.llm_responses import LlmResponseDB
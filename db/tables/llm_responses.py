@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Float, Index, Integer, LargeBinary, String, Text
+from db.tables.base import Base
+
+
+class LlmResponseDB(Base):
+    __tablename__ = "llm_responses"
+
+    # sha256 of the normalized request, see app.assistants.response_cache
+    key = Column(String, primary_key=True)
+    # sha256 of the request as sent, to tell exact hits from normalized ones
+    exact_key = Column(String, nullable=False)
+    # sha256 of the normalized request without the user's last words, for near-duplicate lookups
+    scope = Column(String)
+    prompt = Column(Text, nullable=False)
+    embedding = Column(LargeBinary)  # float32, see app.search.embeddings.HashingEmbedder
+    response = Column(Text, nullable=False)  # JSON
+    created_at = Column(Float, nullable=False)
+    last_used_at = Column(Float, nullable=False)
+    hits = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_llm_responses_scope", scope, last_used_at),
+        # Eviction removes the least recently used responses first
+        Index("ix_llm_responses_last_used_at", last_used_at),
+    )
@@ -0,0 +1,55 @@
+from sqlalchemy import BigInteger, Column, Float, Index, Integer, SmallInteger, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from db.tables.base import Base
+
+
+class PropertyDB(Base):
+    __tablename__ = "properties"
+
+    id = Column(BigInteger, primary_key=True)
+    title = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    transaction_type = Column(String, nullable=False)
+    price = Column(Float, nullable=False)
+    location = Column(String, nullable=False)
+    bedrooms = Column(SmallInteger, nullable=False)
+    bathrooms = Column(SmallInteger, nullable=False)
+    square_feet = Column(Float, nullable=False)
+    description = Column(Text, nullable=False)
+    image_url = Column(String, nullable=False)
+    feature_mask = Column(Integer, nullable=False, server_default="0")  # See FEATURE_BITS
+    amenities = Column(JSONB)
+    latitude = Column(Float)
+    longitude = Column(Float)
+
+    # Categorical filters match case-insensitively, so they are indexed on lower(...).
+    # Every index ends in (price, id): the order searches are paged in.
+    __table_args__ = (
+        Index(
+            "ix_properties_listing",
+            func.lower(transaction_type),
+            func.lower(type),
+            func.lower(location),
+            price,
+            id,
+        ),
+        Index("ix_properties_location_price", func.lower(location), price, id),
+        Index("ix_properties_price", price, id),
+        # One partial index per transaction type for "rent/buy in <location>" searches
+        Index(
+            "ix_properties_buy_location",
+            func.lower(location),
+            price,
+            id,
+            postgresql_where=text("lower(transaction_type) = 'buy'"),
+        ),
+        Index(
+            "ix_properties_rent_location",
+            func.lower(location),
+            price,
+            id,
+            postgresql_where=text("lower(transaction_type) = 'rent'"),
+        ),
+        # Radius searches filter on a bounding box first, see app.search.places
+        Index("ix_properties_coordinates", latitude, longitude),
+    )
@@ -0,0 +1,77 @@
+"""Facet counts in one pass against one search per facet value.
+
+For a few searches over a generated inventory, times `FacetIndex.count` over
+the matches and the same counts obtained the way the UI would without it:
+one search per location, property type, transaction type, bedroom count and
+price bucket, the way `filter_properties` would be called for each value.
+
+Usage: python -m tests.benchmarks.facets [--count 1000000] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import time
+from dataclasses import replace
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+from app.inventory.generator import generate_inventory
+from app.search.facets import PRICE_BUCKETS, FacetIndex
+from app.search.planner import QueryPlanner
+from app.search.query import PropertyQuery
+
+QUERIES: List[Tuple[str, PropertyQuery]] = [
+    ("everything", PropertyQuery()),
+    ("rent", PropertyQuery("rent")),
+    ("buy, 3+ bedrooms", PropertyQuery("buy", min_bedrooms=3)),
+    ("rent apartment in Larnaca", PropertyQuery("rent", "apartment", "Larnaca")),
+]
+
+
+def timed(run: Callable[[], object], repeat: int) -> float:
+    """Median wall time of `run` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    store = generate_inventory(args.count, seed=args.seed)
+    planner = QueryPlanner(store)
+    start = time.perf_counter()
+    index = FacetIndex(store)
+    print(f"{args.count:,} listings: facet index built in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    bedrooms = sorted(index.count().bedrooms)
+    bounds = [0.0] + [float(bound) for bound in PRICE_BUCKETS] + [float("inf")]
+
+    def per_value(query: PropertyQuery) -> None:
+        # What the same counts take without the index: one search per facet value
+        variants = [replace(query, transaction_type=value) for value in store.transaction_type.categories]
+        variants += [replace(query, property_type=value) for value in store.type.categories]
+        variants += [replace(query, location=value) for value in store.location.categories]
+        # Exact bedroom counts are the differences between consecutive minimums
+        variants += [replace(query, min_bedrooms=value) for value in bedrooms]
+        variants += [replace(query, min_price=low, max_price=high) for low, high in zip(bounds, bounds[1:])]
+        for variant in variants:
+            planner.execute(variant.normalized())
+
+    print(f"{'search':<28} {'matches':>10} {'one pass ms':>12} {'per value ms':>13}")
+    for name, query in QUERIES:
+        rows = planner.execute(query.normalized())
+        one_pass = timed(partial(index.count, rows), args.repeat)
+        searches = timed(partial(per_value, query), max(1, args.repeat // 2))
+        print(f"{name:<28} {len(rows):>10,} {one_pass:>12.2f} {searches:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
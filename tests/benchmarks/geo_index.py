@@ -0,0 +1,96 @@
+"""Distance searches: grid index against a haversine over every listing.
+
+Times radius searches around points of interest for growing radii with the
+grid index, a plain haversine scan of every row, the store's bounding-box
+prefiltered scan and the planner. Then times finding the listings nearest a
+place, from the distances cached on the index against computing them per search.
+
+Usage: python -m tests.benchmarks.geo_index [--count 1000000]
+"""
+
+import argparse
+import statistics
+import time
+from functools import partial
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.search.geo import GeoIndex
+from app.search.places import distance_km, haversine_km, place_points
+from app.search.planner import QueryPlanner
+from app.search.query import PropertyQuery
+from app.search.ranking import top_k
+
+PLACES = ["Larnaca Airport", "Finikoudes Beach", "beach", "Kornos"]
+
+
+def timed(run: Callable[[], object], repeat: int = 5) -> float:
+    """Median wall time of `run` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    store = generate_inventory(args.count, seed=args.seed)
+    start = time.perf_counter()
+    geo = GeoIndex(store.latitude, store.longitude)
+    build_ms = (time.perf_counter() - start) * 1000
+    planner = QueryPlanner(store)
+    planner.geo_index = geo
+    print(
+        f"{args.count:,} listings: grid of {geo.rows} x {geo.columns} cells built in {build_ms:.0f} ms, "
+        f"{geo.nbytes / 1e6:.1f} MB\n"
+    )
+
+    header = ["place", "km", "matches", "index ms", "haversine ms", "boxed ms", "planner ms"]
+    print(f"{header[0]:>18} " + " ".join(f"{name:>12}" for name in header[1:]))
+    for place in PLACES:
+        for radius in [0.5, 1, 2, 5, 10]:
+            query = PropertyQuery(near=place, within_km=radius).normalized()
+            expected = store.filter(query)
+            if not np.array_equal(geo.near(place, radius), expected):
+                raise AssertionError(f"grid index disagrees with the scan for {radius} km of {place}")
+
+            def haversine(place: str = place, radius: float = radius) -> np.ndarray:
+                near = np.zeros(len(store), dtype=bool)
+                for latitude, longitude in place_points(place):
+                    near |= haversine_km(store.latitude, store.longitude, latitude, longitude) <= radius
+                return np.flatnonzero(near)
+
+            timings = [
+                timed(partial(geo.near, place, radius)),
+                timed(haversine),
+                timed(partial(store.filter, query)),
+                timed(partial(planner.execute, query)),
+            ]
+            cells = f"{place:>18} {radius:>12g} {len(expected):>12,} "
+            print(cells + " ".join(f"{ms:>12.2f}" for ms in timings))
+
+    print(f"\n{'nearest 10 to':>18} {'cached ms':>12} {'computed ms':>12} {'first ms':>12}")
+    rows = np.arange(len(store))
+    for place in PLACES:
+        start = time.perf_counter()
+        geo.distances(place)
+        first_ms = (time.perf_counter() - start) * 1000
+        cached = timed(partial(lambda place: top_k(rows, -geo.distances(place), 10), place))
+        computed = timed(
+            partial(
+                lambda place: top_k(rows, -distance_km(store.latitude, store.longitude, place), 10), place
+            )
+        )
+        print(f"{place:>18} {cached:>12.2f} {computed:>12.2f} {first_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
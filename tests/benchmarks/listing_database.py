@@ -0,0 +1,103 @@
+"""In-memory search versus SQL pushdown on the Postgres `properties` table.
+
+Loads a generated inventory into the table (skipped when it already holds the
+same number of listings), then times the first page of each query both ways,
+and a deep page with a keyset cursor versus OFFSET.
+
+Needs a running Postgres with the migrations applied:
+
+    alembic -c db/alembic.ini upgrade head
+    python -m tests.benchmarks.listing_database --count 1000000 [--url postgresql+psycopg://...]
+"""
+
+import argparse
+import statistics
+import time
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Select, create_engine
+
+from app.inventory.database import ListingCursor, PropertyRepository
+from app.inventory.generator import generate_inventory
+from app.inventory.store import PropertyStore
+from app.search.planner import QueryPlanner
+from app.search.query import PropertyQuery
+
+PAGE_SIZE = 20
+
+QUERIES: List[Tuple[str, PropertyQuery]] = [
+    ("rent studio in Kiti <= 800", PropertyQuery("rent", "studio", "Kiti", max_price=800)),
+    ("buy in Larnaca, 3+ bedrooms", PropertyQuery("buy", location="Larnaca", min_bedrooms=3)),
+    ("rent <= 600", PropertyQuery("rent", max_price=600)),
+    ("buy >= 300k with pool", PropertyQuery("buy", min_price=300_000, required_features=frozenset({"pool"}))),
+    ("everything", PropertyQuery()),
+]
+
+
+def timed(run: Callable[[], object], repeat: int) -> float:
+    """Median wall time of `run` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def memory_order(store: PropertyStore, planner: QueryPlanner, query: PropertyQuery) -> np.ndarray:
+    """Matching rows in (price, id) order, the order SQL pages in"""
+    rows = planner.execute(query)
+    return rows[np.lexsort((store.ids[rows], store.price[rows]))]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="Database URL, defaults to the one in db.session")
+    parser.add_argument("--depth", type=int, default=10_000, help="Row offset of the deep page")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    repository = PropertyRepository(create_engine(args.url) if args.url else None)
+    store = generate_inventory(args.count, seed=args.seed)
+    if repository.count(PropertyQuery()) != args.count:
+        start = time.perf_counter()
+        repository.replace(store)
+        print(f"Loaded {args.count:,} listings in {time.perf_counter() - start:.1f}s")
+    planner = QueryPlanner(store)
+    planner.execute(PropertyQuery())  # Build the indexes outside of the timings
+
+    print(f"{'query':<32} {'matches':>9} {'memory ms':>10} {'sql ms':>8}")
+    for name, query in QUERIES:
+        matches = len(planner.execute(query))
+        memory = timed(
+            partial(lambda query: store.materialize(memory_order(store, planner, query)[:PAGE_SIZE]), query),
+            args.repeat,
+        )
+        sql = timed(partial(repository.search, query, limit=PAGE_SIZE), args.repeat)
+        print(f"{name:<32} {matches:>9,} {memory:>10.2f} {sql:>8.2f}")
+
+    print(f"\nPage at row {args.depth:,}")
+    print(f"{'query':<32} {'keyset ms':>10} {'offset ms':>10}")
+    for name, query in QUERIES:
+        order = memory_order(store, planner, query)
+        if len(order) <= args.depth:
+            continue
+        last = int(order[args.depth - 1])
+        cursor = ListingCursor(price=float(store.price[last]), id=int(store.ids[last]))
+        offset_statement = repository.select(query).offset(args.depth).limit(PAGE_SIZE)
+
+        def offset_page(offset_statement: Select = offset_statement) -> None:
+            with repository.engine.connect() as connection:
+                connection.execute(offset_statement).all()
+
+        keyset = timed(partial(repository.search, query, limit=PAGE_SIZE, after=cursor), args.repeat)
+        offset = timed(offset_page, args.repeat)
+        print(f"{name:<32} {keyset:>10.2f} {offset:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Build, lookup and refresh cost of the market statistics.
+
+Builds `MarketStats` over a generated inventory, times summary lookups, then
+changes a share of the listings (removed, repriced, added) and compares
+refreshing the statistics from the previous ones with building them again.
+Also reports how far the percentiles are from exact ones.
+
+Usage: python -m tests.benchmarks.market_stats [--count 1000000] [--changed 0.01]
+"""
+
+import argparse
+import time
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from app.inventory.generator import DescriptionColumn, generate_inventory
+from app.inventory.store import CategoricalColumn, PropertyStore
+from app.search.market import MarketStats
+
+T = TypeVar("T")
+
+
+def timed(run: Callable[[], T]) -> Tuple[T, float]:
+    """Result of `run` and its wall time in milliseconds"""
+    start = time.perf_counter()
+    result = run()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def changed(store: PropertyStore, share: float, seed: int) -> PropertyStore:
+    """`store` with `share` of its listings removed, as many repriced and as many new ones"""
+    rng = np.random.default_rng(seed)
+    count = int(len(store) * share)
+    kept = np.sort(rng.choice(len(store), len(store) - count, replace=False))
+    # Generated stores share their categories, so codes can be concatenated as they are
+    added = generate_inventory(count, seed=seed + 1, start_id=int(store.ids.max()) + 1)
+    price = store.price[kept]
+    price[rng.choice(len(kept), count, replace=False)] *= 1.1
+
+    def categorical(name: str) -> CategoricalColumn:
+        column = getattr(store, name)
+        codes = np.concatenate((column.codes[kept], getattr(added, name).codes))
+        return CategoricalColumn(codes, column.categories)
+
+    def numeric(name: str, values: Optional[np.ndarray] = None) -> np.ndarray:
+        kept_values = getattr(store, name)[kept] if values is None else values
+        return np.concatenate((kept_values, getattr(added, name)))
+
+    type, location, features = categorical("type"), categorical("location"), numeric("features")
+    templates = np.concatenate(
+        (store.description.templates[kept], added.description.templates)  # type: ignore[attr-defined]
+    )
+    return PropertyStore(
+        ids=numeric("ids"),
+        type=type,
+        transaction_type=categorical("transaction_type"),
+        location=location,
+        price=numeric("price", price),
+        bedrooms=numeric("bedrooms"),
+        bathrooms=numeric("bathrooms"),
+        square_feet=numeric("square_feet"),
+        title=categorical("title"),
+        image_url=categorical("image_url"),
+        description=DescriptionColumn(type, location, features, templates),
+        features=features,
+        latitude=numeric("latitude"),
+        longitude=numeric("longitude"),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--changed", type=float, default=0.01)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    store = generate_inventory(args.count, seed=args.seed)
+    stats, build_ms = timed(lambda: MarketStats.from_store(store))
+    summaries = stats.summaries()
+    print(f"{args.count:,} listings, {len(summaries)} groups: built in {build_ms:.0f} ms")
+
+    keys = [(s.location, s.property_type, s.transaction_type) for s in summaries]
+    _, lookup_ms = timed(lambda: [stats.summary(*keys[i % len(keys)]) for i in range(args.lookups)])
+    print(f"lookup: {lookup_ms * 1000 / args.lookups:.2f} µs")
+
+    errors = []
+    for summary in summaries:
+        members = (
+            store.location.mask(summary.location)
+            & store.type.mask(summary.property_type)
+            & store.transaction_type.mask(summary.transaction_type)
+        )
+        prices = np.sort(store.price[members])
+        for percentile, value in summary.price.items():
+            exact = prices[int(np.ceil(percentile / 100 * len(prices))) - 1]
+            errors.append(abs(value / exact - 1))
+    print(f"price percentiles off by {np.mean(errors):.3%} on average, {np.max(errors):.3%} at most\n")
+
+    new = changed(store, args.changed, args.seed)
+    _, unchanged_ms = timed(lambda: stats.refreshed(store, store))
+    refreshed, refresh_ms = timed(lambda: stats.refreshed(store, new))
+    rebuilt, rebuild_ms = timed(lambda: MarketStats.from_store(new))
+    assert refreshed.summaries() == rebuilt.summaries()
+    print(f"reload with no change: refresh {unchanged_ms:.0f} ms")
+    print(f"reload with {args.changed:.0%} changed: refresh {refresh_ms:.0f} ms, rebuild {rebuild_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Local preference extraction: time per message and turns answered without the assistant.
+
+Runs the rule-based extractor over a set of typical messages, from pure slot
+filling ("rent", "max 1200") to requests only the assistant can handle, and
+reports how long each takes, what it found and whether the turn is answered
+locally. Then times the search the found preferences start, which is all a
+locally answered turn waits for, on a generated inventory.
+
+Usage: python -m tests.benchmarks.preference_extractor [--count 1000000]
+"""
+
+import argparse
+import statistics
+import time
+from functools import partial
+from typing import Callable, List, Optional
+
+from app.inventory.generator import generate_inventory
+from app.search.planner import QueryPlanner
+from app.utils.preference_extractor import describe_preferences, extract_preferences
+from app.utils.property_filters import build_query
+
+MESSAGES = [
+    "rent",
+    "buy",
+    "apartment in Larnaca",
+    "max 1200",
+    "a house in Kiti or Meneou",
+    "I want to rent a 2 bedroom flat in Larnca, budget €1,200 a month",
+    "between 200k and 300k",
+    "at least 3 bedrooms and 2+ bathrooms",
+    "studio, Aradipou, 500€",
+    "apartment with a pool",
+    "something quiet near the beach",
+    "not in Kiti, anywhere else is fine",
+    "what's the difference between Kiti and Pervolia?",
+    "I'd like to book a viewing on Friday",
+]
+
+
+def timed(run: Callable[[], object], repeat: int = 5) -> float:
+    """Median wall time of `run` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    planner = QueryPlanner(generate_inventory(args.count, seed=args.seed))
+    print(f"{'message':>66} {'us':>8} {'local':>6} {'search ms':>10}  found")
+    local = 0
+    for message in MESSAGES:
+        extraction = extract_preferences(message)
+        micros = timed(partial(extract_preferences, message), repeat=200) * 1000
+        search = "-"
+        if extraction.preferences:
+            query = build_query(**extraction.preferences)
+            search = f"{timed(partial(planner.execute, query)):.2f}"
+        local += extraction.complete
+        flag = "yes" if extraction.complete else "no"
+        found = describe_preferences(extraction.preferences)
+        print(f"{message:>66} {micros:>8.0f} {flag:>6} {search:>10}  {found}")
+    print(f"\n{local} of {len(MESSAGES)} turns answered without the assistant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Bytes per listing of the in-memory property representation.
+
+Compares the current `Property` (slotted, interned strings, feature bitmask,
+shared descriptions) with the previous layout (plain dataclass, per-listing
+strings and a per-listing features dict).
+
+Usage: python -m tests.benchmarks.property_memory [count ...]
+"""
+
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.models.property import Property, generate_sample_properties, render_description
+
+DEFAULT_COUNTS = [10_000, 100_000, 1_000_000]
+
+
+@dataclass
+class LegacyProperty:
+    """Property as it was stored before slots, interning and feature bitmasks"""
+
+    id: int
+    title: str
+    type: str
+    transaction_type: str
+    price: float
+    location: str
+    bedrooms: int
+    bathrooms: int
+    square_feet: float
+    description: str
+    image_url: str
+    features: Dict[str, bool]
+    amenities: Optional[List[str]] = None
+
+
+def _own_copy(value: str) -> str:
+    """A new string object equal to `value`, as the old generator built one per listing"""
+    return value.encode().decode()
+
+
+def to_legacy(property: Property) -> LegacyProperty:
+    return LegacyProperty(
+        id=property.id,
+        title=_own_copy(property.title),
+        type=property.type,
+        transaction_type=property.transaction_type,
+        price=property.price,
+        location=property.location,
+        bedrooms=property.bedrooms,
+        bathrooms=property.bathrooms,
+        square_feet=property.square_feet,
+        description=_own_copy(property.description),
+        image_url=_own_copy(property.image_url),
+        features=property.features,
+    )
+
+
+def measure(count: int) -> Dict[str, float]:
+    """Return the traced bytes per listing for both layouts"""
+    render_description.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    properties = generate_sample_properties(count)
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0] - baseline
+
+    # Legacy objects share the numbers of the current ones, so they stay alive and counted
+    legacy = [to_legacy(p) for p in properties]
+    del properties
+    render_description.cache_clear()
+    gc.collect()
+    previous = tracemalloc.get_traced_memory()[0] - baseline
+
+    tracemalloc.stop()
+    del legacy
+    gc.collect()
+    return {"before": previous / count, "after": current / count}
+
+
+def main(counts: List[int]) -> None:
+    print(f"{'listings':>10} {'before B/listing':>17} {'after B/listing':>16} {'saved':>7}")
+    for count in counts:
+        result = measure(count)
+        saved = 1 - result["after"] / result["before"]
+        print(f"{count:>10,} {result['before']:>17,.0f} {result['after']:>16,.0f} {saved:>7.0%}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_COUNTS)
@@ -0,0 +1,100 @@
+"""Box queries on price, size, bedrooms and bathrooms: k-d range index against a column scan.
+
+Draws random boxes over the numeric columns of a generated inventory, from a
+few listings wide to a large share of it, and times the range index and a
+vectorized scan of the same columns. Results are grouped by how many listings
+match, which is what the index's cost follows; the scan always reads every row.
+
+Usage: python -m tests.benchmarks.range_index [--count 1000000] [--queries 300]
+"""
+
+import argparse
+import statistics
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.inventory.store import PropertyStore
+from app.search.indexes import RANGE_COLUMNS, RangeIndex
+from app.search.planner import QueryPlanner
+from app.search.query import PropertyQuery
+
+# Upper ends of the match count buckets results are grouped in
+BUCKETS = [100, 1_000, 10_000, 100_000, 1_000_000_000]
+
+
+def timed(run: Callable[[], object], repeat: int = 3) -> float:
+    """Median wall time of `run` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def random_query(store: PropertyStore, rng: np.random.Generator) -> PropertyQuery:
+    """A box around a random listing, each side open or closed at random"""
+    row = int(rng.integers(len(store)))
+    price, square_feet = float(store.price[row]), float(store.square_feet[row])
+    bedrooms, bathrooms = int(store.bedrooms[row]), int(store.bathrooms[row])
+    width = rng.uniform(0.02, 1.0)
+    return PropertyQuery(
+        min_price=round(price * (1 - width), 2),
+        max_price=round(price * (1 + width), 2) if rng.random() < 0.7 else None,
+        min_square_feet=square_feet * (1 - width) if rng.random() < 0.8 else None,
+        max_square_feet=square_feet * (1 + width),
+        min_bedrooms=max(1, bedrooms - int(rng.integers(2))),
+        max_bedrooms=bedrooms + int(rng.integers(2)) if rng.random() < 0.5 else None,
+        min_bathrooms=bathrooms if rng.random() < 0.3 else None,
+    ).normalized()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    store = generate_inventory(args.count, seed=args.seed)
+    start = time.perf_counter()
+    index = RangeIndex.build([getattr(store, name) for name in RANGE_COLUMNS])
+    build_s = time.perf_counter() - start
+    print(f"{args.count:,} listings: range index built in {build_s:.2f}s, depth {index.depth}\n")
+    planner = QueryPlanner(store)
+
+    rng = np.random.default_rng(args.seed)
+    timings: Dict[int, List[Tuple[float, float, float]]] = {bucket: [] for bucket in BUCKETS}
+    for _ in range(args.queries):
+        query = random_query(store, rng)
+        low = [query.min_price, query.min_square_feet, query.min_bedrooms, query.min_bathrooms]
+        high = [query.max_price, query.max_square_feet, query.max_bedrooms, query.max_bathrooms]
+        expected = store.filter(query)
+        if not np.array_equal(np.sort(index.range(low, high)), expected):
+            raise AssertionError(f"range index disagrees with the scan for {query}")
+        bucket = next(bucket for bucket in BUCKETS if len(expected) <= bucket)
+        timings[bucket].append(
+            (
+                timed(partial(index.range, low, high)),
+                timed(partial(store.filter, query)),
+                timed(partial(planner.execute, query)),
+            )
+        )
+
+    print(f"{'matches':>16} {'queries':>8} {'index ms':>9} {'scan ms':>8} {'planner ms':>11}")
+    lower = 0
+    for bucket in BUCKETS:
+        if timings[bucket]:
+            index_ms, scan_ms, planner_ms = (statistics.median(column) for column in zip(*timings[bucket]))
+            label = f"{lower:,}-{min(bucket, args.count):,}"
+            queries = len(timings[bucket])
+            print(f"{label:>16} {queries:>8} {index_ms:>9.2f} {scan_ms:>8.2f} {planner_ms:>11.2f}")
+        lower = bucket + 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Streamed replies: the incremental parser against parsing the text so far.
+
+Builds a reply of `--words` words of prose followed by the preferences JSON,
+splits it into chunks of a few characters as a model streams them, and times
+parsing it chunk by chunk with `ReplyParser` against rescanning the whole text
+received so far at every chunk, the way the reply used to be split. Also
+reports how far into the reply each one has the preferences, the old way only
+having them once the stream has ended. With `--braces` the prose mentions a
+"{quiet}" street, which the rescan takes for the start of the JSON and so never
+finds the preferences.
+
+Usage: python -m tests.benchmarks.reply_parser [--words 300] [--chunk 4] [--braces]
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, List, Optional
+
+from app.utils.reply_parser import JsonObject, ReplyParser
+
+PREFERENCES = {
+    "property_preferences": {
+        "transaction_type": "rent",
+        "property_type": "apartment",
+        "location": "Larnaca",
+        "max_price": 1200,
+        "required_features": ["pool", "parking"],
+        "where": {"any": [{"location": "Kiti"}, {"not": {"property_type": "studio"}}]},
+    }
+}
+
+
+def timed(run: Callable[[], object], repeat: int = 5) -> float:
+    """Median wall time of `run` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def rescan(text: str) -> Optional[dict]:
+    """The first JSON object of `text` found by counting braces from its first `{`"""
+    start = text.find("{")
+    if start == -1:
+        return None
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == "{":
+            depth += 1
+        elif text[i] == "}":
+            depth -= 1
+            if depth == 0:
+                try:
+                    return json.loads(text[start : i + 1])
+                except ValueError:
+                    return None
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--chunk", type=int, default=4)
+    parser.add_argument("--braces", action="store_true")
+    args = parser.parse_args(argv)
+
+    prose = " ".join(["Larnaca has lovely flats near the beach"] * (args.words // 7 + 1))
+    if args.braces:
+        prose = "Kiti has a {quiet} street or two. " + prose
+    reply = f"{prose}.\n\n```json\n{json.dumps(PREFERENCES, indent=2)}\n```\nAnything else?"
+    chunks = [reply[i : i + args.chunk] for i in range(0, len(reply), args.chunk)]
+
+    def incremental() -> Optional[int]:
+        found = None
+        reply_parser = ReplyParser()
+        for number, chunk in enumerate(chunks):
+            for event in reply_parser.feed(chunk):
+                if found is None and isinstance(event, JsonObject):
+                    found = number
+        reply_parser.close()
+        return found
+
+    def rescanned() -> Optional[int]:
+        found = None
+        text = ""
+        for number, chunk in enumerate(chunks):
+            text += chunk
+            if found is None and rescan(text) is not None:
+                found = number
+        return found
+
+    print(f"{len(reply):,} characters in {len(chunks):,} chunks\n")
+    print(f"{'parser':>12} {'total ms':>12} {'us / chunk':>12} {'json at':>12}")
+    for name, run in [("incremental", incremental), ("rescan", rescanned)]:
+        found = run()
+        total = timed(run)
+        at = f"{(found + 1) / len(chunks):.0%}" if found is not None else "-"
+        print(f"{name:>12} {total:>12.2f} {total * 1000 / len(chunks):>12.2f} {at:>12}")
+    print(f"{'end of reply':>12} {'':>12} {'':>12} {'100%':>12}")
+
+
+if __name__ == "__main__":
+    main()
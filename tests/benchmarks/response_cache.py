@@ -0,0 +1,110 @@
+"""Response cache: time to find a stored response, by tier, against its size.
+
+Fills a `ResponseCache` with `--entries` responses to opening requests shaped
+like the assistant's (system prompt, tools, a short history and the user's
+words), then times keying a request and looking it up when it was stored as
+sent (exact), differently cased and spaced (normalized), reworded (similar,
+with the near-duplicate tier on) and never stored (miss). A hit replaces a
+model call of a few seconds. The cache is a SQLite file in a temporary
+directory, or the Postgres `llm_responses` table with `--database`, whose
+rows are deleted first.
+
+Usage: python -m tests.benchmarks.response_cache [--entries 10000] [--similarity 0.8] [--database]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from app.assistants.response_cache import ResponseCache, disk_engine, llm_responses_table, request_key
+from app.assistants.tools import PREFERENCE_TOOLS
+from app.models.property import CYPRUS_LOCATIONS, PROPERTY_TYPES
+
+SYSTEM_PROMPT = "You are a helpful real estate assistant. " * 60
+GREETING = "Hi! I'm here to help you find your perfect property. What kind of property are you looking for?"
+
+
+def timed(run: Callable[[], object], repeat: int = 5) -> float:
+    """Median wall time of `run` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def make_request(words: str) -> Dict[str, Any]:
+    """A request as the assistant sends it, ending with `words`"""
+    return {
+        "model": "gpt-4",
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "assistant", "content": GREETING},
+            {"role": "user", "content": words},
+        ],
+        "max_tokens": 500,
+        "temperature": 0.7,
+        "tools": [{"type": "function", "function": function.to_dict()} for function in PREFERENCE_TOOLS],
+        "tool_choice": "auto",
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--similarity", type=float, default=0.8)
+    parser.add_argument("--database", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.database:
+        from db.session import db_engine
+
+        engine = db_engine
+        with engine.begin() as connection:
+            connection.execute(llm_responses_table.delete())
+    else:
+        engine = disk_engine(os.path.join(tempfile.mkdtemp(), "llm_responses.sqlite"))
+    cache = ResponseCache(engine, max_entries=args.entries, similarity=args.similarity)
+
+    rng = random.Random(args.seed)
+    response = {
+        "content": "Lovely! Which area would you like to live in? " * 5,
+        "tool_calls": [],
+        "finish_reason": "stop",
+    }
+    start = time.perf_counter()
+    for number in range(args.entries):
+        words = (
+            f"I want to {rng.choice(['rent', 'buy'])} a {rng.choice(sorted(PROPERTY_TYPES))} "
+            f"in {rng.choice(sorted(CYPRUS_LOCATIONS))} for {number}"
+        )
+        cache.put(request_key(make_request(words)), response)
+    print(f"{args.entries:,} responses stored in {time.perf_counter() - start:.1f}s\n")
+
+    stored = "I want to rent an apartment in Larnaca"
+    cache.put(request_key(make_request(stored)), response)
+    lookups = [
+        ("exact", stored),
+        ("normalized", "  i want to RENT an apartment in larnaca!"),
+        ("similar", "I want to rent an apartment in Larnaca please"),
+        ("miss", "Do you have anything with a sea view?"),
+    ]
+    print(f"{'lookup':>12} {'key ms':>8} {'get ms':>8}  found")
+    for name, words in lookups:
+        request = make_request(words)
+        key = request_key(request)
+        found = cache.get(key)
+        key_ms = timed(partial(request_key, request), repeat=50)
+        get_ms = timed(partial(cache.get, key), repeat=50)
+        print(f"{name:>12} {key_ms:>8.2f} {get_ms:>8.2f}  {found[0] if found else '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Latency of "more like this" on the per-location KD-trees against a brute-force scan.
+
+Builds `SimilarListings` over a generated inventory, then asks for the
+neighbours of random listings and checks they match a scan over every listing
+of the same transaction type with the location penalty applied.
+
+Usage: python -m tests.benchmarks.similar_listings [--count 100000] [--queries 200] [--k 5]
+"""
+
+import argparse
+import statistics
+import time
+from functools import partial
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.search.similar import LOCATION_PENALTY, SimilarListings
+
+T = TypeVar("T")
+
+
+def timed(run: Callable[[], T]) -> Tuple[T, float]:
+    """Result of `run` and its wall time in milliseconds"""
+    start = time.perf_counter()
+    result = run()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def brute_force(similar: SimilarListings, row: int, k: int) -> np.ndarray:
+    """Rows of the `k` listings most like `row` by scoring every listing"""
+    store = similar.store
+    distances = ((similar.vectors - similar.vectors[row]) ** 2).sum(axis=1, dtype=np.float64)
+    distances += LOCATION_PENALTY * (store.location.codes != store.location.codes[row])
+    distances[store.transaction_type.codes != store.transaction_type.codes[row]] = np.inf
+    distances[row] = np.inf
+    candidates = np.flatnonzero(np.isfinite(distances))
+    return candidates[np.lexsort((candidates, distances[candidates]))[:k]]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    store = generate_inventory(args.count, seed=args.seed)
+    similar, build_ms = timed(lambda: SimilarListings(store))
+    print(f"{args.count:,} listings: build {build_ms / 1000:.2f}s\n")
+
+    rows = np.random.default_rng(args.seed).choice(len(store), args.queries)
+    tree_ms, brute_ms, matches = [], [], 0
+    for row in rows:
+        (found, _), elapsed = timed(partial(similar.similar_rows, int(row), args.k))
+        expected, brute_elapsed = timed(partial(brute_force, similar, int(row), args.k))
+        tree_ms.append(elapsed)
+        brute_ms.append(brute_elapsed)
+        # Distances are float32, exact ties may come out in another order
+        matches += int(set(found.tolist()) == set(expected.tolist()))
+
+    print(f"{'':<12} {'median ms':>10} {'p95 ms':>8}")
+    for name, timings in (("kd-tree", tree_ms), ("brute force", brute_ms)):
+        print(f"{name:<12} {statistics.median(timings):>10.2f} {np.percentile(timings, 95):>8.2f}")
+    print(f"\nsame neighbours as brute force: {matches}/{len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
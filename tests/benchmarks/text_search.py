@@ -0,0 +1,75 @@
+"""Keyword search latency over a generated inventory.
+
+Times building the BM25 index, then for each query the rows matching any of
+its words, their BM25 scores, and a full ranked search (match, score and the
+top 10 by preference fit and relevance), with and without structured filters.
+
+Usage: python -m tests.benchmarks.text_search [--count 1000000] [--repeat 7]
+"""
+
+import argparse
+import statistics
+import time
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+from app.inventory.generator import generate_inventory
+from app.search.planner import QueryPlanner
+from app.search.query import PropertyQuery
+from app.search.ranking import rank
+
+QUERIES: List[Tuple[str, PropertyQuery]] = [
+    ("pool", PropertyQuery(keywords="pool")),
+    ("beachfront", PropertyQuery(keywords="beachfront")),
+    ("quiet beachfront villa with a garden", PropertyQuery(keywords="quiet beachfront villa with a garden")),
+    ("rent, 'pool gym'", PropertyQuery("rent", keywords="pool gym")),
+    (
+        "buy house in Kiti, 'garden fireplace'",
+        PropertyQuery("buy", "house", "Kiti", keywords="garden fireplace"),
+    ),
+    ("rent in Larnaca, 'modern flat'", PropertyQuery("rent", location="Larnaca", keywords="modern flat")),
+]
+
+
+def timed(run: Callable[[], object], repeat: int) -> float:
+    """Median wall time of `run` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    store = generate_inventory(args.count, seed=args.seed)
+    planner = QueryPlanner(store)
+    planner.execute(PropertyQuery())  # Build the structured indexes outside of the timings
+    start = time.perf_counter()
+    text = planner.text_index
+    print(f"Indexed {args.count:,} listings in {(time.perf_counter() - start) * 1000:.0f}ms\n")
+
+    print(f"{'query':<40} {'matches':>9} {'match ms':>9} {'score ms':>9} {'top 10 ms':>10}")
+    for name, query in QUERIES:
+        query = query.normalized()
+        keywords = query.keywords or ""
+        rows = planner.execute(query)
+        text.score_rows(keywords, rows)  # Count document frequencies outside of the timings
+
+        def search(query: PropertyQuery = query, keywords: str = keywords) -> None:
+            matches = planner.execute(query)
+            rank(store, matches, query, relevance=text.score_rows(keywords, matches))
+
+        match = timed(partial(text.matching, keywords), args.repeat)
+        score = timed(partial(text.score_rows, keywords, rows), args.repeat)
+        print(f"{name:<40} {len(rows):>9,} {match:>9.2f} {score:>9.2f} {timed(search, args.repeat):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Recall and latency of the IVF listing index against brute force.
+
+Embeds a generated inventory with the hashing embedder, then runs short
+queries made of words from random listings. Recall@k is the share of the
+returned listings that are among the true k nearest (ties with the k-th
+count), measured per nprobe, and for searches restricted to the listings
+matching structured filters.
+
+Usage: python -m tests.benchmarks.vector_search [--count 100000] [--queries 100] [--k 10]
+"""
+
+import argparse
+import statistics
+import time
+from functools import partial
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.search.embeddings import HashingEmbedder, listing_text
+from app.search.planner import QueryPlanner
+from app.search.query import PropertyQuery
+from app.search.text import tokenize
+from app.search.vectors import IVFIndex, list_count
+
+FILTERS: List[Tuple[str, PropertyQuery]] = [
+    ("rent studio in Kiti", PropertyQuery("rent", "studio", "Kiti")),
+    ("buy with pool", PropertyQuery("buy", required_features=frozenset({"pool"}))),
+    ("rent", PropertyQuery("rent")),
+]
+
+T = TypeVar("T")
+
+
+def timed(run: Callable[[], T]) -> Tuple[T, float]:
+    """Result of `run` and its wall time in milliseconds"""
+    start = time.perf_counter()
+    result = run()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def recall(found: np.ndarray, exact_scores: np.ndarray, k: int) -> float:
+    """Share of `found` scoring at least the k-th best exact score"""
+    if len(found) == 0:
+        return 1.0
+    kth = np.sort(exact_scores)[-min(k, len(exact_scores))]
+    return float(np.mean(exact_scores[found] >= kth - 1e-3)) * min(len(found), k) / min(k, len(exact_scores))
+
+
+def brute_search(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """Rows of the `k` best scoring vectors, unordered, by scoring all of them"""
+    return np.argpartition(-(vectors @ query), k)[:k]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dimensions", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    store = generate_inventory(args.count, seed=args.seed)
+    embedder = HashingEmbedder(args.dimensions)
+    vectors, embed_ms = timed(lambda: embedder.embed([listing_text(store, row) for row in range(len(store))]))
+    index = IVFIndex(args.dimensions, lists=list_count(len(store)))
+    rng = np.random.default_rng(args.seed)
+    sample = vectors[np.sort(rng.choice(len(vectors), min(len(vectors), 64 * index.lists), replace=False))]
+    _, train_ms = timed(lambda: index.train(sample))
+    _, add_ms = timed(lambda: index.add(vectors))
+    print(
+        f"{args.count:,} listings, {index.lists} lists: embed {embed_ms / 1000:.1f}s, "
+        f"train {train_ms / 1000:.1f}s, add {add_ms / 1000:.1f}s\n"
+    )
+
+    texts = []
+    for row in rng.choice(len(store), args.queries):
+        words = tokenize(listing_text(store, int(row)))
+        texts.append(" ".join(rng.choice(words, min(3, len(words)), replace=False)))
+    queries = embedder.embed(texts)
+    exact = [vectors @ query for query in queries]
+    brute_ms = statistics.median(timed(partial(brute_search, vectors, query, args.k))[1] for query in queries)
+
+    print(f"{'nprobe':>7} {'recall@' + str(args.k):>10} {'ann ms':>8} {'brute ms':>9}")
+    for nprobe in sorted({1, 4, 16, 32, 64, 128, index.nprobe}):
+        if nprobe > index.lists:
+            break
+        recalls, timings = [], []
+        for query, scores in zip(queries, exact):
+            (ids, _), elapsed = timed(partial(index.search, query, args.k, nprobe=nprobe))
+            recalls.append(recall(ids, scores, args.k))
+            timings.append(elapsed)
+        marker = " (default)" if nprobe == index.nprobe else ""
+        print(
+            f"{nprobe:>7} {statistics.mean(recalls):>10.3f} {statistics.median(timings):>8.2f} "
+            f"{brute_ms:>9.2f}{marker}"
+        )
+
+    planner = QueryPlanner(store)
+    print(
+        f"\n{'filtered search':<24} {'candidates':>10} {'recall@' + str(args.k):>10} "
+        f"{'ann ms':>8} {'brute ms':>9}"
+    )
+    for name, query in FILTERS:
+        candidates = planner.execute(query.normalized())
+        recalls, timings, brute = [], [], []
+        for vector, scores in zip(queries, exact):
+            (ids, _), elapsed = timed(partial(index.search, vector, args.k, candidates))
+            restricted = np.full(len(scores), -np.inf, dtype=np.float32)
+            restricted[candidates] = scores[candidates]
+            recalls.append(recall(ids, restricted, args.k))
+            timings.append(elapsed)
+            # The gather of the candidates' vectors is part of the brute force search
+            brute.append(
+                timed(
+                    partial(
+                        lambda rows, vector: brute_search(vectors[rows], vector, args.k), candidates, vector
+                    )
+                )[1]
+            )
+        print(
+            f"{name:<24} {len(candidates):>10,} {statistics.mean(recalls):>10.3f} "
+            f"{statistics.median(timings):>8.2f} {statistics.median(brute):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
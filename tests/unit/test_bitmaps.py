@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from app.inventory.generator import generate_inventory
+from app.search.bitmaps import ARRAY_LIMIT, CHUNK_SIZE, Bitmap, BitmapIndex, query_condition
+from app.search.conditions import parse_condition
+from app.search.indexes import PropertyIndexes
+from app.utils.property_filters import build_query
+
+STORE = generate_inventory(3000, seed=19)
+INDEX = BitmapIndex(STORE, PropertyIndexes(STORE))
+
+
+def random_rows(rng, density):
+    """Ascending distinct rows over three chunks, the middle one dense or sparse"""
+    size = 3 * CHUNK_SIZE
+    rows = np.flatnonzero(rng.random(size) < density)
+    middle = np.arange(CHUNK_SIZE, 2 * CHUNK_SIZE)
+    dense = rng.random(2) < 0.5
+    if dense[0]:
+        rows = np.union1d(rows, middle[rng.random(CHUNK_SIZE) < 0.5])
+    if dense[1]:
+        rows = rows[(rows < CHUNK_SIZE) | (rows >= 2 * CHUNK_SIZE)]
+    return rows
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_set_operations_match_numpy(seed):
+    rng = np.random.default_rng(seed)
+    a, b, c = (random_rows(rng, density) for density in (0.01, 0.2, 0.001))
+    bitmaps = [Bitmap.from_rows(rows) for rows in (a, b, c)]
+    for bitmap, rows in zip(bitmaps, (a, b, c), strict=True):
+        assert np.array_equal(bitmap.rows(), rows)
+        assert len(bitmap) == len(rows)
+        assert all(
+            len(container) <= ARRAY_LIMIT or container.dtype == np.uint64
+            for container in bitmap.chunks.values()
+        )
+    first, second, third = bitmaps
+    assert np.array_equal((first & second).rows(), np.intersect1d(a, b))
+    assert np.array_equal((second & first).rows(), np.intersect1d(a, b))
+    assert np.array_equal((first | second).rows(), np.union1d(a, b))
+    assert np.array_equal((first - second).rows(), np.setdiff1d(a, b))
+    assert np.array_equal((second - third).rows(), np.setdiff1d(b, c))
+    assert np.array_equal(Bitmap.union(bitmaps).rows(), np.union1d(np.union1d(a, b), c))
+    assert np.array_equal(Bitmap.full(CHUNK_SIZE + 3).rows(), np.arange(CHUNK_SIZE + 3))
+    assert len(Bitmap({}).rows()) == 0
+
+
+@pytest.mark.parametrize(
+    "where",
+    [
+        {"location": ["Kiti", "meneou", "Nowhere"]},
+        {"location": "Kiti", "features": ["pool", "parking"]},
+        {"any": [{"property_type": "Apartment"}, {"feature": "garden"}]},
+        {"transaction_type": "rent", "not": {"location": ["Kiti", "Larnaca"]}},
+        {"not": {"any": [{"feature": "gym"}, {"feature": "elevator"}]}},
+        {"location": "Nowhere"},
+    ],
+)
+def test_lookup_matches_the_store(where):
+    condition = parse_condition(where)
+    rows = INDEX.lookup(condition)
+    assert np.array_equal(rows, np.flatnonzero(STORE.condition_mask(condition)))
+    assert INDEX.estimate(condition) >= len(rows)
+
+
+def test_matching_a_query():
+    query = build_query(transaction_type="rent", location="Kiti")
+    condition = query_condition(query)
+    assert condition is not None
+    assert np.array_equal(INDEX.matching(query).rows(), STORE.filter(query))
+    assert query_condition(build_query()) is None
+    assert len(INDEX.matching(build_query())) == len(STORE)
+
+
+def test_unknown_feature_raises():
+    with pytest.raises(ValueError):
+        INDEX.lookup(parse_condition({"feature": "moat"}))
@@ -0,0 +1,64 @@
+from typing import Iterator, List
+
+from phi.llm.base import LLM
+from phi.llm.message import Message
+from streamlit.testing.v1 import AppTest
+
+# Messages of every request the model got
+SENT: List[List[Message]] = []
+
+
+class RecordingLLM(LLM):
+    """Answers every request the same, keeping the messages it was sent"""
+
+    model: str = "recording"
+
+    def response_stream(self, messages: List[Message]) -> Iterator[str]:
+        SENT.append(list(messages))
+        yield "Lovely, let me look."
+
+
+def chat_app():
+    import streamlit as st
+    from phi.assistant import Assistant
+
+    from app.components.chat_interface import display_chat_interface, initialize_chat
+    from app.utils.state_management import initialize_session_state
+    from tests.unit.test_chat_context import RecordingLLM
+
+    initialize_session_state()
+    st.session_state.lead_data = {"name": "tester"}
+    if "assistant" not in st.session_state:
+        st.session_state.assistant = Assistant(llm=RecordingLLM())
+    initialize_chat("tester")
+    display_chat_interface()
+
+
+def sent_for(text: str) -> str:
+    """The last user message the model got after `text` was typed into the chat"""
+    SENT.clear()
+    app = AppTest.from_function(chat_app, default_timeout=30).run()
+    app.chat_input[0].set_value(text).run()
+    assert not app.exception, app.exception
+    assert len(SENT) == 1
+    user_messages = [message for message in SENT[0] if message.role == "user"]
+    content = user_messages[-1].content
+    assert isinstance(content, str)
+    return content
+
+
+def test_facet_counts_reach_the_model():
+    content = sent_for("I want to rent an apartment in Larnaca on a quiet street")
+    assert content.startswith("I want to rent an apartment in Larnaca on a quiet street")
+    assert "Listings matching the current preferences:\n" in content
+    assert "Location: Larnaca" in content
+
+
+def test_market_context_reaches_the_model():
+    content = sent_for("I want to rent an apartment in Larnaca on a quiet street")
+    assert "Typical listings in the preferred location:\nLarnaca, apartment to rent:" in content
+
+
+def test_recorded_preferences_reach_the_model():
+    content = sent_for("I want to rent an apartment in Larnaca on a quiet street")
+    assert "Already recorded from this message: rent, apartment, Larnaca" in content
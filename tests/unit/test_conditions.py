@@ -0,0 +1,58 @@
+import pytest
+from pydantic import ValidationError
+
+from app.assistants.tools import PropertyPreferences
+from app.search.conditions import AnyOf, Not, Term, describe, parse_condition
+from app.utils.preferences import describe_condition
+
+BAD_CONDITIONS = [
+    {},
+    [],
+    "Kiti",
+    {"location": 1},
+    {"location": [1]},
+    {"location": ["Kiti", None]},
+    {"location": {"any": ["Kiti"]}},
+    {"location": []},
+    {"district": "Kiti"},
+    {"any": {"location": "Kiti"}},
+    {"any": ["Kiti"]},
+    {"not": 3},
+]
+
+
+def test_parse_condition():
+    condition = parse_condition(
+        {"any": [{"location": ["Kiti", "MENEOU"]}, {"not": {"feature": "Air Conditioning"}}]}
+    )
+    assert condition == AnyOf(
+        frozenset(
+            {
+                Term("location", "kiti"),
+                Term("location", "meneou"),
+                Not(Term("feature", "air_conditioning")),
+            }
+        )
+    )
+    assert describe(condition) == "location = kiti or location = meneou or not feature = air_conditioning"
+    assert parse_condition({"location": "Kiti", "features": ["pool"]}) == parse_condition(
+        [{"feature": "pool"}, {"location": " kiti "}]
+    )
+
+
+@pytest.mark.parametrize("where", BAD_CONDITIONS)
+def test_bad_conditions_raise_value_error(where):
+    with pytest.raises(ValueError):
+        parse_condition(where)
+    assert describe_condition(where) is None
+
+
+@pytest.mark.parametrize("where", [where for where in BAD_CONDITIONS if isinstance(where, dict)])
+def test_bad_conditions_fail_validation(where):
+    with pytest.raises(ValidationError):
+        PropertyPreferences.model_validate({"where": where})
+
+
+def test_unknown_features_are_not_described():
+    assert describe_condition({"feature": "moat"}) is None
+    assert describe_condition({"feature": "pool"}) == "feature = pool"
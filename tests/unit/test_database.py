@@ -0,0 +1,67 @@
+"""Runs against the Postgres database at TEST_DATABASE_URL, whose `properties` table it replaces"""
+
+import os
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+
+from app.inventory.database import PropertyRepository
+from app.inventory.generator import generate_inventory
+from app.search.text import TextIndex
+from app.utils.property_filters import build_query
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+STORE = generate_inventory(3000, seed=9)
+QUERIES = [
+    build_query(),
+    build_query(transaction_type="rent", location="Kiti"),
+    build_query(location=["Larnaca", "Meneou"], min_bedrooms=2, max_price=350_000),
+    build_query(where={"any": [{"feature": "pool"}, {"not": {"property_type": "studio"}}]}),
+    build_query(required_features=["garden"], excluded_features=["elevator"], min_square_feet=150),
+    build_query(near="Larnaca Airport", within_km=5),
+]
+
+
+@pytest.fixture(scope="module")
+def repository():
+    repository = PropertyRepository(create_engine(TEST_DATABASE_URL))
+    repository.replace(STORE)
+    return repository
+
+
+def in_price_order(rows):
+    """Ids of the store rows in (price, id) order"""
+    return list(STORE.ids[rows][np.lexsort((STORE.ids[rows], STORE.price[rows]))])
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_pushed_down_search_matches_the_store(repository, query):
+    expected = in_price_order(STORE.filter(query))
+    assert repository.count(query) == len(expected)
+    ids, after = [], None
+    while True:
+        page = repository.search(query, limit=250, after=after)
+        ids += [listing.id for listing in page.properties]
+        if page.next_cursor is None:
+            break
+        after = page.next_cursor
+    assert ids == expected
+
+
+def test_load_store(repository):
+    store = repository.load_store(batch_size=1000)
+    assert store.materialize(range(len(store))) == STORE.materialize(range(len(STORE)))
+    assert repository.get(int(STORE.ids[5])) == STORE.get(5)
+
+
+@pytest.mark.parametrize(
+    "keywords", ["villas", "Pool", "air conditioning", "apart", "glass", "the stunning garden", "kiti beach"]
+)
+def test_keywords_match_the_text_index(repository, keywords):
+    expected = in_price_order(TextIndex(STORE).matching(keywords))
+    assert repository.count(build_query(keywords=keywords)) == len(expected)
+    page = repository.search(build_query(keywords=keywords), limit=len(STORE))
+    assert [listing.id for listing in page.properties] == expected
@@ -0,0 +1,58 @@
+from bisect import bisect_left
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.inventory.generator import generate_inventory
+from app.search import facets
+from app.search.facets import PRICE_BUCKETS, FacetIndex, price_bucket_labels
+from app.utils.property_filters import build_query
+
+STORE = generate_inventory(3000, seed=13)
+
+
+def counted(rows):
+    """Facet counts of `rows` tallied listing by listing"""
+    listings = STORE.materialize(rows)
+    labels = price_bucket_labels()
+    return {
+        "total": len(listings),
+        "transaction_type": Counter(listing.transaction_type for listing in listings),
+        "property_type": Counter(listing.type for listing in listings),
+        "location": Counter(listing.location for listing in listings),
+        "bedrooms": Counter(listing.bedrooms for listing in listings),
+        "price": Counter(labels[bisect_left(PRICE_BUCKETS, listing.price)] for listing in listings),
+    }
+
+
+@pytest.mark.parametrize("one_pass", [True, False], ids=["cube", "per facet"])
+def test_counts_match_a_tally(monkeypatch, one_pass):
+    if not one_pass:
+        monkeypatch.setattr(facets, "_MAX_CELLS", 0)
+    index = FacetIndex(STORE)
+    assert (index._cells is not None) == one_pass
+    for query in [
+        build_query(),
+        build_query(transaction_type="rent"),
+        build_query(location=["Kiti", "Meneou"], min_bedrooms=2),
+        build_query(location="Nowhere"),
+    ]:
+        rows = STORE.filter(query)
+        counts = index.count(rows)
+        expected = counted(rows)
+        assert counts.total == expected["total"]
+        for name in ("transaction_type", "property_type", "location", "bedrooms", "price"):
+            assert getattr(counts, name) == dict(expected[name]), (query, name)
+        values = list(counts.location.values())
+        assert values == sorted(values, reverse=True)
+
+
+def test_summary():
+    index = FacetIndex(STORE)
+    assert index.count(np.zeros(0, dtype=np.intp)).summary() == "No matching listings."
+    summary = index.count(STORE.filter(build_query(transaction_type="rent", location="Kiti"))).summary()
+    lines = summary.splitlines()
+    assert lines[0].endswith("matching listings.")
+    assert lines[1].startswith("Transaction: rent ")
+    assert lines[3].startswith("Location: Kiti ")
@@ -0,0 +1,26 @@
+import numpy as np
+
+from app.inventory.generator import generate_inventory, iter_inventory_chunks
+from app.search.query import PropertyQuery
+
+
+def test_same_seed_same_inventory():
+    first, second = generate_inventory(500, seed=3), generate_inventory(500, seed=3)
+    assert np.array_equal(first.ids, second.ids)
+    assert np.array_equal(first.price, second.price)
+    assert first.get(42) == second.get(42)
+
+
+def test_chunks_join_into_one_store():
+    store = generate_inventory(250, seed=1, chunk_size=100)
+    chunks = list(iter_inventory_chunks(250, seed=1, chunk_size=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert np.array_equal(store.ids, np.arange(1, 251))
+    assert np.array_equal(store.price, np.concatenate([chunk.price for chunk in chunks]))
+    assert store.get(150) == chunks[1].get(50)
+
+
+def test_empty_inventory():
+    store = generate_inventory(0)
+    assert len(store) == 0
+    assert len(store.filter(PropertyQuery())) == 0
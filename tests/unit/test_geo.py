@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.models.property import EARTH_RADIUS_KM, POINTS_OF_INTEREST
+from app.search import geo
+from app.search.geo import GeoIndex
+
+rng = np.random.default_rng(20)
+LATITUDE = rng.uniform(34.6, 35.2, 5000)
+LONGITUDE = rng.uniform(32.9, 34.0, 5000)
+LATITUDE[::97] = np.nan
+
+
+def haversine(latitude, longitude, point_latitude, point_longitude):
+    """Great-circle distance in km, one pair of points at a time"""
+    lat, point_lat = math.radians(latitude), math.radians(point_latitude)
+    a = (
+        math.sin((point_lat - lat) / 2) ** 2
+        + math.cos(lat) * math.cos(point_lat) * math.sin(math.radians(point_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def nearest(points):
+    """Distance from every listing to the nearest of `points`, nan without coordinates"""
+    return np.array(
+        [
+            min(haversine(lat, lon, *point) for point in points) if not math.isnan(lat) else math.nan
+            for lat, lon in zip(LATITUDE, LONGITUDE, strict=True)
+        ]
+    )
+
+
+@pytest.mark.parametrize("max_cells", [geo.MAX_CELLS, 50])
+def test_within_and_in_box_match_brute_force(monkeypatch, max_cells):
+    monkeypatch.setattr(geo, "MAX_CELLS", max_cells)
+    index = GeoIndex(LATITUDE, LONGITUDE)
+    assert (index.cell_degrees > geo.DEFAULT_CELL_DEGREES) == (max_cells == 50)
+    for latitude, longitude, radius in [(34.9, 33.6, 5.0), (35.0, 33.0, 0.3), (34.7, 33.9, 40.0)]:
+        distance = nearest([(latitude, longitude)])
+        expected = np.flatnonzero(distance <= radius)
+        assert np.array_equal(np.sort(index.within(latitude, longitude, radius)), expected)
+    for south, west, north, east in [(34.8, 33.2, 34.9, 33.4), (35.1, 33.95, 36.0, 35.0)]:
+        inside = (LATITUDE >= south) & (LATITUDE <= north) & (LONGITUDE >= west) & (LONGITUDE <= east)
+        assert np.array_equal(np.sort(index.in_box(south, west, north, east)), np.flatnonzero(inside))
+
+
+def test_near_and_distances_use_the_nearest_point():
+    index = GeoIndex(LATITUDE, LONGITUDE)
+    beaches = [(poi.latitude, poi.longitude) for poi in POINTS_OF_INTEREST if poi.kind == "beach"]
+    distance = nearest(beaches)
+    rows = index.near("the Beach", 2.0)
+    assert np.array_equal(rows, np.flatnonzero(distance <= 2.0))
+    assert index.estimate("beach", 2.0) >= len(rows)
+    assert np.allclose(index.distances("Beach"), distance, atol=1e-3, equal_nan=True)
+    assert index.distances("beach") is index.distances("The beach")
+    with pytest.raises(ValueError):
+        index.distances("Atlantis")
@@ -0,0 +1,67 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pytest
+
+from app.inventory.generator import generate_inventory
+from app.search.indexes import RANGE_COLUMNS, PropertyIndexes, RangeIndex, slice_positions
+
+STORE = generate_inventory(3000, seed=18)
+COLUMNS = [getattr(STORE, name) for name in RANGE_COLUMNS]
+
+
+def in_box(columns, low, high):
+    """Rows within the box, testing every row"""
+    mask = np.ones(len(columns[0]), dtype=bool)
+    for column, lower, upper in zip(columns, low, high, strict=True):
+        if lower is not None:
+            mask &= column >= lower
+        if upper is not None:
+            mask &= column <= upper
+    return np.flatnonzero(mask)
+
+
+Box = Tuple[List[Optional[float]], List[Optional[float]]]
+
+BOXES: List[Box] = [
+    ([None] * 4, [None] * 4),
+    ([1000, None, 2, None], [3000, None, 3, None]),
+    ([None, 800, None, 2], [500_000, 1500, None, 2]),
+    ([10**9, None, None, None], [None] * 4),
+    ([2000, 1000, 3, 1], [2000, 1000, 3, 1]),
+]
+
+
+@pytest.mark.parametrize("leaf_size", [1, 16, 64, 10_000])
+def test_range_matches_a_scan(leaf_size):
+    index = RangeIndex.build(COLUMNS, leaf_size=leaf_size)
+    assert np.array_equal(np.sort(index.order), np.arange(len(STORE)))
+    for low, high in BOXES:
+        rows = index.range(low, high)
+        expected = in_box(COLUMNS, low, high)
+        assert np.array_equal(np.sort(rows), expected), (low, high)
+        assert index.estimate(low, high) >= len(expected)
+
+
+def test_range_on_repeated_values():
+    rng = np.random.default_rng(3)
+    columns = [rng.integers(0, 3, 1000), np.full(1000, 7.0), rng.integers(0, 2, 1000)]
+    index = RangeIndex.build(columns, leaf_size=8)
+    boxes: List[Box] = [([1, 7, 1], [1, 7, 1]), ([None, 8, None], [None] * 3), ([0, None, 0], [2, 7, 0])]
+    for low, high in boxes:
+        assert np.array_equal(np.sort(index.range(low, high)), in_box(columns, low, high))
+
+
+def test_rebuilt_from_arrays_answers_the_same():
+    indexes = PropertyIndexes(STORE)
+    loaded = PropertyIndexes(STORE, indexes.arrays())
+    for low, high in BOXES:
+        assert np.array_equal(loaded.range.range(low, high), indexes.range.range(low, high))
+    key = ["rent", "Apartment", "Kiti"]
+    assert np.array_equal(loaded.listing.lookup(key, 500, 2000), indexes.listing.lookup(key, 500, 2000))
+
+
+def test_slice_positions():
+    starts, stops = np.array([0, 5, 9, 9]), np.array([2, 8, 9, 10])
+    assert slice_positions(starts, stops).tolist() == [0, 1, 5, 6, 7, 9]
+    assert len(slice_positions(starts[:0], stops[:0])) == 0
@@ -0,0 +1,76 @@
+import dataclasses
+import math
+from collections import Counter, defaultdict
+
+from app.inventory.generator import generate_inventory
+from app.inventory.store import PropertyStore
+from app.search.market import PERCENTILES, MarketStats
+
+STORE = generate_inventory(3000, seed=17)
+
+
+def exact(store: PropertyStore):
+    """Count, sorted prices, prices per square foot and bedrooms of every group, listing by listing"""
+    groups = defaultdict(list)
+    for listing in store.materialize(range(len(store))):
+        groups[(listing.location, listing.type, listing.transaction_type)].append(listing)
+    return {
+        key: (
+            len(listings),
+            sorted(listing.price for listing in listings),
+            sorted(listing.price / listing.square_feet for listing in listings),
+            Counter(listing.bedrooms for listing in listings),
+        )
+        for key, listings in groups.items()
+    }
+
+
+def assert_matches(stats: MarketStats, store: PropertyStore):
+    expected = exact(store)
+    assert sum(summary.count for summary in stats.summaries()) == len(store)
+    for (location, property_type, transaction_type), (count, prices, per_sqft, bedrooms) in expected.items():
+        summary = stats.summary(location.upper(), property_type, transaction_type)
+        assert summary is not None and summary.count == count
+        assert summary.bedrooms == dict(sorted(bedrooms.items()))
+        for percentile in PERCENTILES:
+            rank = max(math.ceil(percentile / 100 * count), 1) - 1
+            assert math.isclose(summary.price[percentile], prices[rank], rel_tol=0.006)
+            assert math.isclose(summary.price_per_sqft[percentile], per_sqft[rank], rel_tol=0.006)
+
+
+def test_summaries_match_exact_statistics():
+    stats = MarketStats.from_store(STORE)
+    assert_matches(stats, STORE)
+    assert stats.summary("Nowhere", "Apartment", "rent") is None
+    counts = [summary.count for summary in stats.summaries(transaction_type="RENT")]
+    assert counts == sorted(counts, reverse=True)
+    rentals = stats.summaries(transaction_type="rent")
+    assert rentals and all(summary.transaction_type.lower() == "rent" for summary in rentals)
+
+
+def test_refreshed_matches_a_rebuild():
+    listings = STORE.materialize(range(len(STORE)))
+    changed = [
+        dataclasses.replace(listing, price=listing.price * 1.5) if number % 7 == 0 else listing
+        for number, listing in enumerate(listings)
+        if number % 11
+    ]
+    changed.append(dataclasses.replace(listings[0], id=10**9, location="Kiti", bedrooms=3))
+    new = PropertyStore.from_properties(changed[::-1])
+    stats = MarketStats.from_store(STORE)
+    refreshed = stats.refreshed(STORE, new)
+    assert_matches(refreshed, new)
+    assert_matches(stats, STORE)
+    rebuilt = MarketStats.from_store(new)
+    assert {(s.location, s.property_type, s.transaction_type): s for s in refreshed.summaries()} == {
+        (s.location, s.property_type, s.transaction_type): s for s in rebuilt.summaries()
+    }
+
+
+def test_describe():
+    summary = MarketStats.from_store(STORE).summaries(transaction_type="rent")[0]
+    line = summary.describe()
+    assert line.startswith(f"{summary.location}, {summary.property_type} to rent: {summary.count:,} listings")
+    assert f"median €{summary.price[50]:,.0f}" in line
+    empty = dataclasses.replace(summary, count=0, price={}, price_per_sqft={}, bedrooms={})
+    assert empty.describe().endswith("no listings")
@@ -0,0 +1,25 @@
+from app.utils.property_filters import build_query, fetch_page, get_property_store, search_properties
+
+
+def test_pages_cover_every_match_once():
+    handle = search_properties(page_size=7, transaction_type="rent")
+    expected = set(int(row) for row in get_property_store().filter(build_query(transaction_type="rent")))
+    assert handle.total == len(expected)
+
+    seen: list[int] = []
+    while True:
+        seen.extend(listing.id for listing in fetch_page(handle))
+        if not handle.has_next:
+            break
+        handle = handle.next()
+    store = get_property_store()
+    assert len(seen) == len(set(seen)) == handle.total
+    assert set(seen) == {int(store.ids[row]) for row in expected}
+
+
+def test_handle_moves_between_pages():
+    handle = search_properties(page_size=5)
+    last = handle.last()
+    assert last.page == handle.pages - 1 and not last.has_next
+    assert last.previous().page == handle.pages - 2
+    assert last.first() == handle
@@ -0,0 +1,51 @@
+import random
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.search.planner import QueryPlanner
+from app.utils.property_filters import build_query
+from tests.unit.test_refine import STORE, random_preferences
+
+
+def test_planned_search_matches_a_full_filter():
+    planner = QueryPlanner(STORE)
+    rng = random.Random(2)
+    paths = set()
+    for _ in range(400):
+        preferences = random_preferences(rng)
+        if rng.random() < 0.2:
+            preferences["keywords"] = rng.choice(["sea view", "quiet garden", "modern villa"])
+        query = build_query(**preferences)
+        paths.add(planner.plan(query).access_path)
+        expected = STORE.filter(query)
+        if query.keywords:
+            expected = planner.text_index.matching(query.keywords, expected)
+        assert np.array_equal(planner.execute(query), expected), preferences
+    assert paths >= {"scan", "listing", "location", "price", "bitmap", "geo"}, paths
+
+
+def test_every_access_path():
+    planner = QueryPlanner(STORE)
+    cases: List[Tuple[str, Dict[str, Any]]] = [
+        ("keywords", {"keywords": "beachfront"}),
+        ("keywords", {"keywords": "detached", "transaction_type": "rent"}),
+        ("location", {"location": "Kiti", "required_features": ["pool"]}),
+        ("price", {"min_price": 5_000, "max_price": 5_100, "min_bedrooms": 2}),
+        ("range", {"min_bedrooms": 4, "min_square_feet": 2_000}),
+    ]
+    for path, preferences in cases:
+        query = build_query(**preferences)
+        assert planner.plan(query).access_path == path
+        expected = STORE.filter(query)
+        if query.keywords:
+            expected = planner.text_index.matching(query.keywords, expected)
+        assert np.array_equal(planner.execute(query), expected), preferences
+
+
+def test_candidates_narrow_the_search():
+    planner = QueryPlanner(STORE)
+    wide = build_query(transaction_type="rent")
+    narrow = build_query(transaction_type="rent", location="Kiti", min_bedrooms=2)
+    assert narrow.refines(wide)
+    assert np.array_equal(planner.execute(narrow, planner.execute(wide)), STORE.filter(narrow))
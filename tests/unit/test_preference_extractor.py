@@ -0,0 +1,42 @@
+import pytest
+
+from app.utils.preference_extractor import Extraction, describe_preferences, extract_preferences
+
+
+@pytest.mark.parametrize(
+    "text, preferences, complete",
+    [
+        ("rent", {"transaction_type": "rent"}, True),
+        ("apartment in Larnca", {"property_type": "apartment", "location": "Larnaca"}, True),
+        ("a house in Kiti or Meneou", {"property_type": "house", "location": ["Kiti", "Meneou"]}, True),
+        ("2 bedroom", {"min_bedrooms": 2}, True),
+        ("two bedroom flat", {"min_bedrooms": 2, "property_type": "apartment"}, True),
+        ("2-3 bedrooms", {"min_bedrooms": 2, "max_bedrooms": 3}, True),
+        ("max 2 bedrooms, 1+ bath", {"max_bedrooms": 2, "min_bathrooms": 1}, True),
+        ("between 200k and 300k", {"min_price": 200_000, "max_price": 300_000}, True),
+        ("budget 1200", {"max_price": 1200}, True),
+        ("I'm moving from Kiti to Larnaca", {"location": "Larnaca"}, False),
+        ("leaving Limassol", {}, False),
+        ("apartment with a pool", {"property_type": "apartment"}, False),
+    ],
+)
+def test_extract_preferences(text, preferences, complete):
+    assert extract_preferences(text) == Extraction(preferences, complete=complete)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "not in Kiti, anywhere else is fine",
+        "what's the difference between Kiti and Pervolia?",
+        "rent or buy in Kiti",
+        "at least 3",
+    ],
+)
+def test_left_to_the_assistant(text):
+    assert not extract_preferences(text).preferences
+
+
+def test_describe_preferences():
+    preferences = extract_preferences("rent a 2 bedroom flat in Larnaca, budget €1,200 a month").preferences
+    assert describe_preferences(preferences) == "rent, apartment, Larnaca, up to €1,200, at least 2 bedrooms"
@@ -0,0 +1,45 @@
+from dataclasses import asdict
+
+import pytest
+
+from app.models.property import (
+    FEATURE_BITS,
+    FEATURES,
+    Property,
+    decode_features,
+    encode_features,
+    feature_key,
+    feature_names,
+    features_mask,
+    generate_sample_properties,
+)
+
+
+def test_feature_masks_round_trip():
+    for mask in range(1 << len(FEATURES)):
+        features = decode_features(mask)
+        assert list(features) == list(FEATURES)
+        assert encode_features(features) == mask
+        assert feature_names(mask) == tuple(name for name, present in features.items() if present)
+
+
+def test_features_mask():
+    assert features_mask([]) == 0
+    assert features_mask(["pool", "Air conditioning", "beach-access"]) == (
+        FEATURE_BITS["pool"] | FEATURE_BITS["air_conditioning"] | FEATURE_BITS["beach_access"]
+    )
+    assert feature_key(" Beach Access ") == "beach_access"
+    assert feature_key("moat") is None
+    with pytest.raises(ValueError):
+        features_mask(["pool", "moat"])
+
+
+def test_listings_are_slotted_and_share_strings():
+    first, second = generate_sample_properties(2)
+    assert not hasattr(first, "__dict__")
+    with pytest.raises(AttributeError):
+        first.floor = 3  # type: ignore[attr-defined]
+    copy = Property(**{**asdict(second), "type": "".join(first.type), "location": "".join(first.location)})
+    assert copy.type is first.type
+    assert copy.location is first.location
+    assert copy.features == second.features
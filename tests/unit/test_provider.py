@@ -0,0 +1,41 @@
+import os
+import threading
+
+from app.inventory.generator import generate_inventory
+from app.inventory.provider import InventoryProvider
+from app.inventory.settings import InventorySettings
+from app.inventory.snapshot import write_snapshot
+
+
+def test_loads_lazily_and_warms():
+    provider = InventoryProvider(InventorySettings(inventory_source="generator", inventory_size=300))
+    assert not provider.loaded
+    inventory = provider.warm()
+    assert provider.loaded and len(inventory.store) == 300
+    assert {"planner", "facet_index", "market_stats"} <= set(inventory.__dict__)
+
+
+def test_replaced_snapshot_is_reloaded_once(tmp_path):
+    path = str(tmp_path / "inventory.snap")
+    write_snapshot(path, generate_inventory(100, seed=1))
+    provider = InventoryProvider(
+        InventorySettings(inventory_source="snapshot", inventory_path=path, inventory_refresh_seconds=0)
+    )
+    assert provider.current.version == 1
+
+    write_snapshot(path + ".new", generate_inventory(200, seed=2))
+    os.replace(path + ".new", path)
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def read() -> None:
+        barrier.wait()
+        seen.append(provider.current)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {inventory.version for inventory in seen} == {2}
+    assert len(provider.current.store) == 200
@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.search.cache import QueryCache, SearchResult
+from app.search.ranking import rank
+from app.utils.property_filters import build_query
+
+STORE = generate_inventory(1000, seed=6)
+
+
+def result(query) -> SearchResult:
+    return SearchResult(STORE, query, STORE.filter(query))
+
+
+def test_equivalent_queries_share_an_entry():
+    cache = QueryCache(max_bytes=1 << 20)
+    query = build_query(transaction_type="Rent", location=" KITI ")
+    cached = result(query)
+    assert cache.get_or_search(1, query, lambda: cached) is cached
+    same = build_query(transaction_type="rent", location="Kiti")
+    assert cache.get_or_search(1, same, lambda: result(same)) is cached
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_newer_version_drops_older_entries():
+    cache = QueryCache(max_bytes=1 << 20)
+    query = build_query(location="Kiti")
+    cache.put(1, query, result(query))
+    assert cache.get(2, query) is None
+    assert cache.stats()["invalidations"] == 1
+    # A late result for the old version is not stored
+    cache.put(1, query, result(query))
+    assert cache.get(2, query) is None
+
+
+def test_least_recently_used_is_evicted():
+    queries = [build_query(location=location) for location in ("Kiti", "Larnaca", "Meneou")]
+    results = [result(query) for query in queries]
+    cache = QueryCache(max_bytes=results[0].nbytes + results[1].nbytes + results[2].nbytes - 1)
+    cache.put(1, queries[0], results[0])
+    cache.put(1, queries[1], results[1])
+    cache.get(1, queries[0])
+    cache.put(1, queries[2], results[2])
+    assert cache.peek(1, queries[1]) is None
+    assert cache.peek(1, queries[0]) is results[0] and cache.peek(1, queries[2]) is results[2]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ranked_prefix_grows_as_pages_are_read():
+    query = build_query(transaction_type="buy", max_price=400_000)
+    cached = result(query)
+    assert np.array_equal(cached.ranked(5), rank(STORE, cached.rows, query, 5))
+    assert np.array_equal(cached.ranked(60), rank(STORE, cached.rows, query, 60))
+    assert np.array_equal(cached.ranked(5), rank(STORE, cached.rows, query, 5))
@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.models.property import FEATURE_BITS
+from app.search.ranking import RankingWeights, rank, score, top_k
+from app.utils.property_filters import build_query
+
+
+def full_sort(rows: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """The `k` best rows by sorting every one of them, ties by row"""
+    return rows[np.lexsort((rows, -scores))][:k]
+
+
+def test_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    for size in (0, 1, 7, 100, 5000):
+        rows = np.sort(rng.choice(100_000, size, replace=False))
+        # Few distinct scores, so the k-th best is usually tied
+        for scores in (rng.random(size), rng.integers(0, 5, size).astype(np.float64)):
+            for k in (0, 1, 3, 10, size, size + 5):
+                assert np.array_equal(top_k(rows, scores, k), full_sort(rows, scores, k)), (size, k)
+
+
+def test_rank_prefers_listings_within_budget():
+    store = generate_inventory(2000, seed=3)
+    query = build_query(transaction_type="rent", max_price=1_500, min_bedrooms=2)
+    rows = store.filter(build_query(transaction_type="rent"))
+    best = rank(store, rows, query, k=20)
+    assert len(best) == 20
+    assert np.array_equal(best, full_sort(rows, score(store, rows, query), 20))
+    assert (store.price[best] <= 1_500).mean() > (store.price[rows] <= 1_500).mean()
+
+
+def test_amenities_count_only_the_features_asked_for():
+    store = generate_inventory(2000, seed=4)
+    rows = np.arange(len(store))
+    weights = RankingWeights(budget=0, bedrooms=0, amenities=1, price_per_square_foot=0)
+    query = build_query(
+        required_features=["parking"],
+        where={"any": [{"feature": "pool"}, {"feature": "Air Conditioning"}], "not": {"feature": "gym"}},
+    )
+    names = ["parking", "pool", "air_conditioning"]
+    asked = sum((store.features & FEATURE_BITS[name]) != 0 for name in names)
+    assert np.allclose(score(store, rows, query, weights), asked / 3)
+    assert not score(store, rows, build_query(transaction_type="rent"), weights).any()
@@ -0,0 +1,58 @@
+import random
+from typing import Any, Dict
+
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.models.property import CYPRUS_LOCATIONS, FEATURES, PROPERTY_TYPES
+from app.utils.property_filters import build_query, fetch_page, get_property_store, search_properties
+
+STORE = generate_inventory(3000, seed=7)
+
+
+def random_preferences(rng: random.Random) -> Dict[str, Any]:
+    choices: Dict[str, Any] = {
+        "transaction_type": rng.choice(["buy", "rent"]),
+        "property_type": rng.choice(sorted(PROPERTY_TYPES)),
+        "location": rng.sample(CYPRUS_LOCATIONS, rng.randint(1, 3)),
+        "min_price": rng.choice([500, 2_000, 100_000]),
+        "max_price": rng.choice([1_500, 300_000, 900_000]),
+        "min_bedrooms": rng.randint(1, 3),
+        "max_bedrooms": rng.randint(2, 5),
+        "required_features": rng.sample(sorted(FEATURES), rng.randint(1, 2)),
+        "where": {
+            "any": [{"feature": rng.choice(sorted(FEATURES))}, {"location": rng.choice(CYPRUS_LOCATIONS)}]
+        },
+        "near": "Larnaca Airport",
+        "within_km": rng.choice([2, 5, 10]),
+    }
+    keys = rng.sample(sorted(choices), rng.randint(0, 5))
+    return {key: choices[key] for key in keys}
+
+
+def test_refines_only_when_matches_are_a_subset():
+    rng = random.Random(0)
+    refining = 0
+    for _ in range(400):
+        base = random_preferences(rng)
+        narrowed = {**base, **random_preferences(rng)}
+        for first, second in [(narrowed, base), (base, narrowed)]:
+            query, other = build_query(**first), build_query(**second)
+            if query.refines(other):
+                refining += 1
+                assert set(STORE.filter(query)) <= set(STORE.filter(other)), (first, second)
+    assert refining > 50
+
+
+def test_narrowed_search_matches_a_fresh_search():
+    rng = random.Random(1)
+    store = get_property_store()
+    for _ in range(50):
+        base = random_preferences(rng)
+        narrowed = {**base, **random_preferences(rng)}
+        previous = search_properties(**base)
+        list(fetch_page(previous))
+        handle = search_properties(previous=previous, **narrowed)
+        assert handle.total == len(store.filter(build_query(**narrowed)))
+        ids = [listing.id for listing in fetch_page(handle.first())]
+        assert np.isin(ids, store.ids[store.filter(build_query(**narrowed))]).all()
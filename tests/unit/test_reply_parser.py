@@ -0,0 +1,64 @@
+from typing import List
+
+import pytest
+
+from app.utils import reply_parser
+from app.utils.reply_parser import JsonObject, Prose, ReplyEvent, ReplyParser, parse_reply
+
+PREFERENCES = '{"property_preferences": {"location": "Kiti", "note": "a \\"quiet\\" {street}"}}'
+REPLIES = [
+    f"Great choice!\n```json\n{PREFERENCES}\n```\nAnything else?",
+    f"Text ```json\n{PREFERENCES}\n```\nmore",
+    f"Kiti it is. {PREFERENCES} Shall I search?",
+    'A {quiet} street, a { "broken": object and ``` ticks\r\n```\r\nthe end ```',
+    f"  ```\n{PREFERENCES}```\n\n{{}} done",
+]
+
+
+def merged(events: List[ReplyEvent]) -> List[ReplyEvent]:
+    """The events with neighbouring prose joined, as it reads on screen"""
+    result: List[ReplyEvent] = []
+    for event in events:
+        if isinstance(event, Prose) and result and isinstance(result[-1], Prose):
+            result[-1] = Prose(result[-1].text + event.text)
+        elif not (isinstance(event, Prose) and not event.text):
+            result.append(event)
+    return result
+
+
+def parsed_in_pieces(reply: str, splits: List[int]) -> List[ReplyEvent]:
+    parser = ReplyParser()
+    events: List[ReplyEvent] = []
+    for start, end in zip([0, *splits], [*splits, len(reply)], strict=True):
+        events += parser.feed(reply[start:end])
+    return merged(events + parser.close())
+
+
+def test_reply_events():
+    events = merged(parse_reply(REPLIES[0]))
+    assert events == [
+        Prose("Great choice!\n"),
+        JsonObject({"property_preferences": {"location": "Kiti", "note": 'a "quiet" {street}'}}, PREFERENCES),
+        Prose("\nAnything else?"),
+    ]
+    assert merged(parse_reply(REPLIES[1]))[0] == Prose("Text ```json\n")
+
+
+@pytest.mark.parametrize("reply", REPLIES)
+def test_any_split_parses_like_one_chunk(reply):
+    whole = merged(parse_reply(reply))
+    for split in range(len(reply) + 1):
+        assert parsed_in_pieces(reply, [split]) == whole, split
+    for size in (1, 2, 3, 5):
+        assert parsed_in_pieces(reply, list(range(size, len(reply), size))) == whole, size
+
+
+def test_long_object_is_given_up_on_at_the_same_character(monkeypatch):
+    monkeypatch.setattr(reply_parser, "MAX_OBJECT_CHARS", 40)
+    reply = 'Here: {"notes": "' + "x" * 30 + '", "next": {"location": "Kiti"}} bye'
+    whole = merged(parse_reply(reply))
+    prose = reply[: reply.index('{"location')]
+    assert whole == [Prose(prose), JsonObject({"location": "Kiti"}, '{"location": "Kiti"}'), Prose("} bye")]
+    for split in range(len(reply) + 1):
+        assert parsed_in_pieces(reply, [split]) == whole, split
+    assert parsed_in_pieces(reply, list(range(1, len(reply)))) == whole
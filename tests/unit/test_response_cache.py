@@ -0,0 +1,109 @@
+from typing import Any, Dict
+
+import numpy as np
+import pytest
+from phi.llm.message import Message
+
+from agents.settings import AgentSettings, agent_settings
+from app.assistants.response_cache import (
+    CachedOpenAIChat,
+    ResponseCache,
+    disk_engine,
+    get_response_cache,
+    request_key,
+    with_context,
+)
+from app.search import embeddings
+from app.search.embeddings import HashingEmbedder
+
+RESPONSE = {"content": "Lovely! Which area?", "tool_calls": [], "finish_reason": "stop"}
+
+
+def make_request(content: str) -> Dict[str, Any]:
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": "You are a helpful real estate assistant."},
+            {"role": "user", "content": content},
+        ],
+        "temperature": 0,
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(disk_engine(str(tmp_path / "llm_responses.sqlite")), similarity=0.8)
+
+
+@pytest.fixture
+def settings():
+    get_response_cache.cache_clear()
+    yield agent_settings
+    get_response_cache.cache_clear()
+
+
+def test_off_by_default(settings):
+    assert AgentSettings().response_cache is None
+    assert settings.response_cache is None
+    assert get_response_cache() is None
+
+
+def test_unusable_path_leaves_the_cache_off(settings, monkeypatch, tmp_path):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setattr(settings, "response_cache", "disk")
+    monkeypatch.setattr(settings, "response_cache_path", str(tmp_path / "file" / "llm_responses.sqlite"))
+    assert get_response_cache() is None
+
+
+def test_tiers(cache):
+    def found(words):
+        return cache.get(request_key(make_request(words)))
+
+    cache.put(request_key(make_request("I want to rent an apartment in Larnaca")), RESPONSE)
+    assert found("I want to rent an apartment in Larnaca") == ("exact", RESPONSE)
+    assert found("  i want to RENT an apartment in larnaca!") == ("normalized", RESPONSE)
+    assert found("I want to rent an apartment in Larnaca please") == ("similar", RESPONSE)
+    assert found("Do you have anything with a sea view?") is None
+
+
+def test_context_is_kept_apart_from_the_words():
+    def key(words, context):
+        return request_key(make_request(with_context(words, context)))
+
+    words = "I want to rent an apartment\n\nin Larnaca"
+    counts = key(words, "Listings matching the current preferences: 12")
+    assert counts.prompt == "i want to rent an apartment in larnaca"
+    assert key("rent a flat", "Listings matching the current preferences: 12").scope == counts.scope
+    assert key(words, "Listings matching the current preferences: 3").scope != counts.scope
+    assert request_key(make_request(words)).prompt == counts.prompt
+
+
+def test_similar_needs_the_same_context(cache):
+    words = "I want to rent an apartment in Larnaca"
+    cache.put(request_key(make_request(with_context(words, "12 listings"))), RESPONSE)
+    assert cache.get(request_key(make_request(with_context(words + " please", "12 listings"))))
+    assert cache.get(request_key(make_request(with_context(words + " please", "0 listings")))) is None
+
+
+def test_failing_lookup_is_a_miss(cache):
+    cache.engine.dispose()
+    with cache.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE llm_responses")
+    assert cache.get(request_key(make_request("rent"))) is None
+
+    class Broken(ResponseCache):
+        def get(self, key):
+            raise RuntimeError("no cache today")
+
+    llm = CachedOpenAIChat(model="gpt-4o", api_key="test", response_cache=Broken(cache.engine))
+    assert llm._lookup([Message(role="user", content="rent")]) == (None, None)
+
+
+def test_hashing_embedder_remembers_a_bounded_number_of_buckets(monkeypatch):
+    monkeypatch.setattr(embeddings, "MAX_SLOTS", 50)
+    texts = [f"apartment number {number} in larnaca" for number in range(100)]
+    embedder = HashingEmbedder()
+    vectors = embedder.embed(texts)
+    assert len(embedder._slots) <= 50
+    assert np.array_equal(vectors, HashingEmbedder().embed(texts))
+    assert np.array_equal(embedder.embed(texts[:1]), vectors[:1])
@@ -0,0 +1,42 @@
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.search.similar import LOCATION_PENALTY, KDTree, SimilarListings
+
+STORE = generate_inventory(3000, seed=12)
+
+
+def brute_force(similar: SimilarListings, row: int, k: int):
+    """The `k` nearest listings to `row` by scoring every other listing"""
+    codes = STORE.transaction_type.codes
+    rows = np.flatnonzero((codes == codes[row]) & (np.arange(len(STORE)) != row))
+    distances = ((similar.vectors[rows] - similar.vectors[row]) ** 2).sum(axis=1)
+    distances += LOCATION_PENALTY * (STORE.location.codes[rows] != STORE.location.codes[row])
+    order = np.lexsort((rows, distances))[:k]
+    return rows[order], np.sqrt(distances[order])
+
+
+def test_kd_tree_matches_brute_force():
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(2000, 6))
+    tree = KDTree(points)
+    for point in rng.normal(size=(30, 6)):
+        positions, squared = tree.query(point, 8)
+        distances = ((points - point) ** 2).sum(axis=1)
+        assert np.array_equal(positions, np.lexsort((np.arange(len(points)), distances))[:8])
+        assert np.allclose(squared, np.sort(distances)[:8])
+        assert (tree.query(point, 8, bound=float(squared[3]))[1] < squared[3]).all()
+
+
+def test_similar_listings_match_brute_force():
+    similar = SimilarListings(STORE)
+    for row in range(0, len(STORE), 97):
+        rows, distances = similar.similar_rows(row, k=6)
+        expected_rows, expected_distances = brute_force(similar, row, 6)
+        assert np.allclose(distances, expected_distances), row
+        assert np.array_equal(rows, expected_rows), row
+        assert (STORE.transaction_type.codes[rows] == STORE.transaction_type.codes[row]).all()
+
+
+def test_unknown_listing():
+    assert SimilarListings(STORE).similar(10**9) is None
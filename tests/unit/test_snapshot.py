@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from app.inventory.generator import generate_inventory
+from app.inventory.snapshot import read_snapshot, write_snapshot
+from app.inventory.store import PropertyStore
+from app.models.property import generate_sample_properties
+from app.search.planner import QueryPlanner
+from app.utils.property_filters import build_query
+
+
+@pytest.mark.parametrize(
+    "store",
+    [
+        generate_inventory(500, seed=4),
+        PropertyStore.from_properties(generate_sample_properties(200)),
+    ],
+    ids=["generated", "listings"],
+)
+def test_snapshot_round_trips(tmp_path, store):
+    path = str(tmp_path / "inventory.snapshot")
+    write_snapshot(path, store)
+    loaded, indexes = read_snapshot(path)
+    assert len(loaded) == len(store)
+    assert loaded.materialize(range(len(loaded))) == store.materialize(range(len(store)))
+    assert not loaded.price.flags.writeable
+    planner = QueryPlanner(loaded, indexes)
+    for query in [
+        build_query(transaction_type="rent", location="Kiti", property_type="apartment"),
+        build_query(min_price=1_000, max_price=250_000, min_bedrooms=2),
+        build_query(location=["Larnaca", "Meneou"], required_features=["pool"]),
+    ]:
+        assert np.array_equal(planner.execute(query), store.filter(query)), query
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "inventory.snapshot"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError):
+        read_snapshot(str(path))
@@ -0,0 +1,77 @@
+import random
+from typing import Any, Dict
+
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.inventory.store import PropertyStore
+from app.models.property import CYPRUS_LOCATIONS, PROPERTY_TYPES, Property
+from app.search.query import PropertyQuery
+
+STORE = generate_inventory(2000, seed=11)
+LISTINGS = STORE.materialize(range(len(STORE)))
+
+
+def random_query(rng: random.Random) -> PropertyQuery:
+    fields: Dict[str, Any] = {
+        "transaction_type": rng.choice(["buy", "Rent "]),
+        "property_type": rng.choice(sorted(PROPERTY_TYPES)),
+        "location": rng.choice(CYPRUS_LOCATIONS).upper(),
+        "min_price": rng.choice([500, 1_000, 150_000]),
+        "max_price": rng.choice([2_000, 400_000]),
+        "min_bedrooms": rng.randint(1, 3),
+        "max_bedrooms": rng.randint(2, 5),
+        "min_bathrooms": 2,
+        "min_square_feet": rng.choice([600.0, 1_500.0]),
+        "required_features": frozenset(rng.sample(["pool", "Air conditioning", "garden", "gym"], 1)),
+        "excluded_features": frozenset(rng.sample(["elevator", "fireplace", "parking"], 1)),
+    }
+    keys = rng.sample(sorted(fields), rng.randint(0, 4))
+    return PropertyQuery(**{key: fields[key] for key in keys}).normalized()
+
+
+def matches(listing: Property, query: PropertyQuery) -> bool:
+    """Whether `listing` matches `query`, the slow obvious way"""
+    for field, text in [
+        ("transaction_type", listing.transaction_type),
+        ("property_type", listing.type),
+        ("location", listing.location),
+    ]:
+        wanted = getattr(query, field)
+        if wanted is not None and text.lower() != wanted:
+            return False
+    for name, value in [
+        ("price", listing.price),
+        ("bedrooms", listing.bedrooms),
+        ("bathrooms", listing.bathrooms),
+        ("square_feet", listing.square_feet),
+    ]:
+        low, high = getattr(query, f"min_{name}"), getattr(query, f"max_{name}")
+        if (low is not None and value < low) or (high is not None and value > high):
+            return False
+    has = {name for name, present in listing.features.items() if present}
+    return query.required_features <= has and not query.excluded_features & has
+
+
+def test_filter_matches_a_scan_of_the_listings():
+    rng = random.Random(0)
+    found = 0
+    for _ in range(300):
+        query = random_query(rng)
+        expected = [row for row, listing in enumerate(LISTINGS) if matches(listing, query)]
+        assert list(STORE.filter(query)) == expected, query
+        found += bool(expected)
+    assert found > 100
+
+
+def test_filter_within_rows():
+    query = PropertyQuery(transaction_type="rent", min_bedrooms=2).normalized()
+    rows = np.arange(0, len(STORE), 7)
+    assert np.array_equal(STORE.filter(query, rows), np.intersect1d(STORE.filter(query), rows))
+
+
+def test_store_from_listings_round_trips():
+    store = PropertyStore.from_properties(LISTINGS[:300])
+    assert store.materialize(range(len(store))) == LISTINGS[:300]
+    query = PropertyQuery(property_type="apartment", required_features=frozenset({"pool"})).normalized()
+    assert list(store.filter(query)) == list(STORE.filter(query, np.arange(300)))
@@ -0,0 +1,74 @@
+import json
+from typing import List
+
+import pytest
+
+from app.components.chat_interface import CURSOR, REPAINT_INTERVAL, stream_reply
+
+PREFERENCES = {"property_preferences": {"location": "Kiti", "transaction_type": "rent"}}
+REPLY = f"Great choice! Kiti is lovely.\nWhat is your budget?\n{json.dumps(PREFERENCES)}"
+
+
+def chunks(text, size):
+    return [text[start : start + size] for start in range(0, len(text), size)]
+
+
+class Clock:
+    """A clock moving `step` seconds every time it is read"""
+
+    def __init__(self, step):
+        self.now, self.step = 0.0, step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, len(REPLY)])
+def test_prose_is_shown_and_json_taken_out(size):
+    painted: List[str] = []
+    taken: List[dict] = []
+
+    def on_json(event):
+        taken.append(event.value)
+        return "property_preferences" in event.value
+
+    prose, json_strs, timing = stream_reply(chunks(REPLY, size), painted.append, on_json, clock=Clock(1.0))
+    assert prose == "Great choice! Kiti is lovely.\nWhat is your budget?"
+    assert taken == [PREFERENCES]
+    assert [json.loads(text) for text in json_strs] == [PREFERENCES]
+    assert painted and all(text.endswith(CURSOR) for text in painted)
+    assert not any("{" in text or "property_preferences" in text for text in painted)
+    assert painted[-1] == prose + CURSOR
+    assert timing.chunks == len(chunks(REPLY, size))
+    assert timing.first_token is not None and timing.first_paint is not None and timing.first_json is not None
+    assert timing.first_token <= timing.first_paint <= timing.total
+
+
+def test_objects_refused_by_on_json_stay_in_the_prose():
+    reply = 'Here is an example: {"a": 1} and more.'
+    prose, json_strs, _ = stream_reply(chunks(reply, 4), lambda text: None, lambda event: False)
+    assert prose == reply
+    assert json_strs == []
+    prose, json_strs, _ = stream_reply(chunks(reply, 4), lambda text: None)
+    assert prose == reply
+
+
+def test_repaints_are_throttled():
+    painted: List[str] = []
+    clock = Clock(REPAINT_INTERVAL / 10)
+    prose, _, timing = stream_reply(chunks("word " * 200, 5), painted.append, clock=clock)
+    assert prose == ("word " * 200).strip()
+    # The first chunk paints at once, then about one repaint every ten chunks
+    assert painted[0] == "word" + CURSOR
+    assert 15 <= len(painted) <= 25
+    assert timing.first_paint == timing.first_token
+    assert timing.first_json is None
+
+
+def test_empty_deltas_are_skipped():
+    painted: List[str] = []
+    prose, _, timing = stream_reply(["", "Hello", "", " there"], painted.append, clock=Clock(1.0))
+    assert prose == "Hello there"
+    assert timing.chunks == 2
+    assert painted == ["Hello" + CURSOR, "Hello there" + CURSOR]
@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.search.text import TextIndex, tokenize
+
+
+def test_matching_rows_hold_a_term():
+    store = generate_inventory(2000, seed=5)
+    index = TextIndex(store)
+    for text in ("sea view villa", "Pool garden", "quiet Limassol apartment", "the and of"):
+        terms = set(tokenize(text))
+        expected = [
+            row
+            for row in range(len(store))
+            if not terms
+            or terms
+            & set(
+                tokenize(
+                    f"{store.title[row]} {store.description[row]} "
+                    + " ".join(name.replace("_", " ") for name, has in store.get(row).features.items() if has)
+                )
+            )
+        ]
+        assert list(index.matching(text)) == expected
+        if terms:
+            rows, scores = index.scores(text)
+            assert list(rows) == expected
+            assert np.all(scores > 0)
+
+
+def test_matching_within_rows():
+    store = generate_inventory(1000, seed=2)
+    index = TextIndex(store)
+    rows = np.arange(0, 1000, 3)
+    expected = np.intersect1d(index.matching("villa pool"), rows)
+    assert np.array_equal(index.matching("villa pool", rows), expected)
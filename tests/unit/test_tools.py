@@ -0,0 +1,61 @@
+import json
+
+from streamlit.testing.v1 import AppTest
+
+
+def tool_app():
+    import json
+
+    import streamlit as st
+
+    from app.assistants.tools import update_property_preferences
+    from app.components.chat_interface import process_preferences_json
+    from app.utils.state_management import initialize_session_state
+
+    initialize_session_state()
+    if "arguments" in st.session_state:
+        st.session_state.result = json.loads(update_property_preferences(**st.session_state.arguments))
+    if "reply" in st.session_state:
+        st.session_state.result = process_preferences_json(st.session_state.reply)
+
+
+def run(**state):
+    app = AppTest.from_function(tool_app, default_timeout=30)
+    for key, value in state.items():
+        app.session_state[key] = value
+    app.run()
+    assert not app.exception, app.exception
+    return app
+
+
+def test_tool_call_updates_preferences():
+    app = run(arguments={"transaction_type": "rent", "location": ["Kiti", "Meneou"], "min_bedrooms": 2})
+    assert app.session_state.result == {
+        "updated": ["transaction_type: rent", "location: ['Kiti', 'Meneou']", "min_bedrooms: 2"],
+        "missing": ["property type (house, apartment, etc)"],
+    }
+    assert app.session_state.location == ["Kiti", "Meneou"]
+    assert app.session_state.min_bedrooms == 2
+
+
+def test_invalid_tool_call_changes_nothing():
+    for arguments in (
+        {"transaction_type": "lease", "location": "Kiti"},
+        {"location": "Kiti", "where": {"location": 1}},
+        {"location": "Kiti", "floor": 3},
+    ):
+        app = run(arguments=arguments)
+        assert app.session_state.result["error"] == "Invalid arguments, nothing was changed"
+        assert app.session_state.location is None
+
+
+def test_reply_json_updates_preferences():
+    reply = 'Noted! {"property_preferences": {"transaction_type": "buy", "location": "Kiti"}}'
+    app = run(reply=reply)
+    assert app.session_state.result == (
+        True,
+        "Noted!",
+        json.dumps({"property_preferences": {"transaction_type": "buy", "location": "Kiti"}}),
+    )
+    assert app.session_state.transaction_type == "buy"
+    assert app.session_state.location == "Kiti"
@@ -0,0 +1,56 @@
+import numpy as np
+
+from app.inventory.generator import generate_inventory
+from app.search.embeddings import HashingEmbedder, listing_text
+from app.search.vectors import IVFIndex, SemanticIndex, list_count
+
+
+def clustered_vectors(count: int, dimensions: int = 32, clusters: int = 40, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimensions))
+    vectors = centres[rng.integers(0, clusters, count)] + 0.3 * rng.normal(size=(count, dimensions))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def build_index(vectors: np.ndarray) -> IVFIndex:
+    index = IVFIndex(vectors.shape[1], lists=list_count(len(vectors)))
+    index.train(vectors[::4])
+    assert np.array_equal(index.add(vectors), np.arange(len(vectors)))
+    return index
+
+
+def test_probing_every_list_is_exact():
+    vectors = clustered_vectors(3000)
+    index = build_index(vectors)
+    for query in clustered_vectors(20, seed=1):
+        ids, scores = index.search(query, 10, nprobe=index.lists)
+        assert np.array_equal(ids, index.exact(query, 10)[0])
+        assert np.allclose(scores, vectors[ids] @ query)
+
+
+def test_default_probes_find_most_neighbours():
+    vectors = clustered_vectors(10_000)
+    index = build_index(vectors)
+    found = 0
+    queries = clustered_vectors(50, seed=2)
+    for query in queries:
+        found += len(np.intersect1d(index.search(query, 10)[0], index.exact(query, 10)[0]))
+    assert found / (10 * len(queries)) > 0.9
+
+
+def test_search_within_candidates():
+    vectors = clustered_vectors(3000)
+    index = build_index(vectors)
+    query = clustered_vectors(1, seed=3)[0]
+    candidates = np.arange(0, 3000, 5)
+    ids, _ = index.search(query, 10, candidates=candidates)
+    assert np.array_equal(ids, index.exact(query, 10, candidates)[0])
+    assert np.isin(ids, candidates).all()
+
+
+def test_semantic_index_finds_listings_by_their_words():
+    store = generate_inventory(2000, seed=8)
+    index = SemanticIndex(store, HashingEmbedder())
+    rows, scores = index.search(listing_text(store, 42), k=5)
+    assert 42 in rows
+    assert list(scores) == sorted(scores, reverse=True)